@@ -0,0 +1,173 @@
+"""Authentication benchmark.
+
+Sends authenticated requests for many users to a minimal app and reports
+requests per second for each way of authenticating them: decoding every token
+and checking out a session as ``get_current_user`` used to, decoding without
+a session, and with the verified token and user caches::
+
+    python -m benchmarks.auth --requests 20000 --users 1000
+    python -m benchmarks.auth --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import JWTError, jwt
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+
+from src.models.database import AsyncSession, Database, get_session
+from src.models.tables import Users
+from src.services import auth
+from src.settings import DataBaseConfig
+
+
+async def seed(db: Database, users: int) -> list[str]:
+    """Create users, returning an access token for each."""
+    rows = [
+        Users(phone_number=f"+2557540{index:05d}", name=f"User {index}")
+        for index in range(users)
+    ]
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.execute(insert(Users), [row.model_dump() for row in rows])
+    return [auth.create_access_token(user_id=row.id) for row in rows]
+
+
+async def session_per_request(
+    session: Annotated[AsyncSession, Depends(get_session)],
+    cred: Annotated[HTTPAuthorizationCredentials, Depends(auth.bearer_scheme)],
+) -> str:
+    """The old ``get_current_user``: a session checked out, every token decoded."""
+    try:
+        payload = jwt.decode(
+            cred.credentials,
+            auth.SECRET_KEY,
+            algorithms=[auth.ALGORITHM],
+        )
+    except JWTError as error:
+        raise HTTPException(status_code=401) from error
+    return payload["sub"]
+
+
+def make_app() -> FastAPI:
+    """App with one route per way of authenticating."""
+    app = FastAPI()
+
+    @app.get("/before")
+    async def before(sub: Annotated[str, Depends(session_per_request)]) -> dict:
+        return {"sub": sub}
+
+    @app.get("/user-id")
+    async def user_id(user_id: Annotated[str, Depends(auth.get_current_user_id)]):
+        return {"sub": str(user_id)}
+
+    @app.get("/user")
+    async def user(user: Annotated[Users, Depends(auth.get_current_user)]):
+        return {"sub": str(user.id)}
+
+    return app
+
+
+async def run(
+    client: httpx.AsyncClient,
+    path: str,
+    tokens: list[str],
+    requests: int,
+    clients: int,
+) -> float:
+    """Send the requests round robin over the tokens, returning requests/s."""
+    counter = iter(range(requests))
+
+    async def caller() -> None:
+        for index in counter:
+            token = tokens[index % len(tokens)]
+            response = await client.get(
+                path,
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(clients)))
+    return requests / (time.perf_counter() - start)
+
+
+def verify_rate(verifier: auth.TokenVerifier, tokens: list[str], rounds: int) -> float:
+    """Tokens verified per second, calling the verifier directly."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            verifier.verify(token)
+    return rounds * len(tokens) / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    keys = {auth.token_verifier.current_kid: auth.SECRET_KEY}
+    uncached = auth.TokenVerifier(keys, auth.token_verifier.current_kid, max_size=0)
+    cached = auth.TokenVerifier(keys, auth.token_verifier.current_kid)
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+
+        async def session_override():
+            async with db.session() as session:
+                yield session
+
+        app = make_app()
+        app.dependency_overrides[get_session] = session_override
+        auth.user_cache = auth.UserCache(db)
+        try:
+            tokens = await seed(db, args.users)
+
+            print(f"verify uncached {verify_rate(uncached, tokens, 3):10,.0f} tokens/s")
+            verify_rate(cached, tokens, 1)
+            print(f"verify cached   {verify_rate(cached, tokens, 20):10,.0f} tokens/s")
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport,
+                base_url="http://app",
+            ) as client:
+                for label, path, verifier in (
+                    ("before: session + decode", "/before", uncached),
+                    ("user id, decode", "/user-id", uncached),
+                    ("user id, cached", "/user-id", cached),
+                    ("user, cached", "/user", cached),
+                ):
+                    auth.token_verifier = verifier
+                    # warm the caches, as a worker that has been up a while
+                    await run(client, path, tokens, len(tokens), args.clients)
+                    rate = await run(
+                        client,
+                        path,
+                        tokens,
+                        args.requests,
+                        args.clients,
+                    )
+                    print(f"{label:<26} {rate:8,.0f} requests/s")
+        finally:
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
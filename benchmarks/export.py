@@ -0,0 +1,89 @@
+"""Streaming export benchmark.
+
+Seeds one organization with many invoices in a scratch database, streams
+every export format and reports throughput and peak memory, which should not
+grow with the number of rows::
+
+    python -m benchmarks.export --invoices 200000
+    python -m benchmarks.export --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import resource
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlmodel import select
+
+from benchmarks.invoice_listing import seed
+from src.models.database import Database
+from src.models.tables import Organizations
+from src.schemas.export import ExportFormat, ExportQuery, ExportResource
+from src.services.exports import stream_export
+from src.settings import DataBaseConfig
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            user_id = await seed(db, args.invoices, customers=1000)
+            async with db.session() as session:
+                organization_id = (
+                    await session.exec(
+                        select(Organizations.id).where(
+                            Organizations.owner_id == user_id,
+                        ),
+                    )
+                ).one()
+
+            for export_format in ExportFormat:
+                for gzip in (False, True):
+                    query = ExportQuery(
+                        organization_id=organization_id,
+                        format=export_format,
+                        gzip=gzip,
+                    )
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    size = 0
+                    async for chunk in stream_export(
+                        ExportResource.INVOICES,
+                        query,
+                        db=db,
+                        chunk_size=args.chunk_size,
+                    ):
+                        size += len(chunk)
+                    elapsed = time.perf_counter() - start
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    label = f"{export_format.value}{'.gz' if gzip else ''}"
+                    print(
+                        f"{label:<9} {size / 1024 / 1024:7.1f} MB in {elapsed:5.1f} s  "
+                        f"{args.invoices / elapsed:9,.0f} rows/s  "
+                        f"peak allocated {peak / 1024 / 1024:.1f} MB",
+                    )
+        finally:
+            await db.dispose()
+
+    # kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
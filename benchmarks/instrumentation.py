@@ -0,0 +1,99 @@
+"""Request instrumentation overhead benchmark.
+
+Sends requests to a trivial route with and without the metrics middleware,
+JSON access logs included, and with the profiling middleware installed but
+not sampling, or profiling one request after another. Reports requests per
+second and the cost per request over the plain app::
+
+    python -m benchmarks.instrumentation --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.instrumentation import RequestMetricsMiddleware, configure_logging
+from src.profiling import ProfilingMiddleware
+
+
+def make_app(
+    *,
+    instrumented: bool,
+    sample_rate: float | None = None,
+    directory: str = "",
+) -> FastAPI:
+    """App with one route, optionally instrumented and profiled."""
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int) -> dict:
+        return {"id": item_id}
+
+    if sample_rate is not None:
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=None,
+            sample_rate=sample_rate,
+            directory=directory,
+        )
+    if instrumented:
+        app.add_middleware(RequestMetricsMiddleware)
+    return app
+
+
+async def run(app: FastAPI, requests: int, clients: int) -> float:
+    """Send the requests, returning requests/s."""
+    counter = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+
+        async def caller() -> None:
+            for index in counter:
+                response = await client.get(f"/items/{index}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(clients)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--clients", type=int, default=20)
+    args = parser.parse_args()
+
+    configure_logging(log_format="json")
+    with (
+        open(os.devnull, "w") as devnull,  # noqa: ASYNC230
+        tempfile.TemporaryDirectory() as directory,
+    ):
+        for handler in logging.getLogger().handlers:
+            handler.setStream(devnull)
+
+        plain = None
+        for label, options in (
+            ("plain", {"instrumented": False}),
+            ("instrumented", {"instrumented": True}),
+            ("profiler, off", {"instrumented": True, "sample_rate": 0.0}),
+            ("profiler, all", {"instrumented": True, "sample_rate": 1.0}),
+        ):
+            app = make_app(**options, directory=directory)
+            await run(app, args.requests // 10, args.clients)
+            rate = await run(app, args.requests, args.clients)
+            plain = plain or rate
+            print(
+                f"{label:<14} {rate:8,.0f} requests/s  "
+                f"{(1 / rate - 1 / plain) * 1e6:+8,.0f} us/request",
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
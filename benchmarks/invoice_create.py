@@ -0,0 +1,137 @@
+"""Concurrent invoice creation benchmark.
+
+Creates invoices for one organization from many parallel clients, spread over
+several allocators as if they ran in separate workers, then checks every
+invoice got a distinct number::
+
+    python -m benchmarks.invoice_create --clients 50 --invoices 20 --workers 4
+    python -m benchmarks.invoice_create --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file, which serializes writers;
+use Postgres to see how creation scales with clients.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlmodel import SQLModel
+
+from src.models.database import Database
+from src.models.tables import (
+    Customers,
+    InvoiceCounters,
+    InvoiceItems,
+    Invoices,
+    Organizations,
+    Users,
+)
+from src.schemas.invoice import InvoiceCreateSchema, InvoiceItemCreateSchema
+from src.services.invoice import InvoiceNumberAllocator, create_invoice
+from src.settings import DataBaseConfig
+
+
+async def seed(db: Database) -> tuple[Users, Organizations, Customers]:
+    """Create a user owning an organization with one customer."""
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    user = Users(phone_number="+255754000000", name="Bench")
+    organization = Organizations(owner_id=user.id, name="Bench")
+    customer = Customers(
+        organization_id=organization.id,
+        customer_code="C000001",
+        name="Customer",
+        phone="+255754000001",
+    )
+    async with db.session() as session:
+        session.add_all([user, organization, customer])
+        await session.commit()
+    return user, organization, customer
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--invoices", type=int, default=20, help="per client")
+    parser.add_argument("--items", type=int, default=10, help="per invoice")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--block-size", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            user, organization, customer = await seed(db)
+            allocators = [
+                InvoiceNumberAllocator(db, block_size=args.block_size)
+                for _ in range(args.workers)
+            ]
+            data = InvoiceCreateSchema(
+                organization_id=organization.id,
+                customer_id=customer.id,
+                tax_rate=Decimal(18),
+                items=[
+                    InvoiceItemCreateSchema(
+                        description=f"Item {index}",
+                        quantity=Decimal(2),
+                        unit_price=Decimal("1250.50"),
+                    )
+                    for index in range(args.items)
+                ],
+            )
+            latencies = []
+
+            async def client(index: int) -> None:
+                numbers = allocators[index % len(allocators)]
+                for _ in range(args.invoices):
+                    start = time.perf_counter()
+                    async with db.session() as session:
+                        await create_invoice(session, user.id, data, numbers)
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client(index) for index in range(args.clients)))
+            elapsed = time.perf_counter() - start
+
+            async with db.session() as session:
+                invoices, distinct, items, next_value = (
+                    await session.execute(
+                        select(
+                            func.count(Invoices.id),
+                            func.count(Invoices.invoice_number.distinct()),
+                            select(func.count(InvoiceItems.id)).scalar_subquery(),
+                            select(InvoiceCounters.next_value).scalar_subquery(),
+                        ),
+                    )
+                ).one()
+        finally:
+            await db.dispose()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"{invoices} invoices ({items} items) from {args.clients} clients "
+        f"in {elapsed:.2f} s: {invoices / elapsed:,.0f} invoices/s",
+    )
+    print(f"latency p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    print(
+        f"{distinct} distinct invoice numbers, "
+        f"{(next_value - 1) // args.block_size} counter updates",
+    )
+    if distinct != invoices:
+        msg = "Duplicate invoice numbers"
+        raise SystemExit(msg)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""Bulk invoice import benchmark.
+
+Writes a CSV file of invoices for one organization, half of them for existing
+customers and half for new ones, imports it and reports throughput and peak
+memory, which should not grow with the file::
+
+    python -m benchmarks.invoice_import --invoices 100000
+    python -m benchmarks.invoice_import --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import csv
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+
+from src.models.balances import rebuild
+from src.models.database import Database
+from src.models.tables import Customers, ImportJobs, Organizations, Users
+from src.services.imports import InvoiceImport
+from src.settings import DataBaseConfig
+
+COLUMNS = (
+    "invoice_number",
+    "customer_code",
+    "customer_phone",
+    "customer_name",
+    "issue_date",
+    "due_date",
+    "tax_amount",
+    "description",
+    "quantity",
+    "unit_price",
+)
+
+
+def write_csv(path: Path, invoices: int, items: int, customers: int) -> None:
+    """Write the invoices, with new customers on every other invoice."""
+    with path.open("w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for index in range(invoices):
+            if index % 2:
+                customer = (f"C{index % customers:06d}", "", "")
+            else:
+                customer = ("", f"+2557550{index:05d}", f"New {index}")
+            for item in range(items):
+                writer.writerow(
+                    (
+                        f"IMP-{index:08d}",
+                        *customer,
+                        "2026-01-01",
+                        "2026-02-01",
+                        "18.00",
+                        f"Item {item}",
+                        "2",
+                        "1250.50",
+                    ),
+                )
+
+
+async def seed(db: Database, customers: int) -> ImportJobs:
+    """Create a user owning an organization with existing customers."""
+    user = Users(phone_number="+255754000000", name="Bench")
+    organization = Organizations(owner_id=user.id, name="Bench")
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.execute(insert(Users), [user.model_dump()])
+        await connection.execute(insert(Organizations), [organization.model_dump()])
+        await connection.execute(
+            insert(Customers),
+            [
+                Customers(
+                    organization_id=organization.id,
+                    customer_code=f"C{index:06d}",
+                    name=f"Customer {index}",
+                    phone=f"+2557541{index:05d}",
+                ).model_dump()
+                for index in range(customers)
+            ],
+        )
+        await connection.run_sync(rebuild)
+
+    job = ImportJobs(organization_id=organization.id, created_by=user.id, format="csv")
+    async with db.session() as session:
+        session.add(job)
+        await session.commit()
+    return job
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=3, help="per invoice")
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "invoices.csv"
+        write_csv(path, args.invoices, args.items, args.customers)
+        size = path.stat().st_size / 1024 / 1024
+
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            job = await seed(db, args.customers)
+            start = time.perf_counter()
+            await InvoiceImport(job, path, db, batch_size=args.batch_size).run()
+            elapsed = time.perf_counter() - start
+            async with db.session() as session:
+                job = await session.get(ImportJobs, job.id)
+        finally:
+            await db.dispose()
+
+    # kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{job.invoices_imported} invoices, {job.customers_created} new customers "
+        f"from a {size:.1f} MB file in {elapsed:.1f} s: "
+        f"{job.invoices_imported / elapsed:,.0f} invoices/s",
+    )
+    print(f"{job.rows_failed} failed, peak RSS {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+"""Invoice listing benchmark.
+
+Seeds one organization with many invoices in a scratch database and times
+pages at increasing cursor depths, which should stay flat with keyset
+pagination::
+
+    python -m benchmarks.invoice_listing --invoices 200000
+    python -m benchmarks.invoice_listing --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+
+from src.models.database import Database
+from src.models.enums import InvoiceStatus
+from src.models.repository.invoice import InvoiceRepository
+from src.models.tables import Customers, Invoices, Organizations, Users
+from src.schemas.invoice import InvoiceListQuery
+from src.settings import DataBaseConfig
+
+SEED_CHUNK_SIZE = 5000
+
+
+async def seed(db: Database, invoices: int, customers: int) -> uuid.UUID:
+    """Create a user owning one organization with the given invoices."""
+    rng = random.Random(0)
+    user = Users(phone_number="+255754000000", name="Bench")
+    organization = Organizations(owner_id=user.id, name="Bench")
+    customer_ids = [uuid.uuid4() for _ in range(customers)]
+
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        await connection.execute(insert(Users), [user.model_dump()])
+        await connection.execute(insert(Organizations), [organization.model_dump()])
+        await connection.execute(
+            insert(Customers),
+            [
+                Customers(
+                    id=customer_id,
+                    organization_id=organization.id,
+                    customer_code=f"C{index:06d}",
+                    name=f"Customer {index}",
+                    phone=f"+2557541{index:05d}",
+                ).model_dump()
+                for index, customer_id in enumerate(customer_ids)
+            ],
+        )
+
+        statuses = list(InvoiceStatus)
+        start = date(2020, 1, 1)
+        for offset in range(0, invoices, SEED_CHUNK_SIZE):
+            rows = []
+            for index in range(offset, min(offset + SEED_CHUNK_SIZE, invoices)):
+                issue_date = start + timedelta(days=rng.randrange(2000))
+                amount = Decimal(rng.randrange(1000, 1_000_000)) / 100
+                rows.append(
+                    Invoices(
+                        invoice_number=f"INV-{index:08d}",
+                        customer_id=rng.choice(customer_ids),
+                        organization_id=organization.id,
+                        created_by=user.id,
+                        subtotal=amount,
+                        total_amount=amount,
+                        status=rng.choice(statuses),
+                        issue_date=issue_date,
+                        due_date=issue_date + timedelta(days=30),
+                    ).model_dump(),
+                )
+            await connection.execute(insert(Invoices), rows)
+    return user.id
+
+
+async def time_pages(
+    db: Database,
+    user_id: uuid.UUID,
+    pages: int,
+    limit: int,
+    query: dict,
+) -> list[float]:
+    """Walk the listing page by page, returning each page's latency."""
+    latencies = []
+    cursor = None
+    async with db.session() as session:
+        repository = InvoiceRepository(session)
+        for _ in range(pages):
+            start = time.perf_counter()
+            _, cursor = await repository.list_invoices(
+                user_id,
+                InvoiceListQuery(cursor=cursor, limit=limit, **query),
+            )
+            latencies.append(time.perf_counter() - start)
+            if cursor is None:
+                break
+    return latencies
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=200_000)
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            start = time.perf_counter()
+            user_id = await seed(db, args.invoices, args.customers)
+            elapsed = time.perf_counter() - start
+            print(f"seeded {args.invoices} invoices in {elapsed:.1f} s")
+
+            pages = args.invoices // args.limit
+            for label, query in (
+                ("all", {}),
+                ("status=SENT", {"status": [InvoiceStatus.SENT]}),
+                ("amount>=5000", {"min_amount": Decimal(5000)}),
+            ):
+                latencies = await time_pages(db, user_id, pages, args.limit, query)
+                tenth = max(1, len(latencies) // 10)
+                first = statistics.median(latencies[:tenth]) * 1000
+                last = statistics.median(latencies[-tenth:]) * 1000
+                print(
+                    f"{label:<14} {len(latencies):6} pages  "
+                    f"first 10%: {first:6.2f} ms  last 10%: {last:6.2f} ms",
+                )
+        finally:
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""One-time code benchmark.
+
+Seeds a scratch database with live codes for many phones and a backlog of
+expired ones, as after an SMS-login spike, then times verifications before
+and after the purge and reports how fast the purge deletes::
+
+    python -m benchmarks.otp --phones 5000 --expired 500000
+    python -m benchmarks.otp --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlmodel import SQLModel
+
+from src.models.database import Database
+from src.models.repository.otp import OTPRepository
+from src.models.tables import OTPVerifications
+from src.services.otp import OTPPurger, hash_code
+from src.settings import DataBaseConfig, settings
+
+SEED_CHUNK_SIZE = 5000
+
+
+def phone(index: int) -> str:
+    """A distinct phone number."""
+    return f"+2557{index:08d}"
+
+
+async def seed(db: Database, phones: int, expired: int) -> None:
+    """Insert a live code "123456" per phone and the expired backlog."""
+    now = datetime.now(tz=timezone.utc)
+
+    def row(number: str, expires_at: datetime) -> dict:
+        return {
+            "id": uuid.uuid4(),
+            "created_at": now,
+            "updated_at": now,
+            "phone": number,
+            "code_hash": hash_code(number, "123456"),
+            "is_verified": False,
+            "expires_at": expires_at,
+            "attempts": 0,
+        }
+
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+        for offset in range(0, expired, SEED_CHUNK_SIZE):
+            rows = [
+                row(phone(index % phones), now - timedelta(seconds=index + 1))
+                for index in range(offset, min(offset + SEED_CHUNK_SIZE, expired))
+            ]
+            await connection.execute(insert(OTPVerifications), rows)
+        live = [row(phone(index), now + timedelta(hours=1)) for index in range(phones)]
+        await connection.execute(insert(OTPVerifications), live)
+
+
+async def time_verifications(db: Database, phones: range, code: str) -> list[float]:
+    """Verify a code for each phone, returning each verification's latency."""
+    latencies = []
+    async with db.session() as session:
+        repository = OTPRepository(session)
+        for index in phones:
+            number = phone(index)
+            start = time.perf_counter()
+            await repository.verify(
+                number,
+                hash_code(number, code),
+                datetime.now(tz=timezone.utc),
+                settings.OTP_MAX_ATTEMPTS,
+            )
+            await session.commit()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, latencies: list[float]) -> None:
+    """Print the median and p99 latency."""
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(
+        f"{label:<24} p50 {statistics.median(latencies) * 1000:6.2f} ms  "
+        f"p99 {p99 * 1000:6.2f} ms",
+    )
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--phones", type=int, default=5000)
+    parser.add_argument("--expired", type=int, default=500_000)
+    parser.add_argument("--batch-size", type=int, default=settings.OTP_PURGE_BATCH_SIZE)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            await seed(db, args.phones, args.expired)
+            half = args.phones // 2
+            # wrong guesses leave the codes live for the second pass
+            report(
+                f"verify, {args.expired:,} expired",
+                await time_verifications(db, range(half), "000000"),
+            )
+
+            start = time.perf_counter()
+            purged = await OTPPurger(db, batch_size=args.batch_size).purge()
+            elapsed = time.perf_counter() - start
+            print(
+                f"purged {purged:,} codes in {elapsed:.1f} s  "
+                f"{purged / elapsed:9,.0f} rows/s",
+            )
+
+            report(
+                "verify, after purge",
+                await time_verifications(db, range(half, args.phones), "000000"),
+            )
+            report(
+                "verify, matching",
+                await time_verifications(db, range(args.phones), "123456"),
+            )
+            async with db.engine.connect() as connection:
+                left = (
+                    await connection.execute(
+                        select(func.count(OTPVerifications.id)),
+                    )
+                ).scalar_one()
+            print(f"{left:,} codes left")
+        finally:
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
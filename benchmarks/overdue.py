@@ -0,0 +1,85 @@
+"""Overdue sweep benchmark.
+
+Seeds one organization with many invoices in a scratch database, many
+of them SENT and past due, and times the sweep marking them overdue, with and
+without queuing reminders::
+
+    python -m benchmarks.overdue --invoices 200000
+    python -m benchmarks.overdue --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, update
+from sqlmodel import select
+
+from benchmarks.invoice_listing import seed
+from src.models.database import Database
+from src.models.enums import InvoiceStatus
+from src.models.tables import Invoices, OutboundMessages
+from src.services.overdue import OverdueSweeper
+from src.settings import DataBaseConfig
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            await seed(db, args.invoices, customers=1000)
+            for reminders in (False, True):
+                # put the marked invoices back for the second run
+                async with db.engine.begin() as connection:
+                    await connection.execute(
+                        update(Invoices)
+                        .where(Invoices.status == InvoiceStatus.OVERDUE)
+                        .values(status=InvoiceStatus.SENT),
+                    )
+
+                sweeper = OverdueSweeper(
+                    db,
+                    batch_size=args.batch_size,
+                    reminders=reminders,
+                )
+                start = time.perf_counter()
+                marked = await sweeper.sweep()
+                elapsed = time.perf_counter() - start
+                label = "reminders" if reminders else "status"
+                print(
+                    f"{label:<9} {marked:8,} invoices in {elapsed:5.1f} s  "
+                    f"{marked / elapsed:9,.0f} rows/s",
+                )
+
+            async with db.session() as session:
+                queued = (
+                    await session.exec(select(func.count(OutboundMessages.id)))
+                ).one()
+                left = (
+                    await session.exec(
+                        select(func.count(Invoices.id)).where(
+                            Invoices.status == InvoiceStatus.SENT,
+                            Invoices.due_date < func.current_date(),
+                        ),
+                    )
+                ).one()
+            print(f"{queued:,} reminders queued, {left:,} past-due SENT invoices left")
+        finally:
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
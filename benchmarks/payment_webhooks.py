@@ -0,0 +1,240 @@
+"""Payment webhook load test.
+
+Seeds invoices in a scratch database and PENDING mobile money payments of
+every SENT one, some in two parts, then replays ZenoPay results at the webhook from
+many concurrent callers: every result several times, shuffled, with late
+FAILED results after some COMPLETED ones. Reports callbacks per second and
+fails when any payment is credited twice::
+
+    python -m benchmarks.payment_webhooks --invoices 10000 --duplicates 3
+    python -m benchmarks.payment_webhooks --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file, which serializes writers;
+use Postgres to see how ingestion scales with callers.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import httpx
+from sqlalchemy import func, insert, select
+
+from benchmarks.invoice_listing import seed
+from src.main import app
+from src.models import balances
+from src.models.database import Database, get_session
+from src.models.enums import InvoiceStatus, PaymentMethod, TransactionStatus
+from src.models.tables import Invoices, OutboundMessages, Transactions
+from src.settings import DataBaseConfig, settings
+
+
+def payment_rows(invoices: list, rng: random.Random) -> list[dict]:
+    """PENDING payments covering each invoice, a third of them in two parts."""
+    now = datetime.now(tz=timezone.utc)
+    rows = []
+    for invoice_id, customer_id, total in invoices:
+        total = Decimal(total).quantize(Decimal("0.01"))
+        first = (total / 2).quantize(Decimal("0.01"))
+        parts = [first, total - first] if rng.random() < 1 / 3 else [total]
+        for amount in parts:
+            transaction_id = uuid.uuid4()
+            rows.append(
+                {
+                    "id": transaction_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "transaction_number": f"PAY-{transaction_id.hex[:20].upper()}",
+                    "invoice_id": invoice_id,
+                    "customer_id": customer_id,
+                    "amount": amount,
+                    "currency": "TZS",
+                    "payment_method": PaymentMethod.MOBILE_MONEY,
+                    "status": TransactionStatus.PENDING,
+                    "reference_number": None,
+                    "notes": None,
+                    "idempotency_key": None,
+                    "transaction_date": now,
+                },
+            )
+    return rows
+
+
+def callbacks(
+    payments: list[dict],
+    duplicates: int,
+    decline_rate: float,
+    rng: random.Random,
+) -> tuple[list[dict], set]:
+    """Shuffled results for the payments, and the IDs that should complete."""
+    results, completed = [], set()
+    for payment in payments:
+        order_id = str(payment["id"])
+        reference = f"{rng.randrange(10**11, 10**12)}"
+        if rng.random() < decline_rate:
+            status = "FAILED"
+        else:
+            status = "COMPLETED"
+            completed.add(payment["id"])
+            # a stale failure arriving after the success
+            if rng.random() < 0.1:
+                results.append({"order_id": order_id, "payment_status": "FAILED"})
+        results.extend(
+            {"order_id": order_id, "payment_status": status, "reference": reference}
+            for _ in range(duplicates)
+        )
+    rng.shuffle(results)
+    return results, completed
+
+
+async def main() -> None:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=10_000)
+    parser.add_argument("--duplicates", type=int, default=3)
+    parser.add_argument("--decline-rate", type=float, default=0.1)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+
+        async def session_override():
+            async with db.session() as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        try:
+            await seed(db, args.invoices, customers=1000)
+            async with db.engine.begin() as connection:
+                invoices = (
+                    await connection.execute(
+                        select(
+                            Invoices.id,
+                            Invoices.customer_id,
+                            Invoices.total_amount,
+                        ).where(Invoices.status == InvoiceStatus.SENT),
+                    )
+                ).all()
+                payments = payment_rows(invoices, rng)
+                await connection.execute(insert(Transactions), payments)
+                await connection.run_sync(balances.rebuild)
+
+            results, completed = callbacks(
+                payments,
+                args.duplicates,
+                args.decline_rate,
+                rng,
+            )
+            queue = asyncio.Queue()
+            for result in results:
+                queue.put_nowait(result)
+            timings, outcomes = [], Counter()
+
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport,
+                base_url="http://app",
+                headers={"x-api-key": settings.ZENOPAY_API_KEY},
+            ) as client:
+
+                async def caller() -> None:
+                    while not queue.empty():
+                        result = queue.get_nowait()
+                        start = time.perf_counter()
+                        response = await client.post(
+                            "/api/payments/zenopay/webhook",
+                            json=result,
+                        )
+                        timings.append((time.perf_counter() - start) * 1000)
+                        response.raise_for_status()
+                        outcomes[response.json()["data"]["outcome"]] += 1
+
+                start = time.perf_counter()
+                await asyncio.gather(*(caller() for _ in range(args.clients)))
+                elapsed = time.perf_counter() - start
+
+            timings.sort()
+            print(
+                f"{len(results):,} callbacks for {len(payments):,} payments in "
+                f"{elapsed:5.1f} s  {len(results) / elapsed:7,.0f}/s  "
+                f"p50 {statistics.median(timings):6.1f} ms  "
+                f"p99 {timings[int(len(timings) * 0.99) - 1]:6.1f} ms",
+            )
+            print(", ".join(f"{count:,} {name}" for name, count in outcomes.items()))
+
+            problems = []
+            async with db.engine.connect() as connection:
+                credited = set(
+                    (
+                        await connection.scalars(
+                            select(Transactions.id).where(
+                                Transactions.status == TransactionStatus.COMPLETED,
+                            ),
+                        )
+                    ).all(),
+                )
+                if credited != completed:
+                    problems.append(
+                        f"{len(credited):,} payments completed, "
+                        f"expected {len(completed):,}",
+                    )
+                receipts = (
+                    await connection.execute(select(func.count(OutboundMessages.id)))
+                ).scalar_one()
+                if receipts != len(completed):
+                    problems.append(
+                        f"{receipts:,} receipts queued, expected {len(completed):,}",
+                    )
+
+                paid = {}
+                for payment in payments:
+                    if payment["id"] in completed:
+                        paid.setdefault(payment["invoice_id"], Decimal(0))
+                        paid[payment["invoice_id"]] += payment["amount"]
+                fully_paid = {
+                    invoice_id
+                    for invoice_id, _, total in invoices
+                    if paid.get(invoice_id, 0)
+                    >= Decimal(total).quantize(Decimal("0.01"))
+                }
+                closed = set(
+                    (
+                        await connection.scalars(
+                            select(Invoices.id).where(
+                                Invoices.status == InvoiceStatus.PAID,
+                                Invoices.id.in_([row[0] for row in invoices]),
+                            ),
+                        )
+                    ).all(),
+                )
+                if closed != fully_paid:
+                    problems.append(
+                        f"{len(closed):,} invoices PAID, expected {len(fully_paid):,}",
+                    )
+                problems.extend(await connection.run_sync(balances.check))
+        finally:
+            app.dependency_overrides.clear()
+            await db.dispose()
+
+    for problem in problems[:20]:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print("no payment credited twice, every paid invoice closed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""Payment initiation benchmark.
+
+Seeds one organization with invoices in a scratch database and requests
+mobile money payments of the unpaid ones from many concurrent callers against
+the in-process ZenoPay stub. Callers get their PENDING transaction back
+without waiting for the stub, so initiation latency should stay flat as
+``--provider-latency-ms`` grows::
+
+    python -m benchmarks.payments --payments 2000 --provider-latency-ms 2000
+    python -m benchmarks.payments --database-url postgresql://.../bench --clients 50
+
+Orders the stub keeps failing end up FAILED (``--provider-error-rate``). The
+default database is a throwaway sqlite file, which serializes writers; use
+Postgres for many clients.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import func
+from sqlmodel import select
+
+from benchmarks.invoice_listing import seed
+from benchmarks.stubs import zenopay as stub
+from src.instrumentation import MeteredTransport
+from src.models.balances import UNPAID_STATUSES
+from src.models.database import Database
+from src.models.repository.payment import PaymentRepository
+from src.models.tables import Invoices, Transactions
+from src.services.payment import PaymentService
+from src.services.providers import providers
+from src.settings import DataBaseConfig, settings
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--provider-latency-ms", type=float, default=500)
+    parser.add_argument("--provider-error-rate", type=float, default=0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    stub.LATENCY_MS = args.provider_latency_ms
+    stub.ERROR_RATE = args.provider_error_rate
+    providers.register(
+        "zenopay_http",
+        lambda: httpx.AsyncClient(
+            transport=MeteredTransport("zenopay", httpx.ASGITransport(app=stub.app)),
+            base_url="http://zenopay",
+            headers={"x-api-key": settings.ZENOPAY_API_KEY},
+        ),
+        close=lambda client: client.aclose(),
+    )
+    settings.ZENOPAY_BUYER_EMAIL = "bench@example.com"
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        service = PaymentService(db)
+        try:
+            user_id = await seed(db, args.payments * 3, customers=1000)
+            async with db.session() as session:
+                invoice_ids = list(
+                    (
+                        await session.exec(
+                            select(Invoices.id)
+                            .where(Invoices.status.in_(UNPAID_STATUSES))
+                            .limit(args.payments),
+                        )
+                    ).all(),
+                )
+
+            queue = asyncio.Queue()
+            for invoice_id in invoice_ids:
+                queue.put_nowait(invoice_id)
+            timings = []
+
+            async def client() -> None:
+                while not queue.empty():
+                    invoice_id = queue.get_nowait()
+                    start = time.perf_counter()
+                    async with db.session() as session:
+                        invoice = await PaymentRepository(session).get_user_invoice(
+                            invoice_id,
+                            user_id,
+                        )
+                        await service.initiate(
+                            session,
+                            invoice,
+                            idempotency_key=f"bench:{invoice_id}",
+                        )
+                    timings.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client() for _ in range(args.clients)))
+            initiated = time.perf_counter() - start
+            await service.aclose(timeout=600)
+            submitted = time.perf_counter() - start
+
+            timings.sort()
+            print(
+                f"initiated {len(timings):,} payments in {initiated:5.1f} s  "
+                f"p50 {statistics.median(timings):7.1f} ms  "
+                f"p99 {timings[int(len(timings) * 0.99) - 1]:7.1f} ms",
+            )
+            print(
+                f"submitted {len(stub.orders):,} orders in {submitted:5.1f} s  "
+                f"({len(stub.orders) / submitted:,.0f}/s)",
+            )
+            async with db.session() as session:
+                statuses = (
+                    await session.exec(
+                        select(Transactions.status, func.count()).group_by(
+                            Transactions.status,
+                        ),
+                    )
+                ).all()
+            print(
+                ", ".join(f"{count:,} {status.value}" for status, count in statuses),
+            )
+        finally:
+            await providers.aclose()
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""Phone number normalization benchmark.
+
+Measures ``phone_number_validator`` throughput on a cold cache (every number
+parsed by phonenumbers) and a warm cache, and the batch API::
+
+    python -m benchmarks.phone_numbers --numbers 20000 --invalid-rate 0.05
+"""
+
+import argparse
+import contextlib
+import random
+import time
+from collections.abc import Callable
+
+from src.utils import (
+    normalize_phone_numbers,
+    phone_number_cache_clear,
+    phone_number_cache_info,
+    phone_number_validator,
+)
+
+PREFIXES = ("074", "075", "076", "065", "067", "068", "071", "+25578", "+25562")
+
+
+def make_numbers(count: int, invalid_rate: float, seed: int = 0) -> list[str]:
+    """Generate local and international Tanzanian numbers, some of them invalid."""
+    rng = random.Random(seed)
+    numbers = []
+    for _ in range(count):
+        if rng.random() < invalid_rate:
+            numbers.append(rng.choice(("12345", "not-a-number", "+2557")))
+        else:
+            numbers.append(f"{rng.choice(PREFIXES)}{rng.randrange(10**7):07d}")
+    return numbers
+
+
+def validate_all(numbers: list[str]) -> None:
+    """Validate numbers one at a time, as the request handlers do."""
+    for number in numbers:
+        with contextlib.suppress(ValueError):
+            phone_number_validator(number)
+
+
+def timed(label: str, numbers: list[str], func: Callable[[list[str]], object]) -> None:
+    """Run func over the numbers and print its throughput."""
+    start = time.perf_counter()
+    func(numbers)
+    elapsed = time.perf_counter() - start
+    rate = len(numbers) / elapsed
+    print(f"{label:<12} {elapsed * 1000:9.1f} ms  {rate:12,.0f} numbers/s")
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--numbers", type=int, default=20000)
+    parser.add_argument("--invalid-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    numbers = make_numbers(args.numbers, args.invalid_rate)
+
+    phone_number_cache_clear()
+    timed("cold", numbers, validate_all)
+    timed("warm", numbers, validate_all)
+
+    phone_number_cache_clear()
+    timed("batch cold", numbers, normalize_phone_numbers)
+    timed("batch warm", numbers, normalize_phone_numbers)
+
+    print(phone_number_cache_info())
+
+
+if __name__ == "__main__":
+    main()
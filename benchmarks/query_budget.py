@@ -0,0 +1,120 @@
+"""Query budget check for the invoice detail endpoint.
+
+Seeds an invoice with many items, payments and reminders in a scratch sqlite
+database, renders ``GET /api/invoices/{invoice_id}`` and counts the queries::
+
+    python -m benchmarks.query_budget --budget 4
+
+Fails when the endpoint runs more queries than the budget, so N+1
+regressions fail CI. The count doesn't depend on how many children the
+invoice has.
+"""
+
+import argparse
+import asyncio
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import SQLModel
+
+from src.models.database import Database
+from src.models.enums import InvoiceStatus, TransactionStatus
+from src.models.instrumentation import query_budget
+from src.models.tables import (
+    Customers,
+    InvoiceItems,
+    Invoices,
+    Organizations,
+    Reminders,
+    Transactions,
+    Users,
+)
+from src.routes.invoice import get_invoice
+from src.settings import DataBaseConfig
+
+
+async def seed(db: Database, children: int) -> tuple[Invoices, Users]:
+    """Create an invoice with the given number of items, payments and reminders."""
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with db.session() as session:
+        user = Users(phone_number="+255754000000", name="Bench")
+        organization = Organizations(owner_id=user.id, name="Bench")
+        customer = Customers(
+            organization_id=organization.id,
+            customer_code="C000001",
+            name="Customer",
+            phone="+255754000001",
+        )
+        invoice = Invoices(
+            invoice_number="INV-00000001",
+            customer_id=customer.id,
+            organization_id=organization.id,
+            created_by=user.id,
+            subtotal=Decimal(children * 10),
+            total_amount=Decimal(children * 10),
+            status=InvoiceStatus.SENT,
+        )
+        session.add_all([user, organization, customer, invoice])
+        for index in range(children):
+            session.add_all(
+                [
+                    InvoiceItems(
+                        invoice_id=invoice.id,
+                        description=f"Item {index}",
+                        quantity=Decimal(1),
+                        unit_price=Decimal(10),
+                        total_amount=Decimal(10),
+                    ),
+                    Transactions(
+                        transaction_number=f"TX-{index:08d}",
+                        invoice_id=invoice.id,
+                        customer_id=customer.id,
+                        amount=Decimal(1),
+                        status=TransactionStatus.COMPLETED,
+                    ),
+                    Reminders(
+                        invoice_id=invoice.id,
+                        customer_id=customer.id,
+                        sent_by=user.id,
+                        message=f"Reminder {index}",
+                    ),
+                ],
+            )
+        await session.commit()
+    return invoice, user
+
+
+async def main() -> None:
+    """Run the check."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=4)
+    parser.add_argument("--children", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            invoice, user = await seed(db, args.children)
+            async with db.session() as session:
+                with query_budget(args.budget) as counter:
+                    response = jsonable_encoder(
+                        await get_invoice(invoice.id, session, user.id),
+                    )
+        finally:
+            await db.dispose()
+
+    data = response["data"]
+    print(
+        f"invoice detail with {len(data['invoice_items'])} items, "
+        f"{len(data['transactions'])} payments and {len(data['reminders'])} "
+        f"reminders: {counter.count} queries (budget {args.budget})",
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
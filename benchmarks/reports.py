@@ -0,0 +1,107 @@
+"""Dashboard benchmark.
+
+Seeds one organization with many invoices in a scratch database, rebuilds the
+reporting rollups and compares dashboard latency against aging the invoices
+directly::
+
+    python -m benchmarks.reports --invoices 200000
+    python -m benchmarks.reports --database-url postgresql://.../bench
+
+The default database is a throwaway sqlite file; the schema is created
+directly from the models.
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import and_, case, func
+from sqlmodel import select
+
+from benchmarks.invoice_listing import seed
+from src.models import reports
+from src.models.database import Database
+from src.models.repository.report import AGING_BUCKETS
+from src.models.tables import Invoices, Organizations
+from src.schemas.report import DashboardQuery
+from src.services.reports import get_dashboard
+from src.settings import DataBaseConfig
+
+
+def scan_aging(organization_id, today: date):
+    """The aging query the rollups replace: every open invoice, every time."""
+    due_date = func.coalesce(Invoices.due_date, Invoices.issue_date)
+    columns = []
+    for name, fewest, most in AGING_BUCKETS:
+        conditions = []
+        if fewest is not None:
+            conditions.append(due_date <= today - timedelta(days=fewest))
+        if most is not None:
+            conditions.append(due_date >= today - timedelta(days=most))
+        amount = case((and_(*conditions), Invoices.total_amount), else_=0)
+        columns.append(func.coalesce(func.sum(amount), 0).label(name))
+    return (
+        select(Invoices.currency, func.count().label("invoices"), *columns)
+        .where(
+            Invoices.organization_id == organization_id,
+            Invoices.status.not_in(reports.NOT_INVOICED_STATUSES),
+        )
+        .group_by(Invoices.currency)
+    )
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{Path(directory) / 'bench.db'}"
+        db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+        try:
+            user_id = await seed(db, args.invoices, customers=1000)
+            async with db.session() as session:
+                organization_id = (
+                    await session.exec(
+                        select(Organizations.id).where(
+                            Organizations.owner_id == user_id,
+                        ),
+                    )
+                ).one()
+
+            start = time.perf_counter()
+            async with db.engine.begin() as connection:
+                await connection.run_sync(reports.rebuild)
+            elapsed = time.perf_counter() - start
+            rate = args.invoices / elapsed
+            print(f"rebuild   {elapsed:6.1f} s  {rate:9,.0f} invoices/s")
+
+            query = DashboardQuery(organization_id=organization_id)
+            today = date(2025, 6, 1)
+            for label, run in (
+                ("dashboard", lambda s: get_dashboard(s, query, today)),
+                ("scan", lambda s: s.exec(scan_aging(organization_id, today))),
+            ):
+                timings = []
+                async with db.session() as session:
+                    for _ in range(args.runs):
+                        start = time.perf_counter()
+                        await run(session)
+                        timings.append((time.perf_counter() - start) * 1000)
+                print(
+                    f"{label:<9} p50 {statistics.median(timings):8.2f} ms  "
+                    f"max {max(timings):8.2f} ms",
+                )
+        finally:
+            await db.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Cold-start benchmark for ``src.main:app``.
+
+Imports the app in fresh interpreters with ``python -X importtime`` and
+reports the cumulative import time plus the slowest modules::
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1500
+
+Exits non-zero when the median import time is over the budget, so it can
+guard against startup regressions in CI.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+TARGET = "src.main"
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[int, int]]:
+    """Parse ``-X importtime`` output into {module: (self_us, cumulative_us)}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once() -> dict[str, tuple[int, int]]:
+    """Import the app in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {TARGET}"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        msg = f"Importing {TARGET} failed"
+        raise SystemExit(msg)
+    return parse_importtime(result.stderr)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    totals_ms = [run[TARGET][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+
+    print(f"{TARGET} import time over {args.runs} runs")
+    print(f"  min {min(totals_ms):.1f} ms  median {median_ms:.1f} ms")
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)
+    print(f"\nslowest {args.top} modules by self time (last run)")
+    for name, (self_us, cumulative_us) in slowest[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        msg = f"Median import time {median_ms:.1f} ms is over the {args.budget_ms} ms budget"
+        raise SystemExit(msg)
+
+
+if __name__ == "__main__":
+    main()
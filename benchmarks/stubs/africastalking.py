@@ -0,0 +1,78 @@
+"""Stub of the AfricasTalking SMS API.
+
+Run it and point the app at it::
+
+    uvicorn benchmarks.stubs.africastalking:app --port 9001
+    AT_API_URL=http://127.0.0.1:9001 uvicorn src.main:app
+
+or mount it in-process with ``httpx.ASGITransport(app=app)``.
+
+``STUB_LATENCY_MS`` adds a delay to every request, ``STUB_ERROR_RATE`` makes
+that fraction of requests fail with a 503 and ``STUB_RECIPIENT_ERROR_RATE``
+marks that fraction of recipients as failed with a retryable status.
+"""
+
+import asyncio
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Form, Header, HTTPException, Response
+
+app = FastAPI(title="AfricasTalking stub")
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+RECIPIENT_ERROR_RATE = float(os.getenv("STUB_RECIPIENT_ERROR_RATE", "0"))
+
+# Every accepted message, so callers can assert what was sent.
+sent: list[dict] = []
+
+
+def _recipient(number: str) -> dict:
+    if random.random() < RECIPIENT_ERROR_RATE:
+        return {
+            "cost": "0",
+            "number": number,
+            "status": "InternalServerError",
+            "statusCode": 500,
+            "messageId": "None",
+        }
+    return {
+        "cost": "TZS 20.0000",
+        "number": number,
+        "status": "Success",
+        "statusCode": 101,
+        "messageId": f"ATXid_{uuid.uuid4().hex}",
+    }
+
+
+@app.post("/version1/messaging", status_code=201)
+async def messaging(
+    username: str = Form(...),
+    to: str = Form(...),
+    message: str = Form(...),
+    apikey: str = Header(default=""),
+) -> dict:
+    """Accept an SMS send request."""
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if not apikey:
+        raise HTTPException(
+            status_code=401, detail="The supplied authentication is invalid"
+        )
+    if random.random() < ERROR_RATE:
+        return Response(status_code=503)
+
+    recipients = [_recipient(number) for number in to.split(",")]
+    sent.extend(
+        {"username": username, "number": recipient["number"], "message": message}
+        for recipient in recipients
+        if recipient["statusCode"] == 101
+    )
+    return {
+        "SMSMessageData": {
+            "Message": f"Sent to {len(recipients)}/{len(recipients)}",
+            "Recipients": recipients,
+        },
+    }
@@ -0,0 +1,128 @@
+"""Stub of the ZenoPay mobile money API.
+
+Run it and point the app at it::
+
+    uvicorn benchmarks.stubs.zenopay:app --port 9002
+    ZENOPAY_API_URL=http://127.0.0.1:9002 uvicorn src.main:app
+
+or mount it in-process with ``httpx.ASGITransport(app=app)``.
+
+``STUB_LATENCY_MS`` adds a delay to every request and ``STUB_ERROR_RATE``
+makes that fraction of requests fail with a 503. When an order has a
+``webhook_url``, the stub posts its result there ``STUB_PUSH_DELAY_MS`` later,
+as ZenoPay does once the customer answers the prompt; ``STUB_DECLINE_RATE``
+is the fraction of customers who decline.
+"""
+
+import asyncio
+import os
+import random
+import uuid
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Header, HTTPException, Response
+from pydantic import BaseModel
+
+app = FastAPI(title="ZenoPay stub")
+
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "0"))
+ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+PUSH_DELAY_MS = float(os.getenv("STUB_PUSH_DELAY_MS", "1000"))
+DECLINE_RATE = float(os.getenv("STUB_DECLINE_RATE", "0"))
+
+# Every accepted order by ID, so callers can assert what was requested.
+orders: dict[str, dict] = {}
+_webhooks: set[asyncio.Task] = set()
+
+
+class Order(BaseModel):
+    """Mobile money order."""
+
+    order_id: str
+    buyer_email: str
+    buyer_name: str
+    buyer_phone: str
+    amount: int
+    webhook_url: Optional[str] = None
+
+
+async def _notify(order: dict, api_key: str) -> None:
+    """Post the order's outcome to its webhook, as ZenoPay does."""
+    await asyncio.sleep(PUSH_DELAY_MS / 1000)
+    declined = random.random() < DECLINE_RATE
+    order["payment_status"] = "FAILED" if declined else "COMPLETED"
+    order["reference"] = f"{random.randrange(10**9, 10**10)}"
+    payload = {
+        "order_id": order["order_id"],
+        "payment_status": order["payment_status"],
+        "reference": order["reference"],
+        "metadata": {},
+    }
+    async with httpx.AsyncClient() as client:
+        await client.post(
+            order["webhook_url"],
+            json=payload,
+            headers={"x-api-key": api_key},
+        )
+
+
+@app.post("/api/payments/mobile_money_tanzania")
+async def create_order(
+    order: Order,
+    x_api_key: str = Header(default=""),
+) -> dict:
+    """Accept an order and push it to the buyer's phone."""
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    if random.random() < ERROR_RATE:
+        return Response(status_code=503)
+
+    orders[order.order_id] = {
+        **order.model_dump(),
+        "payment_status": "PENDING",
+        "reference": None,
+        "transid": uuid.uuid4().hex,
+    }
+    if order.webhook_url:
+        task = asyncio.create_task(_notify(orders[order.order_id], x_api_key))
+        _webhooks.add(task)
+        task.add_done_callback(_webhooks.discard)
+    return {
+        "status": "success",
+        "resultcode": "000",
+        "message": "Request in progress. You will receive a callback shortly",
+        "order_id": order.order_id,
+    }
+
+
+@app.get("/api/payments/order-status")
+async def order_status(
+    order_id: str,
+    x_api_key: str = Header(default=""),
+) -> dict:
+    """Report an order's payment status."""
+    if not x_api_key:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    order = orders.get(order_id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return {
+        "reference": order["reference"],
+        "resultcode": "000",
+        "result": "SUCCESS",
+        "message": "Order fetch successful",
+        "data": [
+            {
+                "order_id": order_id,
+                "amount": str(order["amount"]),
+                "payment_status": order["payment_status"],
+                "transid": order["transid"],
+                "channel": "MPESA-TZ",
+                "reference": order["reference"],
+                "msisdn": order["buyer_phone"],
+            },
+        ],
+    }
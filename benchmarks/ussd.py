@@ -0,0 +1,104 @@
+"""USSD menu benchmark.
+
+Drives the invoice USSD flow (main menu, outstanding balance, pay now) through
+the menu engine and reports hops per second for a single worker::
+
+    python -m benchmarks.ussd --sessions 20000
+    python -m benchmarks.ussd --sessions 2000 --redis-url redis://localhost:6379/15
+
+Without ``--redis-url`` sessions are kept in the in-memory store, and without
+``--with-db`` balances come from a stub instead of the database, which
+measures the engine itself.
+"""
+
+import argparse
+import asyncio
+import time
+from dataclasses import replace
+
+from src.services.africastalking.menu import Hop, MenuEngine, State
+from src.services.africastalking.sessions import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionStore,
+)
+from src.services.africastalking.ussd import INVOICE_MENU
+
+# User input for each hop of a session.
+FLOW = ("", "1", "1")
+
+
+async def stub_outstanding(hop: Hop) -> dict:
+    """Balance loader that skips the database."""
+    return {"outstanding": "150.00"}
+
+
+async def run(
+    states: list[State],
+    store: SessionStore,
+    sessions: int,
+    concurrency: int,
+) -> float:
+    """Run the flow for every session, returning the elapsed seconds."""
+    engine = MenuEngine(states, start="main_menu", session_store=store)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session(index: int) -> None:
+        async with semaphore:
+            for user_input in FLOW:
+                response = await engine.handle_request(
+                    session_id=f"bench-{index}",
+                    user_input=user_input,
+                    phone_number="+255754100098",
+                )
+            if not response.startswith("END Payment"):
+                msg = f"Unexpected response: {response!r}"
+                raise RuntimeError(msg)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--redis-url")
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+
+    states = list(INVOICE_MENU)
+    if not args.with_db:
+        states = [
+            replace(state, on_enter=stub_outstanding) if state.on_enter else state
+            for state in states
+        ]
+
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        client = Redis.from_url(args.redis_url, decode_responses=True)
+        store = RedisSessionStore(client=client, prefix="bench:ussd:")
+    else:
+        client = None
+        store = MemorySessionStore(max_size=args.sessions)
+
+    try:
+        elapsed = await run(states, store, args.sessions, args.concurrency)
+    finally:
+        if client is not None:
+            await client.aclose()
+        if args.with_db:
+            from src.models.database import database
+
+            await database.dispose()
+
+    hops = args.sessions * len(FLOW)
+    print(f"{hops} hops in {elapsed:.2f} s: {hops / elapsed:,.0f} hops/s")
+    print(f"{elapsed / hops * 1e6:.1f} us per hop")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,370 @@
+"""Initial schema.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 06:42:06.320648
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ENUM_TYPES = (
+    "invoicestatus",
+    "paymentmethod",
+    "reminderstatus",
+    "remindertype",
+    "transactionstatus",
+)
+
+
+def _existing_tables() -> set[str]:
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def _create_table(
+    name: str,
+    *elements: sa.schema.SchemaItem,
+    indexes: tuple[tuple[str, bool], ...] = (),
+) -> None:
+    """Create a table and its single column indexes unless it already exists."""
+    if name in _existing_tables():
+        return
+
+    op.create_table(name, *elements)
+    for column, unique in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column], unique=unique)
+
+
+def upgrade() -> None:
+    """Create the baseline tables.
+
+    Databases created before migrations were introduced got their tables from
+    ``SQLModel.metadata.create_all`` at import time. Tables that already exist
+    are left untouched so those databases are adopted rather than rejected.
+    """
+    _create_table(
+        "otp_verifications",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("phone", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column(
+            "otp_code", sqlmodel.sql.sqltypes.AutoString(length=6), nullable=False
+        ),
+        sa.Column("is_verified", sa.Boolean(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(("phone", False),),
+    )
+
+    _create_table(
+        "users",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "phone_number", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False
+        ),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=False),
+        sa.Column("email", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("last_login", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(("phone_number", True),),
+    )
+
+    _create_table(
+        "organizations",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("owner_id", sa.Uuid(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column(
+            "business_type", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True
+        ),
+        sa.Column(
+            "contact_email", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column(
+            "contact_phone", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=True
+        ),
+        sa.Column(
+            "address_line1", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column(
+            "address_line2", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column("city", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column(
+            "postal_code", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=True
+        ),
+        sa.Column(
+            "country", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True
+        ),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["owner_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(("owner_id", False),),
+    )
+
+    _create_table(
+        "customers",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "customer_code", sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False
+        ),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("email", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True),
+        sa.Column("phone", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=False),
+        sa.Column(
+            "address_line", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True
+        ),
+        sa.Column("city", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column("state", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True),
+        sa.Column(
+            "postal_code", sqlmodel.sql.sqltypes.AutoString(length=20), nullable=True
+        ),
+        sa.Column(
+            "country", sqlmodel.sql.sqltypes.AutoString(length=100), nullable=True
+        ),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(
+            ("customer_code", True),
+            ("organization_id", False),
+        ),
+    )
+
+    _create_table(
+        "services",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("cost", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column(
+            "currency", sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False
+        ),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(("organization_id", False),),
+    )
+
+    _create_table(
+        "invoices",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "invoice_number",
+            sqlmodel.sql.sqltypes.AutoString(length=50),
+            nullable=False,
+        ),
+        sa.Column("customer_id", sa.Uuid(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("created_by", sa.Uuid(), nullable=False),
+        sa.Column("subtotal", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("tax_amount", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("total_amount", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column(
+            "currency", sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False
+        ),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "DRAFT", "SENT", "PAID", "OVERDUE", "CANCELLED", name="invoicestatus"
+            ),
+            nullable=False,
+        ),
+        sa.Column("issue_date", sa.Date(), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["created_by"],
+            ["users.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["customer_id"],
+            ["customers.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(
+            ("created_by", False),
+            ("customer_id", False),
+            ("invoice_number", True),
+            ("organization_id", False),
+        ),
+    )
+
+    _create_table(
+        "invoice_items",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("invoice_id", sa.Uuid(), nullable=False),
+        sa.Column("service_id", sa.Uuid(), nullable=True),
+        sa.Column(
+            "description", sqlmodel.sql.sqltypes.AutoString(length=500), nullable=False
+        ),
+        sa.Column("quantity", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("unit_price", sa.Numeric(precision=10, scale=2), nullable=False),
+        sa.Column("total_amount", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["invoice_id"],
+            ["invoices.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["service_id"],
+            ["services.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(("invoice_id", False),),
+    )
+
+    _create_table(
+        "reminders",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("invoice_id", sa.Uuid(), nullable=False),
+        sa.Column("customer_id", sa.Uuid(), nullable=False),
+        sa.Column("sent_by", sa.Uuid(), nullable=False),
+        sa.Column(
+            "type", sa.Enum("SMS", "EMAIL", "CALL", name="remindertype"), nullable=False
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("PENDING", "SENT", "DELIVERED", "FAILED", name="reminderstatus"),
+            nullable=False,
+        ),
+        sa.Column(
+            "message", sqlmodel.sql.sqltypes.AutoString(length=1000), nullable=False
+        ),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("scheduled_for", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["customer_id"],
+            ["customers.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["invoice_id"],
+            ["invoices.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["sent_by"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(
+            ("customer_id", False),
+            ("invoice_id", False),
+            ("sent_by", False),
+        ),
+    )
+
+    _create_table(
+        "transactions",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "transaction_number",
+            sqlmodel.sql.sqltypes.AutoString(length=50),
+            nullable=False,
+        ),
+        sa.Column("invoice_id", sa.Uuid(), nullable=False),
+        sa.Column("customer_id", sa.Uuid(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column(
+            "currency", sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False
+        ),
+        sa.Column(
+            "payment_method",
+            sa.Enum(
+                "CASH", "CARD", "BANK_TRANSFER", "MOBILE_MONEY", name="paymentmethod"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING", "COMPLETED", "FAILED", "REFUNDED", name="transactionstatus"
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "reference_number",
+            sqlmodel.sql.sqltypes.AutoString(length=100),
+            nullable=True,
+        ),
+        sa.Column("notes", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("transaction_date", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["customer_id"],
+            ["customers.id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["invoice_id"],
+            ["invoices.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        indexes=(
+            ("customer_id", False),
+            ("invoice_id", False),
+            ("transaction_number", True),
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Drop the baseline tables."""
+    op.drop_table("transactions")
+    op.drop_table("reminders")
+    op.drop_table("invoice_items")
+    op.drop_table("invoices")
+    op.drop_table("services")
+    op.drop_table("customers")
+    op.drop_table("organizations")
+    op.drop_table("users")
+    op.drop_table("otp_verifications")
+
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ENUM_TYPES:
+            sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,92 @@
+"""Outbound message queue.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 06:46:10.461606
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_enum(*values: str, name: str) -> sa.Enum:
+    """Enum type that was already created with the reminders table."""
+    return sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False),
+        "postgresql",
+    )
+
+
+def upgrade() -> None:
+    """Create the outbound_messages table."""
+    op.create_table(
+        "outbound_messages",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column(
+            "channel",
+            _existing_enum("SMS", "EMAIL", "CALL", name="remindertype"),
+            nullable=False,
+        ),
+        sa.Column(
+            "recipient",
+            sqlmodel.sql.sqltypes.AutoString(length=20),
+            nullable=False,
+        ),
+        sa.Column(
+            "message",
+            sqlmodel.sql.sqltypes.AutoString(length=1000),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            _existing_enum(
+                "PENDING", "SENT", "DELIVERED", "FAILED", name="reminderstatus"
+            ),
+            nullable=False,
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "provider_message_id",
+            sqlmodel.sql.sqltypes.AutoString(length=100),
+            nullable=True,
+        ),
+        sa.Column(
+            "last_error",
+            sqlmodel.sql.sqltypes.AutoString(length=500),
+            nullable=True,
+        ),
+        sa.Column("reminder_id", sa.Uuid(), nullable=True),
+        sa.ForeignKeyConstraint(["reminder_id"], ["reminders.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_outbound_messages_reminder_id",
+        "outbound_messages",
+        ["reminder_id"],
+    )
+    op.create_index(
+        "ix_outbound_messages_status_available_at",
+        "outbound_messages",
+        ["status", "available_at"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the outbound_messages table."""
+    op.drop_table("outbound_messages")
@@ -0,0 +1,53 @@
+"""Customer balance projection.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 06:53:11.075888
+
+Populate it afterwards with ``python -m src.models.balances rebuild``.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the customer_balances table."""
+    op.create_table(
+        "customer_balances",
+        sa.Column("customer_id", sa.Uuid(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "phone",
+            sqlmodel.sql.sqltypes.AutoString(length=20),
+            nullable=True,
+        ),
+        sa.Column("invoiced_total", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("paid_total", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("outstanding", sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["customer_id"], ["customers.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.PrimaryKeyConstraint("customer_id"),
+    )
+    op.create_index(
+        "ix_customer_balances_organization_id",
+        "customer_balances",
+        ["organization_id"],
+    )
+    op.create_index("ix_customer_balances_phone", "customer_balances", ["phone"])
+
+
+def downgrade() -> None:
+    """Drop the customer_balances table."""
+    op.drop_table("customer_balances")
@@ -0,0 +1,51 @@
+"""Invoice listing indexes.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 06:55:11.350015
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = {
+    "ix_invoices_organization_id_issue_date_id": [
+        "organization_id",
+        "issue_date",
+        "id",
+    ],
+    "ix_invoices_organization_id_status_issue_date_id": [
+        "organization_id",
+        "status",
+        "issue_date",
+        "id",
+    ],
+    "ix_invoices_customer_id_issue_date_id": ["customer_id", "issue_date", "id"],
+    "ix_invoices_organization_id_due_date": ["organization_id", "due_date"],
+}
+
+
+def upgrade() -> None:
+    """Add the composite indexes backing the invoice listing.
+
+    Built concurrently on Postgres, so invoices stay writable meanwhile.
+    """
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(name, "invoices", columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Drop the invoice listing indexes."""
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(name, table_name="invoices", postgresql_concurrently=True)
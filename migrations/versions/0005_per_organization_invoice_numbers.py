@@ -0,0 +1,98 @@
+"""Per-organization invoice numbers.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 06:57:35.314327
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from src.settings import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Make invoice numbers unique per organization and add their counters."""
+    op.create_table(
+        "invoice_counters",
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("next_value", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.PrimaryKeyConstraint("organization_id"),
+    )
+    # continue numbering after the highest number in the allocator's format
+    # each organization has; counting invoices collides with sparse numbers
+    prefix = settings.INVOICE_NUMBER_PREFIX
+    invoices = sa.table(
+        "invoices",
+        sa.column("organization_id", sa.Uuid()),
+        sa.column("invoice_number", sa.String()),
+    )
+    digits = sa.func.substr(invoices.c.invoice_number, len(prefix) + 1)
+    op.execute(
+        sa.table(
+            "invoice_counters",
+            sa.column("organization_id", sa.Uuid()),
+            sa.column("next_value", sa.Integer()),
+        )
+        .insert()
+        .from_select(
+            ["organization_id", "next_value"],
+            sa.select(
+                invoices.c.organization_id,
+                sa.func.max(sa.cast(digits, sa.Integer)) + 1,
+            )
+            .where(
+                invoices.c.invoice_number.startswith(prefix, autoescape=True),
+                digits.regexp_match("^[0-9]{1,9}$"),
+            )
+            .group_by(invoices.c.organization_id),
+        ),
+    )
+
+    # the new index is in place before the old one goes, and both are built
+    # and dropped without blocking writes on Postgres
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_organization_id_invoice_number",
+            "invoices",
+            ["organization_id", "invoice_number"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_invoices_invoice_number",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Make invoice numbers globally unique again and drop the counters.
+
+    Fails if organizations share invoice numbers.
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_invoice_number",
+            "invoices",
+            ["invoice_number"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_invoices_organization_id_invoice_number",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
+    op.drop_table("invoice_counters")
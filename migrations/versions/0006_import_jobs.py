@@ -0,0 +1,72 @@
+"""Bulk invoice import jobs.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 07:07:24.514582
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+import_status = sa.Enum(
+    "PENDING",
+    "RUNNING",
+    "COMPLETED",
+    "FAILED",
+    name="importstatus",
+)
+
+
+def upgrade() -> None:
+    """Create the import_jobs table."""
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column("created_by", sa.Uuid(), nullable=False),
+        sa.Column(
+            "filename",
+            sqlmodel.sql.sqltypes.AutoString(length=255),
+            nullable=True,
+        ),
+        sa.Column(
+            "format",
+            sqlmodel.sql.sqltypes.AutoString(length=10),
+            nullable=False,
+        ),
+        sa.Column("status", import_status, nullable=False),
+        sa.Column("rows_processed", sa.Integer(), nullable=False),
+        sa.Column("invoices_imported", sa.Integer(), nullable=False),
+        sa.Column("customers_created", sa.Integer(), nullable=False),
+        sa.Column("rows_failed", sa.Integer(), nullable=False),
+        sa.Column("errors", sa.JSON(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["created_by"], ["users.id"]),
+        sa.ForeignKeyConstraint(["organization_id"], ["organizations.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_import_jobs_organization_id",
+        "import_jobs",
+        ["organization_id"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the import_jobs table."""
+    op.drop_index("ix_import_jobs_organization_id", table_name="import_jobs")
+    op.drop_table("import_jobs")
+    import_status.drop(op.get_bind(), checkfirst=True)
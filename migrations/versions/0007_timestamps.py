@@ -0,0 +1,96 @@
+"""Per-row timestamps and updated_at indexes.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 07:20:41.118025
+
+On Postgres 12 and later, with the session in UTC, changing ``timestamp`` to
+``timestamptz`` only updates the catalog: each ALTER takes an ACCESS
+EXCLUSIVE lock on its table for a moment and rewrites nothing. Older
+versions rewrite all eleven tables under that lock, so plan downtime for
+them. The indexes are built concurrently.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables with created_at and updated_at columns.
+TABLES = (
+    "users",
+    "organizations",
+    "customers",
+    "services",
+    "invoices",
+    "invoice_items",
+    "transactions",
+    "reminders",
+    "outbound_messages",
+    "import_jobs",
+    "otp_verifications",
+)
+
+INDEXES = (
+    ("ix_customers_organization_id_updated_at", "customers", ["organization_id"]),
+    ("ix_invoices_organization_id_updated_at", "invoices", ["organization_id"]),
+    ("ix_invoice_items_updated_at", "invoice_items", []),
+    ("ix_transactions_updated_at", "transactions", []),
+)
+
+
+def _utc_session() -> None:
+    """Read naive timestamps as UTC, which lets Postgres skip the rewrite."""
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("SET LOCAL TIME ZONE 'UTC'")
+
+
+def upgrade() -> None:
+    """Store timestamps with their time zone, defaulting to the database time.
+
+    Existing values were written in UTC.
+    """
+    _utc_session()
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            for column in ("created_at", "updated_at"):
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.DateTime(),
+                    type_=sa.DateTime(timezone=True),
+                    existing_nullable=False,
+                    server_default=sa.func.now(),
+                )
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                [*columns, "updated_at"],
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    """Drop the indexes and go back to naive UTC timestamps."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    _utc_session()
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            for column in ("created_at", "updated_at"):
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.DateTime(timezone=True),
+                    type_=sa.DateTime(),
+                    existing_nullable=False,
+                    server_default=None,
+                )
@@ -0,0 +1,140 @@
+"""Reporting rollups.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 07:31:12.402311
+
+The rollups start empty; the refresher fills them from the first change on.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _money(precision: int) -> sa.Numeric:
+    return sa.Numeric(precision=precision, scale=2)
+
+
+def upgrade() -> None:
+    """Create the rollup tables and the indexes they read."""
+    op.create_table(
+        "receivables_by_due_date",
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "currency",
+            sqlmodel.sql.sqltypes.AutoString(length=3),
+            nullable=False,
+        ),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("invoices", sa.Integer(), nullable=False),
+        sa.Column("outstanding", _money(14), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("organization_id", "currency", "due_date"),
+    )
+    op.create_table(
+        "cash_flow_by_month",
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "currency",
+            sqlmodel.sql.sqltypes.AutoString(length=3),
+            nullable=False,
+        ),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("invoiced", _money(14), nullable=False),
+        sa.Column("collected", _money(14), nullable=False),
+        sa.Column("outstanding", _money(14), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"],
+            ["organizations.id"],
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("organization_id", "currency", "month"),
+    )
+    op.create_table(
+        "invoice_rollups",
+        sa.Column("invoice_id", sa.Uuid(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "currency",
+            sqlmodel.sql.sqltypes.AutoString(length=3),
+            nullable=False,
+        ),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("is_open", sa.Boolean(), nullable=False),
+        sa.Column("invoiced", _money(12), nullable=False),
+        sa.Column("outstanding", _money(12), nullable=False),
+        sa.PrimaryKeyConstraint("invoice_id"),
+    )
+    op.create_table(
+        "transaction_rollups",
+        sa.Column("transaction_id", sa.Uuid(), nullable=False),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "currency",
+            sqlmodel.sql.sqltypes.AutoString(length=3),
+            nullable=False,
+        ),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("collected", _money(12), nullable=False),
+        sa.PrimaryKeyConstraint("transaction_id"),
+    )
+    op.create_table(
+        "watermarks",
+        sa.Column(
+            "name",
+            sqlmodel.sql.sqltypes.AutoString(length=100),
+            nullable=False,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("row_id", sa.Uuid(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    # on live tables, so built without blocking writes on Postgres
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_updated_at",
+            "invoices",
+            ["updated_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_customer_balances_organization_id_outstanding",
+            "customer_balances",
+            ["organization_id", "outstanding"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the rollup tables and their indexes."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_customer_balances_organization_id_outstanding",
+            table_name="customer_balances",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_invoices_updated_at",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
+    op.drop_table("watermarks")
+    op.drop_table("transaction_rollups")
+    op.drop_table("invoice_rollups")
+    op.drop_table("cash_flow_by_month")
+    op.drop_table("receivables_by_due_date")
@@ -0,0 +1,39 @@
+"""Overdue sweep index.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 07:24:36.285400
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index invoices by status and due date, built without blocking writes."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_invoices_status_due_date",
+            "invoices",
+            ["status", "due_date"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_invoices_status_due_date",
+            table_name="invoices",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,53 @@
+"""Payment idempotency keys.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 07:52:40.118305
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0010"
+down_revision: Union[str, Sequence[str], None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add transactions.idempotency_key with a unique index."""
+    op.add_column(
+        "transactions",
+        sa.Column(
+            "idempotency_key",
+            sqlmodel.sql.sqltypes.AutoString(length=100),
+            nullable=True,
+        ),
+    )
+    # every key is NULL yet, but the build still scans the live table
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_transactions_idempotency_key",
+            "transactions",
+            ["idempotency_key"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop transactions.idempotency_key."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_transactions_idempotency_key",
+            table_name="transactions",
+            postgresql_concurrently=True,
+        )
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_column("idempotency_key")
@@ -0,0 +1,43 @@
+"""Unique payment references.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 08:14:02.517906
+
+Fails if transactions already share a reference_number; clear or correct the
+duplicates first. On Postgres the index is built concurrently and a failed
+build leaves it INVALID: drop it before running the upgrade again.
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0011"
+down_revision: Union[str, Sequence[str], None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index transactions.reference_number uniquely, without blocking writes."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_transactions_reference_number",
+            "transactions",
+            ["reference_number"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_transactions_reference_number",
+            table_name="transactions",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,73 @@
+"""Hashed OTP codes.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 07:43:04.629905
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0012"
+down_revision: Union[str, Sequence[str], None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Replace plain OTP codes with their HMAC and index live codes by phone.
+
+    Existing rows are deleted: nothing verified them, and their codes can't
+    be hashed with the phone they were sent to after the fact.
+    """
+    op.execute("DELETE FROM otp_verifications")
+    with op.batch_alter_table("otp_verifications") as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "code_hash",
+                sqlmodel.sql.sqltypes.AutoString(length=64),
+                nullable=False,
+            ),
+        )
+        batch_op.drop_column("otp_code")
+        batch_op.alter_column(
+            "expires_at",
+            existing_type=sa.DateTime(),
+            type_=sa.DateTime(timezone=True),
+            existing_nullable=False,
+        )
+        batch_op.drop_index("ix_otp_verifications_phone")
+        batch_op.create_index(
+            "ix_otp_verifications_phone_expires_at",
+            ["phone", "expires_at"],
+        )
+        batch_op.create_index("ix_otp_verifications_expires_at", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Go back to plain codes, deleting the hashed ones."""
+    op.execute("DELETE FROM otp_verifications")
+    with op.batch_alter_table("otp_verifications") as batch_op:
+        batch_op.drop_index("ix_otp_verifications_expires_at")
+        batch_op.drop_index("ix_otp_verifications_phone_expires_at")
+        batch_op.create_index("ix_otp_verifications_phone", ["phone"])
+        batch_op.alter_column(
+            "expires_at",
+            existing_type=sa.DateTime(timezone=True),
+            type_=sa.DateTime(),
+            existing_nullable=False,
+        )
+        batch_op.add_column(
+            sa.Column(
+                "otp_code",
+                sqlmodel.sql.sqltypes.AutoString(length=6),
+                nullable=False,
+            ),
+        )
+        batch_op.drop_column("code_hash")
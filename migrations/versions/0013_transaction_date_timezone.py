@@ -0,0 +1,52 @@
+"""Transaction dates with their time zone.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 09:12:37.402113
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0013"
+down_revision: Union[str, Sequence[str], None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _utc_session() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("SET LOCAL TIME ZONE 'UTC'")
+
+
+def upgrade() -> None:
+    """Store transaction dates with their time zone, like the timestamps.
+
+    Existing values were written in UTC. Read as UTC, the change needs no
+    table rewrite on Postgres 12 and later.
+    """
+    _utc_session()
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.alter_column(
+            "transaction_date",
+            existing_type=sa.DateTime(),
+            type_=sa.DateTime(timezone=True),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    """Go back to naive UTC transaction dates."""
+    _utc_session()
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.alter_column(
+            "transaction_date",
+            existing_type=sa.DateTime(timezone=True),
+            type_=sa.DateTime(),
+            existing_nullable=False,
+        )
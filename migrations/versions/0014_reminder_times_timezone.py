@@ -0,0 +1,56 @@
+"""Reminder times with their time zone.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 09:20:05.885316
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0014"
+down_revision: Union[str, Sequence[str], None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("sent_at", "scheduled_for")
+
+
+def _utc_session() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("SET LOCAL TIME ZONE 'UTC'")
+
+
+def upgrade() -> None:
+    """Store when reminders are due and sent with their time zone.
+
+    Existing values were written in UTC. Read as UTC, the change needs no
+    table rewrite on Postgres 12 and later.
+    """
+    _utc_session()
+    with op.batch_alter_table("reminders") as batch_op:
+        for column in COLUMNS:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.DateTime(),
+                type_=sa.DateTime(timezone=True),
+                existing_nullable=True,
+            )
+
+
+def downgrade() -> None:
+    """Go back to naive UTC reminder times."""
+    _utc_session()
+    with op.batch_alter_table("reminders") as batch_op:
+        for column in COLUMNS:
+            batch_op.alter_column(
+                column,
+                existing_type=sa.DateTime(timezone=True),
+                type_=sa.DateTime(),
+                existing_nullable=True,
+            )
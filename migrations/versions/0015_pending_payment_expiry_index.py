@@ -0,0 +1,39 @@
+"""Index for expiring PENDING payments.
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18 09:48:51.207334
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0015"
+down_revision: Union[str, Sequence[str], None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index transactions by status and age, built without blocking writes."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_transactions_status_created_at",
+            "transactions",
+            ["status", "created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_transactions_status_created_at",
+            table_name="transactions",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,39 @@
+"""Index customers by phone number.
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-18 11:02:14.583901
+
+"""
+
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0016"
+down_revision: Union[str, Sequence[str], None] = "0015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index customers by organization and phone, built without blocking writes."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_customers_organization_id_phone",
+            "customers",
+            ["organization_id", "phone"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Drop the index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_customers_organization_id_phone",
+            table_name="customers",
+            postgresql_concurrently=True,
+        )
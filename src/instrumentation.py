@@ -0,0 +1,331 @@
+"""Request instrumentation: latency metrics, database time and JSON logs.
+
+``RequestMetricsMiddleware`` gives every request an ID (taken from an
+``X-Request-ID`` header when the caller sends a sane one), records its
+latency, status and in-flight count by route template, and logs one JSON line
+when it finishes. Time spent in database queries is added up per request by
+engine events, and outbound HTTP calls are timed by ``MeteredTransport``.
+Everything is exposed at ``/metrics``.
+
+Every log record carries the ID of the request it was written in, so the
+lines of one slow request can be found together.
+"""
+
+import contextvars
+import json
+import logging
+import re
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import counter, gauge, histogram
+from src.settings import settings
+
+access_logger = logging.getLogger("src.access")
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+REQUESTS = counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ("method", "route", "status"),
+)
+REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last of its response.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = gauge(
+    "http_requests_in_progress",
+    "HTTP requests being handled.",
+    ("method",),
+)
+REQUEST_DB_SECONDS = histogram(
+    "http_request_db_seconds",
+    "Time a request spent waiting on database queries.",
+    ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_SECONDS = histogram(
+    "db_query_duration_seconds",
+    "Time taken by each database query, in or outside a request.",
+    buckets=LATENCY_BUCKETS,
+)
+OUTBOUND_SECONDS = histogram(
+    "outbound_request_duration_seconds",
+    "Time until the response headers of calls to external APIs, per attempt.",
+    ("service", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+
+# Route label of requests no route matched, so scanners can't add labels.
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_ID_HEADER = "x-request-id"
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+
+class RequestContext:
+    """What is known about the request being handled."""
+
+    __slots__ = ("db_queries", "db_seconds", "queries", "request_id")
+
+    def __init__(self, request_id: str) -> None:
+        """Initialize."""
+        self.request_id = request_id
+        self.db_seconds = 0.0
+        self.db_queries = 0
+        # set to a list to capture each statement, e.g. while profiling
+        self.queries: Optional[list[dict]] = None
+
+
+_current_request: contextvars.ContextVar[Optional[RequestContext]] = (
+    contextvars.ContextVar("current_request", default=None)
+)
+
+
+def current_request() -> Optional[RequestContext]:
+    """Get the context of the request being handled, if any."""
+    return _current_request.get()
+
+
+def _request_id(scope: Scope) -> str:
+    """The caller's request ID if it looks like one, otherwise a new one."""
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER.encode():
+            request_id = value.decode("latin-1")
+            if REQUEST_ID_PATTERN.fullmatch(request_id):
+                return request_id
+            break
+    return uuid.uuid4().hex
+
+
+class RequestMetricsMiddleware:
+    """Record each HTTP request's latency, status and database time."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        """Initialize."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        context = RequestContext(_request_id(scope))
+        token = _current_request.set(context)
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", context.request_id)
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_PROGRESS.dec(method=method)
+            # the router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            REQUESTS.inc(method=method, route=route, status=status_code)
+            REQUEST_SECONDS.observe(elapsed, method=method, route=route)
+            REQUEST_DB_SECONDS.observe(context.db_seconds, method=method, route=route)
+            access_logger.info(
+                "%s %s %d",
+                method,
+                scope["path"],
+                status_code,
+                extra={
+                    "method": method,
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "db_ms": round(context.db_seconds * 1000, 2),
+                    "db_queries": context.db_queries,
+                },
+            )
+            _current_request.reset(token)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time every query, adding it to the database time of its request."""
+    sync_engine = engine.sync_engine
+
+    def before_cursor_execute(conn, *_) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, _cursor, statement, *_) -> None:
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        DB_QUERY_SECONDS.observe(elapsed)
+        context = _current_request.get()
+        if context is not None:
+            context.db_seconds += elapsed
+            context.db_queries += 1
+            if context.queries is not None:
+                context.queries.append(
+                    {"sql": statement, "ms": round(elapsed * 1000, 3)},
+                )
+
+    def handle_error(exception_context) -> None:
+        # a failed query never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Transport timing every attempt to call an external API.
+
+    Times until the response headers arrive, labelled by status code, or
+    ``error`` when the call failed without one.
+    """
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport) -> None:
+        """Initialize."""
+        self.service = service
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, timing it."""
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            OUTBOUND_SECONDS.observe(
+                time.perf_counter() - start,
+                service=self.service,
+                status="error",
+            )
+            raise
+        OUTBOUND_SECONDS.observe(
+            time.perf_counter() - start,
+            service=self.service,
+            status=response.status_code,
+        )
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport."""
+        await self.transport.aclose()
+
+
+def metered_transport(service: str, limits: httpx.Limits) -> MeteredTransport:
+    """Connection pool for an external API, with its calls timed."""
+    return MeteredTransport(service, httpx.AsyncHTTPTransport(limits=limits))
+
+
+# LogRecord attributes that aren't extra fields.
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)),
+) | {"message", "asctime", "request_id", "taskName"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Add the ID of the request being handled to log records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Set ``record.request_id``."""
+        context = _current_request.get()
+        record.request_id = context.request_id if context is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with their extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = "".join(traceback.format_exception(*record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+_handler: Optional[logging.Handler] = None
+
+
+def configure_logging(
+    level: str = settings.LOG_LEVEL,
+    log_format: str = settings.LOG_FORMAT,
+) -> None:
+    """Send the app's logs to stderr, as JSON lines or plain text."""
+    global _handler
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+
+    _handler = logging.StreamHandler()
+    _handler.addFilter(RequestIdFilter())
+    if log_format == "json":
+        _handler.setFormatter(JsonFormatter())
+    else:
+        _handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s",
+            ),
+        )
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    # a line per outbound call; their latency is in the metrics instead
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+__all__ = (
+    "JsonFormatter",
+    "MeteredTransport",
+    "RequestContext",
+    "RequestMetricsMiddleware",
+    "configure_logging",
+    "current_request",
+    "instrument_engine",
+    "metered_transport",
+)
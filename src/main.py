@@ -1,10 +1,64 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.instrumentation import RequestMetricsMiddleware, configure_logging
+from src.models.database import database
+from src.models.migrate import check_schema_revision
+from src.profiling import ProfilingMiddleware
+
 # Import and include routers
-from src.routes import africastalking, auth, invoice
+from src.routes import (
+    africastalking,
+    auth,
+    export,
+    invoice,
+    metrics,
+    payment,
+    report,
+)
+from src.services.otp import OTPPurger
+from src.services.outbox import OutboxWorkerPool
+from src.services.overdue import OverdueSweeper
+from src.services.payment import PendingPaymentExpirer, payment_service
+from src.services.providers import providers
+from src.services.reports import ReportRefresher
+from src.settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open the connection pool on startup and release resources on shutdown.
+
+    Background workers started before a failing startup step are stopped too.
+    """
+    workers = (
+        OutboxWorkerPool(workers=settings.OUTBOX_WORKERS),
+        ReportRefresher(),
+        OverdueSweeper(),
+        OTPPurger(),
+        PendingPaymentExpirer(),
+    )
+    started = []
+    try:
+        await check_schema_revision(database.connect())
+        for worker in workers:
+            worker.start()
+            started.append(worker)
+        yield
+    finally:
+        for worker in reversed(started):
+            await worker.stop()
+        await payment_service.aclose()
+        await providers.aclose()
+        await database.dispose()
+
+
+configure_logging()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -14,6 +68,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+# Added last so it is outermost and times the whole request
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/")
@@ -23,9 +81,13 @@ async def root():
 
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(invoice.router, prefix="/api/invoices", tags=["Invoices"])
+app.include_router(export.router, prefix="/api/exports", tags=["Exports"])
+app.include_router(report.router, prefix="/api/reports", tags=["Reports"])
+app.include_router(payment.router, prefix="/api/payments", tags=["Payments"])
 app.include_router(
     africastalking.router, prefix="/africastalking", tags=["AfricasTalking"]
 )
+app.include_router(metrics.router, tags=["Metrics"])
 
 if __name__ == "__main__":
     import uvicorn
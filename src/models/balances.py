@@ -0,0 +1,305 @@
+"""Customer balance projection.
+
+``customer_balances`` holds each customer's outstanding balance: the totals of
+their unpaid invoices minus the completed transactions against those invoices.
+It is kept current as invoices, transactions and customers change:
+
+- ORM writes are picked up by a flush listener, which recomputes the balances
+  of the affected customers in the same transaction.
+- Set-based writers (``UPDATE ... WHERE`` statements) don't go through the
+  flush and call ``refresh_customer_balances`` with the customers they touched.
+
+A refresh first locks the customers' projection rows, so concurrent writes
+for one customer recompute one after the other, each reading what the
+previous one committed, rather than overwriting each other's totals.
+
+The projection can be rebuilt from, and checked against, the raw tables::
+
+    python -m src.models.balances rebuild
+    python -m src.models.balances check     # exits non-zero on drift
+"""
+
+import asyncio
+import sys
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, event, func, inspect, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.enums import InvoiceStatus, TransactionStatus
+from src.models.tables import CustomerBalances, Customers, Invoices, Transactions
+from src.utils import phone_number_validator
+
+UNPAID_STATUSES = (InvoiceStatus.SENT, InvoiceStatus.OVERDUE)
+
+# Columns whose changes move a customer's balance.
+WATCHED_COLUMNS = {
+    Invoices: ("customer_id", "status", "total_amount"),
+    Transactions: ("customer_id", "invoice_id", "status", "amount"),
+    Customers: ("organization_id", "phone"),
+}
+
+# Customers refreshed per statement when rebuilding.
+REBUILD_CHUNK_SIZE = 1000
+
+CENT = Decimal("0.01")
+MONEY_COLUMNS = ("invoiced_total", "paid_total", "outstanding")
+
+
+def _balances_query(customer_ids: Optional[list[UUID]] = None):
+    """Compute balances from the raw tables, for some or all customers."""
+    paid = (
+        select(
+            Transactions.invoice_id,
+            func.sum(Transactions.amount).label("paid"),
+        )
+        .where(Transactions.status == TransactionStatus.COMPLETED)
+        .group_by(Transactions.invoice_id)
+    )
+    unpaid = select(Invoices.id, Invoices.customer_id, Invoices.total_amount).where(
+        Invoices.status.in_(UNPAID_STATUSES),
+    )
+    customers = select(Customers.id, Customers.organization_id, Customers.phone)
+    if customer_ids is not None:
+        paid = paid.where(
+            Transactions.invoice_id.in_(
+                select(Invoices.id).where(Invoices.customer_id.in_(customer_ids)),
+            ),
+        )
+        unpaid = unpaid.where(Invoices.customer_id.in_(customer_ids))
+        customers = customers.where(Customers.id.in_(customer_ids))
+
+    paid = paid.subquery()
+    unpaid = unpaid.subquery()
+    customers = customers.subquery()
+    return (
+        select(
+            customers.c.id,
+            customers.c.organization_id,
+            customers.c.phone,
+            func.coalesce(func.sum(unpaid.c.total_amount), 0).label("invoiced_total"),
+            func.coalesce(func.sum(paid.c.paid), 0).label("paid_total"),
+        )
+        .outerjoin(unpaid, unpaid.c.customer_id == customers.c.id)
+        .outerjoin(paid, paid.c.invoice_id == unpaid.c.id)
+        .group_by(customers.c.id, customers.c.organization_id, customers.c.phone)
+    )
+
+
+def _normalize_phone(phone: Optional[str]) -> Optional[str]:
+    if not phone:
+        return None
+    try:
+        return phone_number_validator(phone)
+    except ValueError:
+        return phone
+
+
+def _compute(connection: Connection, customer_ids=None) -> list[dict]:
+    """Compute projection rows from the raw tables."""
+    now = datetime.now(tz=timezone.utc)
+    rows = []
+    for row in connection.execute(_balances_query(customer_ids)):
+        invoiced = Decimal(row.invoiced_total).quantize(CENT)
+        paid = Decimal(row.paid_total).quantize(CENT)
+        rows.append(
+            {
+                "customer_id": row.id,
+                "organization_id": row.organization_id,
+                "phone": _normalize_phone(row.phone),
+                "invoiced_total": invoiced,
+                "paid_total": paid,
+                "outstanding": invoiced - paid,
+                "updated_at": now,
+            },
+        )
+    return rows
+
+
+def _dialect(connection: Connection):
+    return postgresql if connection.dialect.name == "postgresql" else sqlite
+
+
+def _lock(connection: Connection, customer_ids: list[UUID]) -> None:
+    """Lock the customers' projection rows until the transaction ends.
+
+    Missing rows are created empty first, so a customer's first writers queue
+    too. Once a writer holds the lock, the writes of the one before it are
+    committed and, under READ COMMITTED, visible to its next statement.
+    """
+    now = datetime.now(tz=timezone.utc)
+    zero = literal(Decimal("0.00"), CustomerBalances.outstanding.type)
+    missing = (
+        _dialect(connection)
+        .insert(CustomerBalances)
+        .from_select(
+            [*MONEY_COLUMNS, "customer_id", "organization_id", "updated_at"],
+            select(
+                zero,
+                zero,
+                zero,
+                Customers.id,
+                Customers.organization_id,
+                literal(now, CustomerBalances.updated_at.type),
+            )
+            .where(Customers.id.in_(customer_ids))
+            .order_by(Customers.id),
+        )
+        .on_conflict_do_nothing(index_elements=[CustomerBalances.customer_id])
+    )
+    connection.execute(missing)
+    # in one order, so writers of overlapping customers can't deadlock
+    connection.execute(
+        select(CustomerBalances.customer_id)
+        .where(CustomerBalances.customer_id.in_(customer_ids))
+        .order_by(CustomerBalances.customer_id)
+        .with_for_update(),
+    )
+
+
+def _upsert(connection: Connection, rows: list[dict]) -> None:
+    """Insert or replace projection rows."""
+    if not rows:
+        return
+    statement = _dialect(connection).insert(CustomerBalances)
+    statement = statement.on_conflict_do_update(
+        index_elements=[CustomerBalances.customer_id],
+        set_={
+            name: statement.excluded[name] for name in rows[0] if name != "customer_id"
+        },
+    )
+    connection.execute(statement, rows)
+
+
+def refresh(connection: Connection, customer_ids: Iterable[UUID]) -> None:
+    """Recompute the balances of some customers."""
+    customer_ids = sorted(set(customer_ids))
+    if not customer_ids:
+        return
+    _lock(connection, customer_ids)
+    rows = _compute(connection, customer_ids)
+    _upsert(connection, rows)
+
+    # customers that no longer exist
+    missing = set(customer_ids) - {row["customer_id"] for row in rows}
+    if missing:
+        connection.execute(
+            delete(CustomerBalances).where(CustomerBalances.customer_id.in_(missing)),
+        )
+
+
+async def refresh_customer_balances(
+    session: AsyncSession,
+    customer_ids: Iterable[UUID],
+) -> None:
+    """Recompute balances after a set-based write, in the session's transaction."""
+    customer_ids = list(customer_ids)
+    await session.run_sync(lambda sync: refresh(sync.connection(), customer_ids))
+
+
+def _changed_customers(session: Session) -> set[UUID]:
+    """Customers whose balance the pending flush may change."""
+    customer_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        columns = WATCHED_COLUMNS.get(type(obj))
+        if columns is None:
+            continue
+        state = inspect(obj)
+        attr = "id" if isinstance(obj, Customers) else "customer_id"
+        if obj in session.dirty and not any(
+            state.attrs[column].history.has_changes() for column in columns
+        ):
+            continue
+        history = state.attrs[attr].history
+        customer_ids.update(history.added or history.unchanged or ())
+        customer_ids.update(history.deleted or ())
+    customer_ids.discard(None)
+    return customer_ids
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_after_flush(session: Session, _flush_context) -> None:
+    customer_ids = _changed_customers(session)
+    if customer_ids:
+        refresh(session.connection(), customer_ids)
+
+
+def rebuild(connection: Connection) -> int:
+    """Recompute every customer's balance, returning how many were written."""
+    connection.execute(
+        delete(CustomerBalances).where(
+            CustomerBalances.customer_id.not_in(select(Customers.id)),
+        ),
+    )
+    customer_ids = list(connection.scalars(select(Customers.id)))
+    for start in range(0, len(customer_ids), REBUILD_CHUNK_SIZE):
+        refresh(connection, customer_ids[start : start + REBUILD_CHUNK_SIZE])
+    return len(customer_ids)
+
+
+def check(connection: Connection) -> list[str]:
+    """Compare the projection with the raw tables, describing each mismatch."""
+    expected = {row["customer_id"]: row for row in _compute(connection)}
+    actual = {
+        row.customer_id: row
+        for row in connection.execute(select(CustomerBalances)).mappings()
+    }
+
+    problems = []
+    for customer_id in sorted(set(expected) | set(actual), key=str):
+        want, have = expected.get(customer_id), actual.get(customer_id)
+        if have is None:
+            problems.append(f"{customer_id}: missing from customer_balances")
+            continue
+        if want is None:
+            problems.append(f"{customer_id}: customer no longer exists")
+            continue
+        for column in MONEY_COLUMNS + ("organization_id", "phone"):
+            if column in MONEY_COLUMNS:
+                same = Decimal(have[column]).quantize(CENT) == want[column]
+            else:
+                same = have[column] == want[column]
+            if not same:
+                problems.append(
+                    f"{customer_id}: {column} is {have[column]}, "
+                    f"expected {want[column]}",
+                )
+    return problems
+
+
+async def main(argv: list[str]) -> None:
+    """Rebuild or check the projection."""
+    from src.models.database import database
+
+    action = argv[0] if argv else "check"
+    try:
+        async with database.engine.begin() as connection:
+            if action == "rebuild":
+                count = await connection.run_sync(rebuild)
+                print(f"Rebuilt balances of {count} customers")
+            elif action == "check":
+                problems = await connection.run_sync(check)
+            else:
+                error_message = f"Unknown command: {action}"
+                raise SystemExit(error_message)
+    finally:
+        await database.dispose()
+
+    if action == "check":
+        for problem in problems:
+            print(problem)
+        if problems:
+            error_message = f"{len(problems)} customer balances are out of date"
+            raise SystemExit(error_message)
+        print("Customer balances are consistent")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
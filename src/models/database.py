@@ -0,0 +1,122 @@
+"""Async database engine and session dependencies."""
+
+import time
+from collections.abc import AsyncIterator
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.instrumentation import instrument_engine
+from src.metrics import gauge, histogram
+from src.models import balances  # noqa: F401  keeps customer balances current
+from src.settings import DataBaseConfig, settings
+
+POOL_CHECKOUT_SECONDS = histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+POOL_IN_USE = gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the pool.",
+)
+POOL_CAPACITY = gauge(
+    "db_pool_capacity",
+    "Maximum connections the pool may open (pool_size + max_overflow).",
+)
+POOL_SATURATION = gauge(
+    "db_pool_saturation_ratio",
+    "Checked out connections as a fraction of the pool capacity.",
+)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+def _instrument_pool(engine: AsyncEngine, capacity: int) -> None:
+    """Keep the pool usage gauges current on checkout and checkin."""
+    pool = engine.sync_engine.pool
+    POOL_CAPACITY.set(capacity)
+
+    def update_usage(*_) -> None:
+        in_use = pool.checkedout()
+        POOL_IN_USE.set(in_use)
+        POOL_SATURATION.set(in_use / capacity if capacity else 0)
+
+    event.listen(engine.sync_engine, "checkout", update_usage)
+    event.listen(engine.sync_engine, "checkin", update_usage)
+
+
+class Database:
+    """Async engine and session factory, created and disposed with the app."""
+
+    def __init__(self, config: DataBaseConfig) -> None:
+        """Initialize."""
+        self.config = config
+        self._engine: Optional[AsyncEngine] = None
+        self._sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """Get the engine, creating it on first use."""
+        return self.connect()
+
+    def connect(self) -> AsyncEngine:
+        """Create the engine and its connection pool."""
+        if self._engine is None:
+            options = self.config.engine_options
+            if not self.config.is_sqlite:
+                options["poolclass"] = MeteredPool
+
+            self._engine = create_async_engine(
+                self.config.async_database_url,
+                **options,
+            )
+            instrument_engine(self._engine)
+            if not self.config.is_sqlite:
+                _instrument_pool(
+                    self._engine,
+                    options["pool_size"] + options["max_overflow"],
+                )
+            self._sessionmaker = async_sessionmaker(
+                self._engine,
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+        return self._engine
+
+    def session(self) -> AsyncSession:
+        """Create a new session."""
+        self.connect()
+        return self._sessionmaker()
+
+    async def dispose(self) -> None:
+        """Close all pooled connections."""
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._sessionmaker = None
+
+
+database = Database(settings.DATABASE)
+
+
+#  session dependencies
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """Get async database session."""
+    async with database.session() as session:
+        yield session
+
+
+__all__ = ("AsyncSession", "Database", "database", "get_session")
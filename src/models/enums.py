@@ -58,7 +58,17 @@ class ReminderStatus(str, Enum):
     FAILED = "FAILED"
 
 
+class ImportStatus(str, Enum):
+    """Import Job Status Enum."""
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
 __all__ = [
+    "ImportStatus",
     "InvoiceStatus",
     "PaymentMethod",
     "ReminderStatus",
@@ -0,0 +1,66 @@
+"""Count the SQL statements a block of code runs.
+
+Used to hold code paths to a query budget, so N+1 regressions fail loudly::
+
+    with query_budget(4):
+        await repository.get_invoice_detail(invoice_id, user_id)
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryCounter:
+    """Statements executed while the counter was active."""
+
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        """Number of statements executed."""
+        return len(self.statements)
+
+
+_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "query_counter",
+    default=None,
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record(_conn, _cursor, statement: str, *_) -> None:
+    counter = _counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the statements executed in the current context."""
+    counter = QueryCounter()
+    token = _counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _counter.reset(token)
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[QueryCounter]:
+    """Fail with AssertionError if the block runs more than ``limit`` statements."""
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n\n".join(counter.statements)
+        msg = f"Expected at most {limit} queries, got {counter.count}:\n\n{statements}"
+        raise AssertionError(msg)
+
+
+__all__ = ("QueryCounter", "count_queries", "query_budget")
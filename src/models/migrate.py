@@ -0,0 +1,89 @@
+"""Schema migrations.
+
+Revisions live in ``migrations/versions`` and are applied once per deploy::
+
+    python -m src.models.migrate            # upgrade to the latest revision
+    python -m src.models.migrate current    # show the database revision
+
+App startup only compares the database revision with the expected one.
+"""
+
+import sys
+import warnings
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.settings import settings
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+def alembic_config():
+    """Get the alembic config for this project."""
+    from alembic.config import Config
+
+    return Config(str(ALEMBIC_INI))
+
+
+@lru_cache(maxsize=1)
+def expected_revision() -> Optional[str]:
+    """Get the head revision the code expects."""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def _current_revision(connection: Connection) -> Optional[str]:
+    from alembic.runtime.migration import MigrationContext
+
+    return MigrationContext.configure(connection).get_current_revision()
+
+
+async def check_schema_revision(engine: AsyncEngine) -> None:
+    """Make sure the database schema is at the expected revision.
+
+    This is a single read of the ``alembic_version`` table. A mismatch is an
+    error in production and a warning in development.
+    """
+    async with engine.connect() as connection:
+        current = await connection.run_sync(_current_revision)
+
+    expected = expected_revision()
+    if current == expected:
+        return
+
+    error_message = (
+        f"Database schema is at revision {current}, expected {expected}. "
+        "Run `python -m src.models.migrate`."
+    )
+    if settings.DATABASE.DEVELOPMENT_MODE:
+        warnings.warn(error_message, stacklevel=2)
+        return
+    raise RuntimeError(error_message)
+
+
+def main(argv: list[str]) -> None:
+    """Run an alembic command, upgrading to head by default."""
+    from alembic import command
+
+    config = alembic_config()
+    action = argv[0] if argv else "upgrade"
+    if action == "upgrade":
+        command.upgrade(config, argv[1] if len(argv) > 1 else "head")
+    elif action == "downgrade":
+        command.downgrade(config, argv[1])
+    elif action == "current":
+        command.current(config, verbose=True)
+    elif action == "history":
+        command.history(config)
+    else:
+        error_message = f"Unknown command: {action}"
+        raise SystemExit(error_message)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
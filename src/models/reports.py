@@ -0,0 +1,510 @@
+"""Reporting rollups.
+
+Dashboards read small pre-aggregated tables instead of scanning invoices and
+transactions:
+
+- ``receivables_by_due_date``: open invoices per due date, summed into aging
+  buckets at read time.
+- ``cash_flow_by_month``: invoiced, collected and outstanding per month.
+
+Top debtors come from the ``customer_balances`` projection.
+
+The rollups are refreshed incrementally. A refresh reads the invoices and
+transactions changed since its watermarks. Every changed row's contribution
+is recomputed from the raw tables. The difference from what the row added
+last time is then applied to the rollups. Those earlier contributions are
+kept in ``invoice_rollups`` and ``transaction_rollups``, so a row that moves
+to another due date or month is taken out of the old one.
+
+Refreshes and rebuilds take a transaction-scoped advisory lock on Postgres,
+so the refreshers of several workers run one at a time, even before the
+watermarks exist.
+
+Deleted rows are not seen by a refresh; rebuild after deleting any. The
+rollups can be rebuilt from, and checked against, the raw tables::
+
+    python -m src.models.reports refresh
+    python -m src.models.reports rebuild
+    python -m src.models.reports check      # exits non-zero on drift
+"""
+
+import asyncio
+import sys
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+
+from src.models.balances import UNPAID_STATUSES
+from src.models.enums import InvoiceStatus, TransactionStatus
+from src.models.repository.changes import Watermark, changed, settled, utc
+from src.models.tables import (
+    CashFlowByMonth,
+    InvoiceRollups,
+    Invoices,
+    ReceivablesByDueDate,
+    TransactionRollups,
+    Transactions,
+    Watermarks,
+)
+
+# Invoices that don't count as invoiced.
+NOT_INVOICED_STATUSES = (InvoiceStatus.DRAFT, InvoiceStatus.CANCELLED)
+
+INVOICES_WATERMARK = "reports.invoices"
+TRANSACTIONS_WATERMARK = "reports.transactions"
+
+# Advisory lock key serializing refreshes.
+REFRESH_LOCK = "reports.refresh"
+
+# Changed rows of each table read per refresh.
+REFRESH_BATCH_SIZE = 1000
+
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+
+def _month(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _dialect(connection: Connection):
+    return postgresql if connection.dialect.name == "postgresql" else sqlite
+
+
+def _lock(connection: Connection) -> None:
+    """Wait for other refreshes, holding the lock until the transaction ends.
+
+    Locking the watermark rows isn't enough: there are none to lock on the
+    first refresh or after a rebuild. SQLite runs one writer at a time.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(REFRESH_LOCK)))
+        )
+
+
+def _load_watermark(connection: Connection, name: str) -> Optional[Watermark]:
+    """Read a watermark; the caller holds the refresh lock."""
+    row = connection.execute(
+        select(Watermarks.updated_at, Watermarks.row_id).where(Watermarks.name == name),
+    ).first()
+    return Watermark(utc(row.updated_at), row.row_id) if row else None
+
+
+def _save_watermark(connection: Connection, name: str, watermark: Watermark) -> None:
+    statement = _dialect(connection).insert(Watermarks)
+    connection.execute(
+        statement.on_conflict_do_update(
+            index_elements=[Watermarks.name],
+            set_={
+                "updated_at": statement.excluded.updated_at,
+                "row_id": statement.excluded.row_id,
+            },
+        ),
+        {"name": name, "updated_at": watermark.updated_at, "row_id": watermark.id},
+    )
+
+
+def _invoice_rollups(connection: Connection, invoice_ids: list[UUID]) -> list[dict]:
+    """What each invoice adds to the rollups now."""
+    paid = (
+        select(
+            Transactions.invoice_id,
+            func.sum(Transactions.amount).label("paid"),
+        )
+        .where(
+            Transactions.status == TransactionStatus.COMPLETED,
+            Transactions.invoice_id.in_(invoice_ids),
+        )
+        .group_by(Transactions.invoice_id)
+        .subquery()
+    )
+    statement = (
+        select(
+            Invoices.id,
+            Invoices.organization_id,
+            Invoices.currency,
+            Invoices.status,
+            Invoices.issue_date,
+            # invoices without a due date are due when issued
+            func.coalesce(Invoices.due_date, Invoices.issue_date).label("due_date"),
+            Invoices.total_amount,
+            func.coalesce(paid.c.paid, 0).label("paid"),
+        )
+        .outerjoin(paid, paid.c.invoice_id == Invoices.id)
+        .where(Invoices.id.in_(invoice_ids))
+    )
+    rows = []
+    for row in connection.execute(statement):
+        total = Decimal(row.total_amount).quantize(CENT)
+        is_open = row.status in UNPAID_STATUSES
+        due_date = row.due_date
+        if isinstance(due_date, str):
+            # sqlite loses the type through coalesce
+            due_date = date.fromisoformat(due_date)
+        rows.append(
+            {
+                "invoice_id": row.id,
+                "organization_id": row.organization_id,
+                "currency": row.currency,
+                "due_date": due_date,
+                "month": _month(row.issue_date),
+                "is_open": is_open,
+                "invoiced": ZERO if row.status in NOT_INVOICED_STATUSES else total,
+                "outstanding": total - Decimal(row.paid).quantize(CENT)
+                if is_open
+                else ZERO,
+            },
+        )
+    return rows
+
+
+def _transaction_rollups(
+    connection: Connection,
+    transaction_ids: list[UUID],
+) -> list[dict]:
+    """What each transaction adds to the rollups now."""
+    statement = (
+        select(
+            Transactions.id,
+            Invoices.organization_id,
+            Transactions.currency,
+            Transactions.status,
+            Transactions.amount,
+            Transactions.transaction_date,
+        )
+        .join(Invoices, Transactions.invoice_id == Invoices.id)
+        .where(Transactions.id.in_(transaction_ids))
+    )
+    return [
+        {
+            "transaction_id": row.id,
+            "organization_id": row.organization_id,
+            "currency": row.currency,
+            "month": _month(row.transaction_date),
+            "collected": Decimal(row.amount).quantize(CENT)
+            if row.status == TransactionStatus.COMPLETED
+            else ZERO,
+        }
+        for row in connection.execute(statement)
+    ]
+
+
+class _Deltas:
+    """Changes to apply to the rollup rows, summed per key."""
+
+    def __init__(self) -> None:
+        # (organization_id, currency, due_date) -> [invoices, outstanding]
+        self.receivables = defaultdict(lambda: [0, ZERO])
+        # (organization_id, currency, month) -> [invoiced, collected, outstanding]
+        self.cash_flow = defaultdict(lambda: [ZERO, ZERO, ZERO])
+
+    def add_invoice(self, rollup, sign: int) -> None:
+        if rollup["is_open"]:
+            key = (rollup["organization_id"], rollup["currency"], rollup["due_date"])
+            self.receivables[key][0] += sign
+            self.receivables[key][1] += sign * rollup["outstanding"]
+        key = (rollup["organization_id"], rollup["currency"], rollup["month"])
+        self.cash_flow[key][0] += sign * rollup["invoiced"]
+        self.cash_flow[key][2] += sign * rollup["outstanding"]
+
+    def add_transaction(self, rollup, sign: int) -> None:
+        key = (rollup["organization_id"], rollup["currency"], rollup["month"])
+        self.cash_flow[key][1] += sign * rollup["collected"]
+
+    def apply(self, connection: Connection) -> None:
+        """Add the deltas to the rollups, dropping rows that net to zero."""
+        dialect = _dialect(connection)
+        receivables = [
+            {
+                "organization_id": organization_id,
+                "currency": currency,
+                "due_date": due_date,
+                "invoices": invoices,
+                "outstanding": outstanding,
+            }
+            for (organization_id, currency, due_date), (
+                invoices,
+                outstanding,
+            ) in self.receivables.items()
+            if invoices or outstanding
+        ]
+        cash_flow = [
+            {
+                "organization_id": organization_id,
+                "currency": currency,
+                "month": month,
+                "invoiced": invoiced,
+                "collected": collected,
+                "outstanding": outstanding,
+            }
+            for (organization_id, currency, month), (
+                invoiced,
+                collected,
+                outstanding,
+            ) in self.cash_flow.items()
+            if invoiced or collected or outstanding
+        ]
+        for table, rows, keys in (
+            (
+                ReceivablesByDueDate,
+                receivables,
+                ("organization_id", "currency", "due_date"),
+            ),
+            (CashFlowByMonth, cash_flow, ("organization_id", "currency", "month")),
+        ):
+            if not rows:
+                continue
+            statement = dialect.insert(table)
+            statement = statement.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={
+                    name: getattr(table, name) + statement.excluded[name]
+                    for name in rows[0]
+                    if name not in keys
+                },
+            )
+            connection.execute(statement, rows)
+
+        organizations = {key[0] for key in (*self.receivables, *self.cash_flow)}
+        if organizations:
+            connection.execute(
+                delete(ReceivablesByDueDate).where(
+                    ReceivablesByDueDate.organization_id.in_(organizations),
+                    ReceivablesByDueDate.invoices == 0,
+                    ReceivablesByDueDate.outstanding == 0,
+                ),
+            )
+            connection.execute(
+                delete(CashFlowByMonth).where(
+                    CashFlowByMonth.organization_id.in_(organizations),
+                    CashFlowByMonth.invoiced == 0,
+                    CashFlowByMonth.collected == 0,
+                    CashFlowByMonth.outstanding == 0,
+                ),
+            )
+
+
+def _replace_rollups(
+    connection: Connection,
+    model,
+    key: str,
+    ids: list[UUID],
+    rows: list[dict],
+) -> list[dict]:
+    """Store rows' new contributions, returning their previous ones."""
+    column = getattr(model, key)
+    previous = [
+        dict(row)
+        for row in connection.execute(select(model).where(column.in_(ids))).mappings()
+    ]
+    connection.execute(delete(model).where(column.in_(ids)))
+    if rows:
+        connection.execute(model.__table__.insert(), rows)
+    return previous
+
+
+def apply_changes(
+    connection: Connection,
+    invoice_ids: Iterable[UUID],
+    transaction_ids: Iterable[UUID],
+) -> None:
+    """Bring the rollups up to date for some invoices and transactions."""
+    invoice_ids = list(set(invoice_ids))
+    transaction_ids = list(set(transaction_ids))
+    deltas = _Deltas()
+    if invoice_ids:
+        rows = _invoice_rollups(connection, invoice_ids)
+        previous = _replace_rollups(
+            connection,
+            InvoiceRollups,
+            "invoice_id",
+            invoice_ids,
+            rows,
+        )
+        for row in previous:
+            deltas.add_invoice(row, -1)
+        for row in rows:
+            deltas.add_invoice(row, 1)
+    if transaction_ids:
+        rows = _transaction_rollups(connection, transaction_ids)
+        previous = _replace_rollups(
+            connection,
+            TransactionRollups,
+            "transaction_id",
+            transaction_ids,
+            rows,
+        )
+        for row in previous:
+            deltas.add_transaction(row, -1)
+        for row in rows:
+            deltas.add_transaction(row, 1)
+    deltas.apply(connection)
+
+
+def refresh(connection: Connection, batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """Apply one batch of changes, returning how many changed rows it read.
+
+    Call until it returns 0 to catch up.
+    """
+    _lock(connection)
+    until = settled()
+    invoice_mark = _load_watermark(connection, INVOICES_WATERMARK)
+    transaction_mark = _load_watermark(connection, TRANSACTIONS_WATERMARK)
+    invoices = connection.execute(
+        changed(
+            select(Invoices.id, Invoices.updated_at),
+            Invoices.__table__,
+            invoice_mark,
+            until,
+        ).limit(batch_size),
+    ).all()
+    transactions = connection.execute(
+        changed(
+            select(Transactions.id, Transactions.invoice_id, Transactions.updated_at),
+            Transactions.__table__,
+            transaction_mark,
+            until,
+        ).limit(batch_size),
+    ).all()
+
+    # a payment changes what its invoice still owes
+    apply_changes(
+        connection,
+        [row.id for row in invoices] + [row.invoice_id for row in transactions],
+        [row.id for row in transactions],
+    )
+    for name, rows in (
+        (INVOICES_WATERMARK, invoices),
+        (TRANSACTIONS_WATERMARK, transactions),
+    ):
+        if rows:
+            _save_watermark(
+                connection, name, Watermark(utc(rows[-1].updated_at), rows[-1].id)
+            )
+    return len(invoices) + len(transactions)
+
+
+def rebuild(connection: Connection) -> int:
+    """Drop the rollups and replay every change, returning how many rows it read."""
+    _lock(connection)
+    for model in (
+        ReceivablesByDueDate,
+        CashFlowByMonth,
+        InvoiceRollups,
+        TransactionRollups,
+    ):
+        connection.execute(delete(model))
+    connection.execute(
+        delete(Watermarks).where(
+            Watermarks.name.in_((INVOICES_WATERMARK, TRANSACTIONS_WATERMARK)),
+        ),
+    )
+    total = 0
+    while count := refresh(connection):
+        total += count
+    return total
+
+
+def _expected(connection: Connection) -> tuple[dict, dict]:
+    """Compute the rollups from the raw tables, in memory."""
+    deltas = _Deltas()
+    invoice_ids = list(connection.scalars(select(Invoices.id)))
+    transaction_ids = list(connection.scalars(select(Transactions.id)))
+    for start in range(0, len(invoice_ids), REFRESH_BATCH_SIZE):
+        for row in _invoice_rollups(
+            connection, invoice_ids[start : start + REFRESH_BATCH_SIZE]
+        ):
+            deltas.add_invoice(row, 1)
+    for start in range(0, len(transaction_ids), REFRESH_BATCH_SIZE):
+        chunk = transaction_ids[start : start + REFRESH_BATCH_SIZE]
+        for row in _transaction_rollups(connection, chunk):
+            deltas.add_transaction(row, 1)
+    receivables = {
+        key: (invoices, outstanding)
+        for key, (invoices, outstanding) in deltas.receivables.items()
+        if invoices or outstanding
+    }
+    cash_flow = {
+        key: tuple(values) for key, values in deltas.cash_flow.items() if any(values)
+    }
+    return receivables, cash_flow
+
+
+def check(connection: Connection) -> list[str]:
+    """Compare the rollups with the raw tables, describing each mismatch.
+
+    Changes that haven't settled yet, or that a refresh hasn't reached,
+    show up as mismatches; refresh first.
+    """
+    expected_receivables, expected_cash_flow = _expected(connection)
+    actual_receivables = {
+        (row.organization_id, row.currency, row.due_date): (
+            row.invoices,
+            Decimal(row.outstanding).quantize(CENT),
+        )
+        for row in connection.execute(select(ReceivablesByDueDate))
+    }
+    actual_cash_flow = {
+        (row.organization_id, row.currency, row.month): (
+            Decimal(row.invoiced).quantize(CENT),
+            Decimal(row.collected).quantize(CENT),
+            Decimal(row.outstanding).quantize(CENT),
+        )
+        for row in connection.execute(select(CashFlowByMonth))
+    }
+
+    problems = []
+    for name, expected, actual in (
+        ("receivables_by_due_date", expected_receivables, actual_receivables),
+        ("cash_flow_by_month", expected_cash_flow, actual_cash_flow),
+    ):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if expected.get(key) != actual.get(key):
+                problems.append(
+                    f"{name} {key}: is {actual.get(key)}, expected {expected.get(key)}",
+                )
+    return problems
+
+
+async def main(argv: list[str]) -> None:
+    """Refresh, rebuild or check the rollups."""
+    from src.models.database import database
+
+    action = argv[0] if argv else "check"
+    try:
+        async with database.engine.begin() as connection:
+            if action == "refresh":
+                count = 0
+                while read := await connection.run_sync(refresh):
+                    count += read
+                print(f"Applied {count} changed rows")
+            elif action == "rebuild":
+                count = await connection.run_sync(rebuild)
+                print(f"Rebuilt the rollups from {count} rows")
+            elif action == "check":
+                problems = await connection.run_sync(check)
+            else:
+                error_message = f"Unknown command: {action}"
+                raise SystemExit(error_message)
+    finally:
+        await database.dispose()
+
+    if action == "check":
+        for problem in problems:
+            print(problem)
+        if problems:
+            error_message = f"{len(problems)} rollup rows are out of date"
+            raise SystemExit(error_message)
+        print("Reporting rollups are consistent")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
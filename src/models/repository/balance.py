@@ -0,0 +1,32 @@
+"""Customer Balance Repository."""
+
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.tables import CustomerBalances
+from src.utils import phone_number_validator
+
+
+class BalanceRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_outstanding_by_phone(self, phone_number: str) -> Decimal:
+        """Total outstanding balance of the customers with this phone number.
+
+        A single read of the ``customer_balances`` phone index. The same
+        person can be a customer of several organizations.
+        """
+        try:
+            phone = phone_number_validator(phone_number)
+        except ValueError:
+            return Decimal("0.00")
+
+        statement = select(
+            func.coalesce(func.sum(CustomerBalances.outstanding), 0),
+        ).where(CustomerBalances.phone == phone)
+        outstanding = (await self.session.exec(statement)).one()
+        return Decimal(outstanding).quantize(Decimal("0.01"))
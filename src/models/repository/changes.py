@@ -0,0 +1,133 @@
+"""Change Repository.
+
+Rows are read in change order, (updated_at, id), from a watermark: the last
+row a reader has seen. Incremental exports, syncs and caches keep the
+watermark and ask for what changed after it.
+
+Reads stop ``SETTLE_TIME`` behind the clock. ``updated_at`` is set before a
+transaction commits, so a slow transaction can commit a row older than one
+already read; waiting for rows to settle keeps them from being skipped.
+"""
+
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional, Union
+from uuid import UUID
+
+from sqlalchemy import Select, Table, func, tuple_
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.tables import Invoices
+
+SETTLE_TIME = timedelta(seconds=5)
+
+
+class Watermark(NamedTuple):
+    """The last (updated_at, id) a reader has seen."""
+
+    updated_at: datetime
+    id: UUID
+
+    def encode(self) -> str:
+        """Opaque string form, for clients to send back."""
+        raw = f"{self.updated_at.isoformat()}|{self.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, value: str) -> "Watermark":
+        """Parse the string form."""
+        try:
+            padded = value + "=" * (-len(value) % 4)
+            updated_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+            return cls(utc(datetime.fromisoformat(updated_at)), UUID(row_id))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+            msg = "Invalid watermark"
+            raise ValueError(msg) from error
+
+
+def utc(value: datetime) -> datetime:
+    """Timestamps without a time zone are taken to be UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def settled() -> datetime:
+    """Latest change time that is safe to read up to."""
+    return datetime.now(tz=timezone.utc) - SETTLE_TIME
+
+
+def changed(
+    statement: Select,
+    table: Table,
+    since: Union[datetime, Watermark, None],
+    until: Optional[datetime] = None,
+) -> Select:
+    """Narrow a select of ``table`` to the rows changed after ``since``.
+
+    Rows come oldest change first, up to ``until``, by default the latest
+    settled change.
+    """
+    until = settled() if until is None else until
+    if isinstance(since, Watermark):
+        statement = statement.where(
+            tuple_(table.c.updated_at, table.c.id) > tuple_(*since),
+        )
+    elif since is not None:
+        statement = statement.where(table.c.updated_at > utc(since))
+    return statement.where(table.c.updated_at <= utc(until)).order_by(
+        table.c.updated_at,
+        table.c.id,
+    )
+
+
+def _of_organization(statement: Select, model: type[SQLModel], organization_id: UUID):
+    """Scope a select to an organization, through the invoice if need be."""
+    if hasattr(model, "organization_id"):
+        return statement.where(model.organization_id == organization_id)
+    return statement.join(Invoices, model.invoice_id == Invoices.id).where(
+        Invoices.organization_id == organization_id,
+    )
+
+
+class ChangeRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def changes_since(
+        self,
+        model: type[SQLModel],
+        organization_id: UUID,
+        since: Optional[Watermark] = None,
+        limit: int = 1000,
+    ) -> tuple[list, Optional[Watermark]]:
+        """Get up to ``limit`` of an organization's rows changed after ``since``.
+
+        Returns the rows and the watermark to ask from next, which is
+        ``since`` again when nothing changed.
+        """
+        statement = _of_organization(select(model), model, organization_id)
+        statement = changed(statement, model.__table__, since)
+        rows = list((await self.session.exec(statement.limit(limit))).all())
+        if not rows:
+            return rows, since
+        return rows, Watermark(utc(rows[-1].updated_at), rows[-1].id)
+
+    async def last_changed(
+        self,
+        model: type[SQLModel],
+        organization_id: UUID,
+    ) -> Optional[datetime]:
+        """When any of an organization's rows last changed.
+
+        A cheap version check for caches: one read of the updated_at index.
+        """
+        statement = _of_organization(
+            select(func.max(model.updated_at)),
+            model,
+            organization_id,
+        )
+        last = (await self.session.exec(statement)).one()
+        return utc(last) if last is not None else None
@@ -0,0 +1,139 @@
+"""Import Job Repository."""
+
+from collections.abc import Iterable
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import case, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.repository.invoice import next_invoice_number
+from src.models.tables import (
+    Customers,
+    ImportJobs,
+    InvoiceCounters,
+    InvoiceItems,
+    Invoices,
+    Organizations,
+)
+
+
+class ImportRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_job(self, job: ImportJobs) -> ImportJobs:
+        """Save a new import job."""
+        self.session.add(job)
+        await self.session.commit()
+        await self.session.refresh(job)
+        return job
+
+    async def get_job(self, job_id: UUID, user_id: UUID) -> Optional[ImportJobs]:
+        """Get one of the user's import jobs."""
+        statement = (
+            select(ImportJobs)
+            .join(Organizations, ImportJobs.organization_id == Organizations.id)
+            .where(ImportJobs.id == job_id, Organizations.owner_id == user_id)
+        )
+        return (await self.session.exec(statement)).first()
+
+    async def existing_invoice_numbers(
+        self,
+        organization_id: UUID,
+        invoice_numbers: Iterable[str],
+    ) -> set[str]:
+        """Which of these invoice numbers the organization already uses."""
+        statement = select(Invoices.invoice_number).where(
+            Invoices.organization_id == organization_id,
+            Invoices.invoice_number.in_(list(invoice_numbers)),
+        )
+        return set((await self.session.exec(statement)).all())
+
+    async def customers_by_code(
+        self,
+        codes: Iterable[str],
+    ) -> dict[str, tuple[UUID, UUID]]:
+        """Customer code -> (customer id, organization id).
+
+        Customer codes are unique across organizations, so a code may belong
+        to another organization.
+        """
+        statement = select(
+            Customers.customer_code,
+            Customers.id,
+            Customers.organization_id,
+        ).where(Customers.customer_code.in_(list(codes)))
+        rows = (await self.session.exec(statement)).all()
+        return {code: (customer_id, org_id) for code, customer_id, org_id in rows}
+
+    async def customers_by_phone(
+        self,
+        organization_id: UUID,
+        phones: Iterable[str],
+    ) -> dict[str, UUID]:
+        """E.164 phone number -> customer id, within an organization.
+
+        Imports store customer phone numbers in E.164, so they match the
+        normalized numbers of the batch.
+        """
+        statement = select(Customers.phone, Customers.id).where(
+            Customers.organization_id == organization_id,
+            Customers.phone.in_(list(phones)),
+        )
+        return dict((await self.session.exec(statement)).all())
+
+    async def insert_invoices(
+        self,
+        customers: list[dict],
+        invoices: list[dict],
+        items: list[dict],
+    ) -> None:
+        """Bulk insert new customers, invoices and their items.
+
+        Rows are complete column dicts, as the models' defaults are not
+        applied by a bulk INSERT.
+        """
+        for model, rows in (
+            (Customers, customers),
+            (Invoices, invoices),
+            (InvoiceItems, items),
+        ):
+            if rows:
+                await self.session.execute(insert(model), rows)
+
+    async def reserve_invoice_numbers(
+        self,
+        organization_id: UUID,
+        after: int,
+        prefix: str,
+    ) -> None:
+        """Move the organization's invoice counter past ``after``.
+
+        Numbers are only moved forward, so blocks reserved later skip the
+        imported numbers. Blocks reserved earlier may still cover some of
+        them; the allocator skips those when an insert collides.
+        """
+        dialect = (
+            postgresql if self.session.bind.dialect.name == "postgresql" else sqlite
+        )
+        existing = next_invoice_number(organization_id, prefix)
+        statement = dialect.insert(InvoiceCounters).values(
+            organization_id=organization_id,
+            next_value=case((existing > after, existing), else_=after + 1),
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[InvoiceCounters.organization_id],
+            set_={
+                "next_value": case(
+                    (
+                        InvoiceCounters.next_value > after,
+                        InvoiceCounters.next_value,
+                    ),
+                    else_=after + 1,
+                ),
+            },
+        )
+        await self.session.execute(statement)
@@ -1,36 +1,182 @@
 """Invoice Repository."""
 
-from sqlmodel import Session, select
-from src.models.tables import Invoices, Users, Organizations
+import base64
+import binascii
+from datetime import date
+from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import Integer, ScalarSelect, cast, func, insert, tuple_
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.tables import Customers, InvoiceItems, Invoices, Organizations
+from src.schemas.invoice import InvoiceListQuery
+
+
+def encode_cursor(invoice: Invoices) -> str:
+    """Opaque cursor pointing just past an invoice."""
+    raw = f"{invoice.issue_date.isoformat()}|{invoice.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, UUID]:
+    """Get the (issue_date, id) a cursor points past."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        issue_date, invoice_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return date.fromisoformat(issue_date), UUID(invoice_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        msg = "Invalid cursor"
+        raise ValueError(msg) from error
+
+
+def next_invoice_number(organization_id: UUID, prefix: str) -> ScalarSelect:
+    """The number after an organization's highest allocated-looking one.
+
+    Only numbers like ``<prefix>000123`` count, so sparse or imported
+    numbers in that format are skipped and others are ignored; 1 when there
+    are none.
+    """
+    digits = func.substr(Invoices.invoice_number, len(prefix) + 1)
+    return (
+        select(func.coalesce(func.max(cast(digits, Integer)), 0) + 1)
+        .where(
+            Invoices.organization_id == organization_id,
+            Invoices.invoice_number.startswith(prefix, autoescape=True),
+            # digits that fit the counter
+            digits.regexp_match("^[0-9]{1,9}$"),
+        )
+        .scalar_subquery()
+    )
+
 
 class InvoiceRepository:
-    def __init__(self, session: Session):
+    def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def get_all_invoices(self, user_id: UUID):
-        organization = self.session.exec(
-            select(Organizations).where(Organizations.owner_id == user_id)
-        )
-        if not organization:
-            return []
+    async def list_invoices(
+        self,
+        user_id: UUID,
+        query: InvoiceListQuery,
+    ) -> tuple[list[Invoices], Optional[str]]:
+        """Get a page of the user's invoices, newest first, and the next cursor.
+
+        Pages are keyset paginated on (issue_date, id): each page starts right
+        after the previous page's last row, so deep pages cost the same as the
+        first one.
+        """
+        owned = select(Organizations.id).where(Organizations.owner_id == user_id)
+        statement = select(Invoices).where(Invoices.organization_id.in_(owned))
+
+        if query.organization_id:
+            statement = statement.where(
+                Invoices.organization_id == query.organization_id,
+            )
+        if query.customer_id:
+            statement = statement.where(Invoices.customer_id == query.customer_id)
+        if query.status:
+            statement = statement.where(Invoices.status.in_(query.status))
+        if query.due_from:
+            statement = statement.where(Invoices.due_date >= query.due_from)
+        if query.due_to:
+            statement = statement.where(Invoices.due_date <= query.due_to)
+        if query.min_amount is not None:
+            statement = statement.where(Invoices.total_amount >= query.min_amount)
+        if query.max_amount is not None:
+            statement = statement.where(Invoices.total_amount <= query.max_amount)
+        if query.cursor:
+            statement = statement.where(
+                tuple_(Invoices.issue_date, Invoices.id)
+                < tuple_(*decode_cursor(query.cursor)),
+            )
+
+        statement = statement.order_by(
+            Invoices.issue_date.desc(),
+            Invoices.id.desc(),
+        ).limit(query.limit + 1)
+        invoices = list((await self.session.exec(statement)).all())
+
+        next_cursor = None
+        if len(invoices) > query.limit:
+            invoices = invoices[: query.limit]
+            next_cursor = encode_cursor(invoices[-1])
+        return invoices, next_cursor
+
+    async def is_customer_of_owner(
+        self,
+        customer_id: UUID,
+        organization_id: UUID,
+        user_id: UUID,
+    ) -> bool:
+        """Whether the customer belongs to an organization the user owns."""
         statement = (
-            select(Invoices)
-            .join(Organizations, Invoices.organization_id == Organizations.id)
-            .where(Organizations.owner_id == user_id)
+            select(Customers.id)
+            .join(Organizations, Customers.organization_id == Organizations.id)
+            .where(
+                Customers.id == customer_id,
+                Customers.organization_id == organization_id,
+                Organizations.owner_id == user_id,
+            )
         )
-        results = await self.session.exec(statement)
-        return results.all()
+        return (await self.session.exec(statement)).first() is not None
 
-    async def create_invoice(self, invoice_data: dict):
-        invoice = Invoices(**invoice_data)
+    async def create_invoice(
+        self,
+        invoice: Invoices,
+        items: list[dict],
+    ) -> list[InvoiceItems]:
+        """Insert an invoice and its items in one transaction.
+
+        The items go in as a single bulk INSERT rather than one per item.
+        """
+        invoice_items = [InvoiceItems(**item, invoice_id=invoice.id) for item in items]
         self.session.add(invoice)
+        await self.session.flush()
+        await self.session.execute(
+            insert(InvoiceItems),
+            [item.model_dump() for item in invoice_items],
+        )
         await self.session.commit()
-        await self.session.refresh(invoice)
-        return invoice
+        return invoice_items
+
+    async def invoice_number_taken(
+        self,
+        organization_id: UUID,
+        invoice_number: str,
+    ) -> bool:
+        """Whether the organization already has an invoice with this number."""
+        statement = select(Invoices.id).where(
+            Invoices.organization_id == organization_id,
+            Invoices.invoice_number == invoice_number,
+        )
+        return (await self.session.exec(statement.limit(1))).first() is not None
+
+    async def get_invoice(self, invoice_id: UUID):
+        return await self.session.get(Invoices, invoice_id)
 
-    async def get_invoice(self, invoice_id: str):
-        statement = select(Invoices).where(Invoices.id == invoice_id)
-        result = await self.session.exec(statement)
-        return result.one_or_none()
+    async def get_invoice_detail(
+        self,
+        invoice_id: UUID,
+        user_id: UUID,
+    ) -> Optional[Invoices]:
+        """Get one of the user's invoices with its items, payments and reminders.
+
+        Always four queries: the invoice joined with its customer, then one
+        select-in query per collection. Any other relationship raises instead
+        of lazy loading.
+        """
+        statement = (
+            select(Invoices)
+            .join(Organizations, Invoices.organization_id == Organizations.id)
+            .where(Invoices.id == invoice_id, Organizations.owner_id == user_id)
+            .options(
+                joinedload(Invoices.customer),
+                selectinload(Invoices.invoice_items),
+                selectinload(Invoices.transactions),
+                selectinload(Invoices.reminders),
+                raiseload("*"),
+            )
+        )
+        return (await self.session.exec(statement)).first()
@@ -0,0 +1,21 @@
+"""Organization Repository."""
+
+from uuid import UUID
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.tables import Organizations
+
+
+class OrganizationRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def is_owner(self, organization_id: UUID, user_id: UUID) -> bool:
+        """Whether the user owns the organization."""
+        statement = select(Organizations.id).where(
+            Organizations.id == organization_id,
+            Organizations.owner_id == user_id,
+        )
+        return (await self.session.exec(statement)).first() is not None
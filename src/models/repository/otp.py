@@ -0,0 +1,80 @@
+"""OTP Repository."""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, delete, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.tables import OTPVerifications, Users
+
+
+class OTPRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def replace(
+        self,
+        phone: str,
+        code_hash: str,
+        now: datetime,
+        expires_at: datetime,
+    ) -> None:
+        """Store a phone's new code, discarding the live codes it replaces."""
+        await self.session.execute(
+            delete(OTPVerifications).where(
+                OTPVerifications.phone == phone,
+                OTPVerifications.expires_at > now,
+            ),
+        )
+        self.session.add(
+            OTPVerifications(phone=phone, code_hash=code_hash, expires_at=expires_at),
+        )
+
+    async def verify(
+        self,
+        phone: str,
+        code_hash: str,
+        now: datetime,
+        max_attempts: int,
+    ) -> bool:
+        """Use up an attempt at a phone's live code, consuming it if it matches.
+
+        One UPDATE on (phone, expires_at): concurrent guesses each take an
+        attempt, and a code can only be verified once.
+        """
+        matches = OTPVerifications.code_hash == code_hash
+        statement = (
+            update(OTPVerifications)
+            .where(
+                OTPVerifications.phone == phone,
+                OTPVerifications.expires_at > now,
+                OTPVerifications.is_verified.is_(False),
+                OTPVerifications.attempts < max_attempts,
+            )
+            .values(
+                attempts=OTPVerifications.attempts + 1,
+                is_verified=matches,
+                # a used code expires at once, for the purge to remove
+                expires_at=case((matches, now), else_=OTPVerifications.expires_at),
+            )
+            .returning(OTPVerifications.is_verified)
+            .execution_options(synchronize_session=False)
+        )
+        return any((await self.session.execute(statement)).scalars())
+
+    async def purge_expired(self, now: datetime, limit: int) -> int:
+        """Delete up to ``limit`` expired codes, returning how many."""
+        expired = select(OTPVerifications.id).where(OTPVerifications.expires_at <= now)
+        if self.session.bind.dialect.name == "postgresql":
+            expired = expired.with_for_update(skip_locked=True)
+        statement = delete(OTPVerifications).where(
+            OTPVerifications.id.in_(expired.limit(limit).scalar_subquery()),
+        )
+        return (await self.session.execute(statement)).rowcount
+
+    async def get_user_by_phone(self, phone: str) -> Optional[Users]:
+        """Get the user with a phone number."""
+        statement = select(Users).where(Users.phone_number == phone)
+        return (await self.session.exec(statement)).first()
@@ -0,0 +1,207 @@
+"""Payment Repository."""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import joinedload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.balances import UNPAID_STATUSES
+from src.models.enums import InvoiceStatus, PaymentMethod, TransactionStatus
+from src.models.tables import (
+    CustomerBalances,
+    Customers,
+    Invoices,
+    Organizations,
+    Transactions,
+)
+
+CENT = Decimal("0.01")
+
+# Payments counted against an invoice: received, or on their way.
+COMMITTED_STATUSES = (TransactionStatus.COMPLETED, TransactionStatus.PENDING)
+
+
+def _committed(invoice_id):
+    """Sum of the payments received or on their way for an invoice."""
+    return (
+        select(func.coalesce(func.sum(Transactions.amount), 0))
+        .where(
+            Transactions.invoice_id == invoice_id,
+            Transactions.status.in_(COMMITTED_STATUSES),
+        )
+        .scalar_subquery()
+    )
+
+
+# What a payment can be settled from, by the outcome. Only a PENDING payment
+# can fail; a completed one stays completed whatever arrives after it.
+SETTLED_FROM = {
+    TransactionStatus.COMPLETED: (TransactionStatus.PENDING, TransactionStatus.FAILED),
+    TransactionStatus.FAILED: (TransactionStatus.PENDING,),
+}
+
+
+class PaymentRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_idempotency_key(self, key: str) -> Optional[Transactions]:
+        """Get the transaction a request with this key created."""
+        statement = select(Transactions).where(Transactions.idempotency_key == key)
+        return (await self.session.exec(statement)).first()
+
+    async def get_user_invoice(
+        self,
+        invoice_id: UUID,
+        user_id: UUID,
+    ) -> Optional[Invoices]:
+        """Get one of the user's invoices with its customer."""
+        statement = (
+            select(Invoices)
+            .join(Organizations, Invoices.organization_id == Organizations.id)
+            .where(Invoices.id == invoice_id, Organizations.owner_id == user_id)
+            .options(joinedload(Invoices.customer))
+        )
+        return (await self.session.exec(statement)).first()
+
+    async def oldest_payable_invoice(self, phone: str) -> Optional[Invoices]:
+        """Oldest unpaid invoice of the customers with this phone number.
+
+        Skips invoices already covered by payments received or on their way.
+        """
+        statement = (
+            select(Invoices)
+            .join(
+                CustomerBalances,
+                CustomerBalances.customer_id == Invoices.customer_id,
+            )
+            .where(
+                CustomerBalances.phone == phone,
+                Invoices.status.in_(UNPAID_STATUSES),
+                Invoices.total_amount > _committed(Invoices.id),
+            )
+            .order_by(
+                func.coalesce(Invoices.due_date, Invoices.issue_date),
+                Invoices.id,
+            )
+            .options(joinedload(Invoices.customer))
+            .limit(1)
+        )
+        return (await self.session.exec(statement)).first()
+
+    async def remaining(self, invoice: Invoices) -> Decimal:
+        """What an invoice still owes, less the payments on their way.
+
+        Locks the invoice until the transaction ends, so payments of it
+        initiated at the same time see each other's.
+        """
+        await self.session.execute(
+            select(Invoices.id).where(Invoices.id == invoice.id).with_for_update(),
+        )
+        committed = (await self.session.exec(select(_committed(invoice.id)))).one()
+        return (invoice.total_amount - Decimal(committed)).quantize(CENT)
+
+    async def expire_pending(self, before: datetime, limit: int, note: str) -> int:
+        """Fail up to ``limit`` mobile money payments PENDING since ``before``.
+
+        Returns how many were failed.
+        """
+        expired = select(Transactions.id).where(
+            Transactions.status == TransactionStatus.PENDING,
+            Transactions.payment_method == PaymentMethod.MOBILE_MONEY,
+            Transactions.created_at < before,
+        )
+        if self.session.bind.dialect.name == "postgresql":
+            expired = expired.with_for_update(skip_locked=True)
+        statement = (
+            update(Transactions)
+            .where(
+                Transactions.id.in_(expired.limit(limit).scalar_subquery()),
+                Transactions.status == TransactionStatus.PENDING,
+            )
+            .values(status=TransactionStatus.FAILED, notes=note)
+            .execution_options(synchronize_session=False)
+        )
+        return (await self.session.execute(statement)).rowcount
+
+    async def get_status(
+        self,
+        transaction_id: UUID,
+    ) -> Optional[TransactionStatus]:
+        """Get a payment's status, or None if there's no such payment."""
+        statement = select(Transactions.status).where(Transactions.id == transaction_id)
+        return (await self.session.exec(statement)).first()
+
+    async def settle(
+        self,
+        transaction_id: UUID,
+        status: TransactionStatus,
+        reference: Optional[str],
+    ):
+        """Record a payment's outcome, once.
+
+        Returns the payment, or None when the outcome was already recorded.
+        """
+        values = {"status": status}
+        if reference:
+            values["reference_number"] = reference
+        statement = (
+            update(Transactions)
+            .where(
+                Transactions.id == transaction_id,
+                Transactions.status.in_(SETTLED_FROM[status]),
+            )
+            .values(**values)
+            .returning(
+                Transactions.invoice_id,
+                Transactions.customer_id,
+                Transactions.amount,
+                Transactions.currency,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return (await self.session.execute(statement)).first()
+
+    async def close_if_paid(self, invoice_id: UUID) -> bool:
+        """Mark an unpaid invoice PAID once its completed payments cover it.
+
+        Locks the invoice first, so payments of the same invoice completing
+        at the same time see each other's.
+        """
+        await self.session.execute(
+            select(Invoices.id).where(Invoices.id == invoice_id).with_for_update(),
+        )
+        paid = (
+            select(func.coalesce(func.sum(Transactions.amount), 0))
+            .where(
+                Transactions.invoice_id == invoice_id,
+                Transactions.status == TransactionStatus.COMPLETED,
+            )
+            .scalar_subquery()
+        )
+        statement = (
+            update(Invoices)
+            .where(
+                Invoices.id == invoice_id,
+                Invoices.status.in_(UNPAID_STATUSES),
+                # half a cent of slack: sqlite sums money as floats
+                Invoices.total_amount < paid + CENT / 2,
+            )
+            .values(status=InvoiceStatus.PAID)
+            .execution_options(synchronize_session=False)
+        )
+        return (await self.session.execute(statement)).rowcount > 0
+
+    async def receipt_details(self, invoice_id: UUID):
+        """Invoice number and customer phone for a payment receipt."""
+        statement = (
+            select(Invoices.invoice_number, Customers.phone)
+            .join(Customers, Customers.id == Invoices.customer_id)
+            .where(Invoices.id == invoice_id)
+        )
+        return (await self.session.execute(statement)).one()
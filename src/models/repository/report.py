@@ -0,0 +1,119 @@
+"""Report Repository."""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import and_, case, func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.reports import INVOICES_WATERMARK, TRANSACTIONS_WATERMARK
+from src.models.repository.changes import utc
+from src.models.tables import (
+    CashFlowByMonth,
+    CustomerBalances,
+    Customers,
+    ReceivablesByDueDate,
+    Watermarks,
+)
+
+CENT = Decimal("0.01")
+
+# Aging buckets: (name, fewest days overdue, most days overdue).
+AGING_BUCKETS = (
+    ("current", None, 0),
+    ("days_1_30", 1, 30),
+    ("days_31_60", 31, 60),
+    ("days_61_90", 61, 90),
+    ("days_over_90", 91, None),
+)
+
+
+class ReportRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def aging(self, organization_id: UUID, today: date) -> list[dict]:
+        """Outstanding amounts per currency and aging bucket.
+
+        Sums one rollup row per due date, not the invoices.
+        """
+        due_date = ReceivablesByDueDate.due_date
+        columns = []
+        for name, fewest, most in AGING_BUCKETS:
+            conditions = []
+            if fewest is not None:
+                conditions.append(due_date <= today - timedelta(days=fewest))
+            if most is not None:
+                conditions.append(due_date >= today - timedelta(days=most))
+            outstanding = case(
+                (and_(*conditions), ReceivablesByDueDate.outstanding),
+                else_=0,
+            )
+            columns.append(func.coalesce(func.sum(outstanding), 0).label(name))
+        statement = (
+            select(
+                ReceivablesByDueDate.currency,
+                func.sum(ReceivablesByDueDate.invoices).label("invoices"),
+                *columns,
+            )
+            .where(ReceivablesByDueDate.organization_id == organization_id)
+            .group_by(ReceivablesByDueDate.currency)
+            .order_by(ReceivablesByDueDate.currency)
+        )
+        buckets = [name for name, _, _ in AGING_BUCKETS]
+        return [
+            {
+                **row,
+                **{name: Decimal(row[name]).quantize(CENT) for name in buckets},
+            }
+            for row in (await self.session.exec(statement)).mappings()
+        ]
+
+    async def cash_flow(self, organization_id: UUID, since: date) -> list[dict]:
+        """Invoiced, collected and outstanding amounts per month since ``since``."""
+        statement = (
+            select(
+                CashFlowByMonth.month,
+                CashFlowByMonth.currency,
+                CashFlowByMonth.invoiced,
+                CashFlowByMonth.collected,
+                CashFlowByMonth.outstanding,
+            )
+            .where(
+                CashFlowByMonth.organization_id == organization_id,
+                CashFlowByMonth.month >= since,
+            )
+            .order_by(CashFlowByMonth.month, CashFlowByMonth.currency)
+        )
+        return [dict(row) for row in (await self.session.exec(statement)).mappings()]
+
+    async def top_debtors(self, organization_id: UUID, limit: int) -> list[dict]:
+        """Customers owing the most, from the balance projection."""
+        statement = (
+            select(
+                CustomerBalances.customer_id,
+                Customers.name,
+                Customers.customer_code,
+                CustomerBalances.phone,
+                CustomerBalances.outstanding,
+            )
+            .join(Customers, Customers.id == CustomerBalances.customer_id)
+            .where(
+                CustomerBalances.organization_id == organization_id,
+                CustomerBalances.outstanding > 0,
+            )
+            .order_by(CustomerBalances.outstanding.desc())
+            .limit(limit)
+        )
+        return [dict(row) for row in (await self.session.exec(statement)).mappings()]
+
+    async def refreshed_through(self) -> Optional[datetime]:
+        """Time of the oldest change the rollups have caught up to."""
+        statement = select(func.min(Watermarks.updated_at)).where(
+            Watermarks.name.in_((INVOICES_WATERMARK, TRANSACTIONS_WATERMARK)),
+        )
+        refreshed = (await self.session.exec(statement)).one()
+        return utc(refreshed) if refreshed is not None else None
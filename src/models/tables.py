@@ -5,17 +5,15 @@ from datetime import date, datetime, timezone
 from decimal import Decimal
 from typing import Optional
 
+from sqlalchemy import JSON, DateTime, Index, func
 from sqlmodel import (
     Field,
     Relationship,
-    Session,
     SQLModel,
-    create_engine,
 )
 
-from src.settings import settings
-
 from .enums import (
+    ImportStatus,
     InvoiceStatus,
     PaymentMethod,
     ReminderStatus,
@@ -23,10 +21,9 @@ from .enums import (
     TransactionStatus,
 )
 
-# sqlite database
-engine = create_engine(
-    settings.DATABASE.database_url,
-)
+
+def _utcnow() -> datetime:
+    return datetime.now(tz=timezone.utc)
 
 
 # Base class for common fields
@@ -37,12 +34,17 @@ class BaseModel(SQLModel):
         default_factory=uuid.uuid4,
         primary_key=True,
     )
+    # Set per row: when the model is created, on every UPDATE SQLAlchemy
+    # issues, and by the database for rows inserted with plain SQL.
     created_at: datetime = Field(
-        default_factory=datetime.now(tz=timezone.utc),
+        default_factory=_utcnow,
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"server_default": func.now()},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.now(tz=timezone.utc),
-        sa_column_kwargs={"onupdate": datetime.now(tz=timezone.utc)},
+        default_factory=_utcnow,
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"server_default": func.now(), "onupdate": _utcnow},
     )
 
 
@@ -133,6 +135,14 @@ class Customers(BaseModel, table=True):
     """Customer table."""
 
     __tablename__ = "customers"
+    __table_args__ = (
+        # changes since a watermark, see ChangeRepository
+        Index(
+            "ix_customers_organization_id_updated_at", "organization_id", "updated_at"
+        ),
+        # imports match customers by phone number within an organization
+        Index("ix_customers_organization_id_phone", "organization_id", "phone"),
+    )
 
     organization_id: uuid.UUID = Field(
         foreign_key="organizations.id",
@@ -218,10 +228,43 @@ class Invoices(BaseModel, table=True):
     """Oraganization Invoice."""
 
     __tablename__ = "invoices"
-
+    __table_args__ = (
+        # invoice listing: keyset pages on (issue_date, id) within an
+        # organization, optionally narrowed to a status or a customer
+        Index(
+            "ix_invoices_organization_id_issue_date_id",
+            "organization_id",
+            "issue_date",
+            "id",
+        ),
+        Index(
+            "ix_invoices_organization_id_status_issue_date_id",
+            "organization_id",
+            "status",
+            "issue_date",
+            "id",
+        ),
+        Index(
+            "ix_invoices_customer_id_issue_date_id", "customer_id", "issue_date", "id"
+        ),
+        Index("ix_invoices_organization_id_due_date", "organization_id", "due_date"),
+        Index(
+            "ix_invoices_organization_id_updated_at", "organization_id", "updated_at"
+        ),
+        # changes across organizations, for the reporting rollups
+        Index("ix_invoices_updated_at", "updated_at"),
+        # the overdue sweep: SENT invoices past their due date
+        Index("ix_invoices_status_due_date", "status", "due_date"),
+        Index(
+            "ix_invoices_organization_id_invoice_number",
+            "organization_id",
+            "invoice_number",
+            unique=True,
+        ),
+    )
+
+    # unique per organization, see ix_invoices_organization_id_invoice_number
     invoice_number: str = Field(
-        unique=True,
-        index=True,
         max_length=50,
     )
     customer_id: uuid.UUID = Field(
@@ -275,11 +318,31 @@ class Invoices(BaseModel, table=True):
     reminders: list["Reminders"] = Relationship(back_populates="invoice")
 
 
+# Invoice number blocks
+class InvoiceCounters(SQLModel, table=True):
+    """Next unallocated invoice number of an organization.
+
+    Workers reserve numbers in blocks, so this row is updated once per block
+    rather than once per invoice.
+    """
+
+    __tablename__ = "invoice_counters"
+
+    organization_id: uuid.UUID = Field(
+        foreign_key="organizations.id",
+        primary_key=True,
+    )
+    next_value: int = Field(default=1)
+
+
 # Invoice Items table
 class InvoiceItems(BaseModel, table=True):
     """ "Invoice item."""
 
     __tablename__ = "invoice_items"
+    # no organization_id: changes are found by updated_at, then joined to
+    # their invoice
+    __table_args__ = (Index("ix_invoice_items_updated_at", "updated_at"),)
 
     invoice_id: uuid.UUID = Field(
         foreign_key="invoices.id",
@@ -315,6 +378,11 @@ class Transactions(BaseModel, table=True):
     """Transactions."""
 
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_updated_at", "updated_at"),
+        # the expiry of payments left PENDING
+        Index("ix_transactions_status_created_at", "status", "created_at"),
+    )
 
     transaction_number: str = Field(
         unique=True,
@@ -344,15 +412,28 @@ class Transactions(BaseModel, table=True):
     status: TransactionStatus = Field(
         default=TransactionStatus.PENDING,
     )
+    # provider's reference for the payment; unique, so a duplicated
+    # callback can't record the same payment twice
     reference_number: Optional[str] = Field(
         default=None,
+        unique=True,
+        index=True,
         max_length=100,
     )
     notes: Optional[str] = Field(  # noqa: FA100
         default=None,
     )
+    # sent by clients initiating a payment; a repeated request gets the
+    # transaction the first one created
+    idempotency_key: Optional[str] = Field(
+        default=None,
+        unique=True,
+        index=True,
+        max_length=100,
+    )
     transaction_date: datetime = Field(
-        default_factory=datetime.now(tz=timezone.utc),
+        default_factory=_utcnow,
+        sa_type=DateTime(timezone=True),
     )
 
     # Relationships
@@ -373,8 +454,14 @@ class Reminders(BaseModel, table=True):
     type: ReminderType = Field(default=ReminderType.SMS)
     status: ReminderStatus = Field(default=ReminderStatus.PENDING)
     message: str = Field(max_length=1000)
-    sent_at: Optional[datetime] = Field(default=None)
-    scheduled_for: Optional[datetime] = Field(default=None)
+    sent_at: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+    )
+    scheduled_for: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+    )
 
     # Relationships
     invoice: Invoices = Relationship(back_populates="reminders")
@@ -382,26 +469,239 @@ class Reminders(BaseModel, table=True):
     sender: Users = Relationship(back_populates="sent_reminders")
 
 
-# OTP Verification table (for phone verification)
-class OTPVerifications(BaseModel, table=True):
-    __tablename__ = "otp_verifications"
+# Outbound message queue
+class OutboundMessages(BaseModel, table=True):
+    """Message waiting to be sent by the outbox workers."""
 
-    phone: str = Field(max_length=20, index=True)
-    otp_code: str = Field(max_length=6)
-    is_verified: bool = Field(default=False)
-    expires_at: datetime
+    __tablename__ = "outbound_messages"
+    __table_args__ = (
+        # workers claim due rows with status = PENDING AND available_at <= now
+        Index("ix_outbound_messages_status_available_at", "status", "available_at"),
+    )
+
+    channel: ReminderType = Field(default=ReminderType.SMS)
+    recipient: str = Field(max_length=20)
+    message: str = Field(max_length=1000)
+    status: ReminderStatus = Field(default=ReminderStatus.PENDING)
     attempts: int = Field(default=0)
+    # when the row may next be claimed; pushed forward while a worker holds it
+    available_at: datetime = Field(
+        default_factory=_utcnow,
+        sa_type=DateTime(timezone=True),
+    )
+    sent_at: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+    )
+    provider_message_id: Optional[str] = Field(
+        default=None,
+        max_length=100,
+    )
+    last_error: Optional[str] = Field(
+        default=None,
+        max_length=500,
+    )
+    reminder_id: Optional[uuid.UUID] = Field(
+        default=None,
+        foreign_key="reminders.id",
+        index=True,
+    )
+
+
+# Per-customer balance projection
+class CustomerBalances(SQLModel, table=True):
+    """Outstanding balance of a customer, maintained by src.models.balances."""
+
+    __tablename__ = "customer_balances"
+    __table_args__ = (
+        # top debtors of an organization
+        Index(
+            "ix_customer_balances_organization_id_outstanding",
+            "organization_id",
+            "outstanding",
+        ),
+    )
+
+    customer_id: uuid.UUID = Field(
+        foreign_key="customers.id",
+        primary_key=True,
+        ondelete="CASCADE",
+    )
+    organization_id: uuid.UUID = Field(
+        foreign_key="organizations.id",
+        index=True,
+    )
+    # E.164, so USSD lookups by the caller's number are one indexed read
+    phone: Optional[str] = Field(
+        default=None,
+        max_length=20,
+        index=True,
+    )
+    # totals of the customer's unpaid (sent or overdue) invoices
+    invoiced_total: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=12,
+    )
+    paid_total: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=12,
+    )
+    outstanding: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=12,
+    )
+    updated_at: datetime = Field(
+        default_factory=_utcnow,
+        sa_type=DateTime(timezone=True),
+    )
+
+
+# Reporting rollups, maintained by src.models.reports
+class ReceivablesByDueDate(SQLModel, table=True):
+    """Open invoices of an organization, per currency and due date.
+
+    Aging buckets are sums over due date ranges, so the rollup doesn't
+    change as invoices age.
+    """
+
+    __tablename__ = "receivables_by_due_date"
+
+    organization_id: uuid.UUID = Field(
+        foreign_key="organizations.id",
+        primary_key=True,
+        ondelete="CASCADE",
+    )
+    currency: str = Field(primary_key=True, max_length=3)
+    due_date: date = Field(primary_key=True)
+    invoices: int = Field(default=0)
+    outstanding: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=14,
+    )
+
+
+class CashFlowByMonth(SQLModel, table=True):
+    """Invoiced, collected and still outstanding amounts per month.
+
+    Invoiced and outstanding amounts count by issue date, collections by
+    transaction date.
+    """
+
+    __tablename__ = "cash_flow_by_month"
+
+    organization_id: uuid.UUID = Field(
+        foreign_key="organizations.id",
+        primary_key=True,
+        ondelete="CASCADE",
+    )
+    currency: str = Field(primary_key=True, max_length=3)
+    # first day of the month
+    month: date = Field(primary_key=True)
+    invoiced: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=14,
+    )
+    collected: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=14,
+    )
+    outstanding: Decimal = Field(
+        default=Decimal("0.00"),
+        decimal_places=2,
+        max_digits=14,
+    )
+
+
+class InvoiceRollups(SQLModel, table=True):
+    """What an invoice last added to the rollups, to take back when it changes."""
+
+    __tablename__ = "invoice_rollups"
+
+    invoice_id: uuid.UUID = Field(primary_key=True)
+    organization_id: uuid.UUID
+    currency: str = Field(max_length=3)
+    due_date: date
+    month: date
+    is_open: bool
+    invoiced: Decimal = Field(decimal_places=2, max_digits=12)
+    outstanding: Decimal = Field(decimal_places=2, max_digits=12)
+
 
-    class Config:
-        # Auto-delete expired OTPs
-        table_args = {"sqlite_autoincrement": True}
+class TransactionRollups(SQLModel, table=True):
+    """What a transaction last added to the rollups."""
 
+    __tablename__ = "transaction_rollups"
 
-SQLModel.metadata.create_all(engine)
+    transaction_id: uuid.UUID = Field(primary_key=True)
+    organization_id: uuid.UUID
+    currency: str = Field(max_length=3)
+    month: date
+    collected: Decimal = Field(decimal_places=2, max_digits=12)
 
 
-#  session dependencies
-def get_session() -> Session:
-    """Get database session."""
-    with Session(engine) as session:
-        yield session
+class Watermarks(SQLModel, table=True):
+    """Where a change reader is up to, see ChangeRepository."""
+
+    __tablename__ = "watermarks"
+
+    name: str = Field(primary_key=True, max_length=100)
+    updated_at: datetime = Field(sa_type=DateTime(timezone=True))
+    row_id: uuid.UUID
+
+
+# Bulk invoice imports
+class ImportJobs(BaseModel, table=True):
+    """Progress and error report of a bulk invoice import."""
+
+    __tablename__ = "import_jobs"
+
+    organization_id: uuid.UUID = Field(
+        foreign_key="organizations.id",
+        index=True,
+    )
+    created_by: uuid.UUID = Field(foreign_key="users.id")
+    filename: Optional[str] = Field(
+        default=None,
+        max_length=255,
+    )
+    format: str = Field(max_length=10)
+    status: ImportStatus = Field(default=ImportStatus.PENDING)
+    rows_processed: int = Field(default=0)
+    invoices_imported: int = Field(default=0)
+    customers_created: int = Field(default=0)
+    rows_failed: int = Field(default=0)
+    # [{"line": ..., "invoice_number": ..., "error": ...}], capped
+    errors: list = Field(default_factory=list, sa_type=JSON)
+    finished_at: Optional[datetime] = Field(
+        default=None,
+        sa_type=DateTime(timezone=True),
+    )
+
+
+# OTP Verification table (for phone verification)
+class OTPVerifications(BaseModel, table=True):
+    """One-time codes sent to verify a phone number.
+
+    Only an HMAC of the code is kept. Expired rows are purged in the
+    background, so the table holds roughly the codes of the last few minutes.
+    """
+
+    __tablename__ = "otp_verifications"
+    __table_args__ = (
+        # verification: the live code of a phone
+        Index("ix_otp_verifications_phone_expires_at", "phone", "expires_at"),
+        # the purge
+        Index("ix_otp_verifications_expires_at", "expires_at"),
+    )
+
+    phone: str = Field(max_length=20)
+    code_hash: str = Field(max_length=64)
+    is_verified: bool = Field(default=False)
+    expires_at: datetime = Field(sa_type=DateTime(timezone=True))
+    attempts: int = Field(default=0)
@@ -0,0 +1,246 @@
+"""Opt-in profiles of single requests.
+
+With ``PROFILING_ENABLED`` the app gets ``ProfilingMiddleware``, which
+profiles a request when it sends an ``X-Profile`` header matching
+``PROFILING_TOKEN``, or at random with ``PROFILING_SAMPLE_RATE`` among the
+paths starting with one of ``PROFILING_PATHS``. When disabled the middleware
+is not installed at all, so it costs nothing.
+
+A profiled request's stack is sampled from a thread every
+``PROFILING_INTERVAL`` seconds. Samples follow the request's task rather
+than the event loop: while the task runs its frames are taken from the loop
+thread, and while it is suspended its chain of awaits is walked, ending in a
+``(waiting)`` frame. The result is wall-clock time, including time spent
+waiting on the database or an external API. Code run in the thread pool,
+such as sync dependencies, is not sampled.
+
+Each profile is written to ``PROFILING_DIR`` as ``<name>.folded``, one stack
+per line for flamegraph.pl, speedscope or inferno, next to a ``<name>.json``
+with the request ID and the request's SQL statements with their timings. The
+name is generated here, as request IDs may come from the caller, and the
+response gives it in its ``X-Profile`` header.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.instrumentation import current_request
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+
+
+def _frame_label(code: Any, labels: dict) -> str:
+    """Flamegraph frame name of a code object: function (file:line)."""
+    label = labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for marker in ("site-packages/", f"{Path.cwd()}/"):
+            if marker in filename:
+                filename = filename.split(marker, 1)[1]
+                break
+        name = getattr(code, "co_qualname", code.co_name)
+        label = f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+        labels[code] = label
+    return label
+
+
+def _awaited_frames(coro: Any) -> list:
+    """Frames of a suspended coroutine and what it awaits, outermost first."""
+    frames = []
+    while coro is not None:
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "gi_frame", None)
+            or getattr(coro, "ag_frame", None)
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+    return frames
+
+
+class TaskSampler:
+    """Sample the stack of one asyncio task from a background thread."""
+
+    def __init__(self, task: asyncio.Task, interval: float) -> None:
+        """Initialize. Must be created on the task's event loop thread."""
+        self.task = task
+        self.loop = task.get_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._labels: dict = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="request-profiler",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        root = self.task.get_coro().cr_frame
+        while not self._stop.wait(self.interval):
+            stack = self._sample(root)
+            if stack:
+                self.stacks[";".join(stack)] += 1
+
+    def _sample(self, root: Any) -> list[str]:
+        """The task's stack, outermost frame first."""
+        if asyncio.current_task(self.loop) is self.task:
+            frames = []
+            frame = sys._current_frames().get(self.loop_thread_id)
+            while frame is not None:
+                frames.append(frame)
+                if frame is root:
+                    break
+                frame = frame.f_back
+            frames.reverse()
+            leaf = []
+        else:
+            frames = _awaited_frames(self.task.get_coro())
+            leaf = ["(waiting)"]
+        return [_frame_label(frame.f_code, self._labels) for frame in frames] + leaf
+
+    def folded(self) -> str:
+        """The samples in the folded stack format, one stack per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it, or a random sample of them.
+
+    Profiles one request at a time per worker; others arriving meanwhile
+    run unprofiled.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: Optional[str] = settings.PROFILING_TOKEN,
+        sample_rate: float = settings.PROFILING_SAMPLE_RATE,
+        paths: tuple[str, ...] = tuple(settings.PROFILING_PATHS),
+        interval: float = settings.PROFILING_INTERVAL,
+        directory: str = settings.PROFILING_DIR,
+        max_profiles: int = settings.PROFILING_MAX_PROFILES,
+    ) -> None:
+        """Initialize."""
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.paths = paths
+        self.interval = interval
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+        self._active = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        """Whether to profile a request."""
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode():
+                    return hmac.compare_digest(value, self.token.encode())
+        if self.sample_rate <= 0:
+            return False
+        if self.paths and not scope["path"].startswith(self.paths):
+            return False
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request, profiling it if wanted."""
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        context = current_request()
+        name = f"{time.time_ns()}-{uuid.uuid4().hex}"
+        queries = []
+        if context is not None:
+            context.queries = queries
+
+        async def send_with_profile_name(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile", name)
+            await send(message)
+
+        sampler = TaskSampler(asyncio.current_task(), self.interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_name)
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            if context is not None:
+                context.queries = None
+            self._active = False
+            summary = {
+                "request_id": context.request_id if context is not None else None,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "duration_ms": round(elapsed * 1000, 2),
+                "interval_ms": self.interval * 1000,
+                "samples": sum(sampler.stacks.values()),
+                "db_ms": round(sum(query["ms"] for query in queries), 2),
+                "queries": queries,
+            }
+            try:
+                await asyncio.to_thread(self._save, name, sampler.folded(), summary)
+            except OSError:
+                logger.exception("Could not save the profile of %s", scope["path"])
+            else:
+                logger.info(
+                    "Profiled %s %s in %.1f ms: %s",
+                    scope["method"],
+                    scope["path"],
+                    elapsed * 1000,
+                    self.directory / f"{name}.folded",
+                )
+
+    def _save(self, name: str, folded: str, summary: dict) -> None:
+        """Write a profile, then drop the oldest beyond max_profiles."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{name}.folded").write_text(folded)
+        (self.directory / f"{name}.json").write_text(json.dumps(summary, indent=2))
+
+        profiles = sorted(
+            self.directory.glob("*.folded"),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for path in profiles[: max(0, len(profiles) - self.max_profiles)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+
+
+__all__ = ("ProfilingMiddleware", "TaskSampler")
@@ -1,21 +1,26 @@
 """Africas talkning Routes."""
 
+import math
 from typing import Annotated
-from uuid import uuid4
 
-from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from src.models.tables import Session, get_session
+from src.models.database import AsyncSession, get_session
 from src.schemas.auth import OTPRequestSchema, OTPResponseSchema
-from src.services.africastalking.sms import africastalking_sms
 from src.services.africastalking.ussd import ussd_menu
 from src.services.auth import create_access_token
+from src.services.otp import otp_service
+from src.services.outbox import enqueue_sms
+from src.services.ratelimit import RateLimitExceeded
 
 router = APIRouter()
 
 
 @router.post("/sms")
-async def send_sms(request: Request) -> dict:
+async def send_sms(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
+) -> dict:
     """Handle Two way sms."""
     form_data = await request.form()
     to = form_data.get("from")
@@ -25,7 +30,8 @@ async def send_sms(request: Request) -> dict:
         "Welcome Here\nWe are here to help you with invoicing. Please visit *384*21038#"
     )
 
-    africastalking_sms.send_sms(to, message)
+    enqueue_sms(session, to, message)
+    await session.commit()
 
     return {"status": "success", "data": {"to": to, "message": message}}
 
@@ -40,7 +46,7 @@ async def handle_ussd(request: Request) -> str:
     # service_code = form_data.get("serviceCode")
 
     user_input = text.strip().split("*")[-1] if text else ""
-    response = ussd_menu.handle_request(
+    response = await ussd_menu.handle_request(
         session_id=session_id,
         user_input=user_input,
         phone_number=phone_number,
@@ -49,35 +55,67 @@ async def handle_ussd(request: Request) -> str:
     return Response(str(response), media_type="text/plain")
 
 
+def _client_ip(request: Request) -> str:
+    """Address of the client, for rate limiting."""
+    return request.client.host if request.client else "unknown"
+
+
+def _too_many_requests(error: RateLimitExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please try again later",
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
 @router.post("/otp")
 async def send_otp(
     data: OTPRequestSchema,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> dict:
     """Send OTP."""
-    phone_number = data.phone_number
-    otp = "123456"  # Generate OTP here
-
-    africastalking_sms.send_sms(phone_number, f"Your OTP is {otp}")
+    try:
+        expires_at = await otp_service.send(
+            session,
+            data.phone_number,
+            _client_ip(request),
+        )
+    except RateLimitExceeded as error:
+        raise _too_many_requests(error) from error
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        ) from error
 
-    return {"status": "success", "data": {"phone_number": phone_number}}
+    return {
+        "status": "success",
+        "data": {"phone_number": data.phone_number, "expires_at": expires_at},
+    }
 
 
 @router.post("/verify-otp")
 async def verify_otp(
     data: OTPResponseSchema,
-    session: Annotated[Session, Depends(get_session)],
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_session)],
 ) -> dict:
     """Verify OTP."""
-    phone_number = data.phone_number
-    otp = data.otp
-    if otp == "123456":  # Replace with actual OTP verification logic
-        jwt = create_access_token(user_id=str(uuid4()))
-        return Response(
-            content={"token": {"value": jwt, "type": "Bearer"}},
-            status_code=status.HTTP_200_OK,
+    try:
+        user = await otp_service.verify(
+            session,
+            data.phone_number,
+            data.otp,
+            _client_ip(request),
         )
-    return Response(
-        content={"status": "error", "message": "Invalid OTP"},
-        status_code=status.HTTP_401_UNAUTHORIZED,
-    )
+    except RateLimitExceeded as error:
+        raise _too_many_requests(error) from error
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired OTP",
+        )
+
+    jwt = create_access_token(user_id=user.id)
+    return {"status": "success", "data": {"token": {"value": jwt, "type": "Bearer"}}}
@@ -0,0 +1,51 @@
+"""Export API Router."""
+
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from src.models.database import AsyncSession, get_session
+from src.models.repository.changes import settled
+from src.models.repository.organization import OrganizationRepository
+from src.schemas.export import ExportQuery, ExportResource
+from src.services import exports
+from src.services.auth import get_current_user_id
+
+router = APIRouter()
+
+
+@router.get("/{resource}")
+async def export(
+    resource: ExportResource,
+    query: Annotated[ExportQuery, Query()],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+):
+    """Stream an organization's invoices, invoice items or transactions.
+
+    For incremental exports, pass the ``X-Export-Until`` header of the
+    previous export as ``updated_since``.
+    """
+    if not await OrganizationRepository(session).is_owner(
+        query.organization_id,
+        user_id,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found",
+        )
+
+    until = settled()
+    filename = exports.filename(resource, query)
+    return StreamingResponse(
+        exports.stream_export(resource, query, until),
+        media_type="application/gzip"
+        if query.gzip
+        else exports.MEDIA_TYPES[query.format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Export-Until": until.isoformat(),
+        },
+    )
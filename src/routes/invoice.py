@@ -1,43 +1,229 @@
 """Invoice API Router."""
 
-from typing import Annotated
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Annotated, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    UploadFile,
+    status,
+)
+from sqlalchemy.exc import IntegrityError
 
-from src.models.tables import Session, get_session
-from src.services.auth import get_current_user
+from src.models.database import AsyncSession, get_session
+from src.models.repository.imports import ImportRepository
+from src.models.repository.invoice import InvoiceRepository
+from src.models.repository.organization import OrganizationRepository
+from src.models.repository.payment import PaymentRepository
+from src.models.tables import ImportJobs
+from src.schemas.invoice import InvoiceCreateSchema, InvoiceListQuery
+from src.schemas.payment import PaymentCreateSchema
+from src.services import imports
+from src.services import invoice as invoice_service
+from src.services.auth import get_current_user_id
+from src.services.payment import payment_service
 
 router = APIRouter()
 
+# Bytes copied at a time when saving an upload.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 @router.get("/")
 async def get_invoices(
-    session: Annotated[Session, Depends(get_session)],
-    user: Annotated[bool, Depends(get_current_user)],
+    query: Annotated[InvoiceListQuery, Query()],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
 ):
-    """Get all invoices."""
-    # Logic to retrieve all invoices
-    return {"status": "success", "data": []}
+    """Get a page of invoices, newest first.
+
+    Pass the returned ``next_cursor`` as ``cursor`` to get the next page.
+    """
+    try:
+        invoices, next_cursor = await InvoiceRepository(session).list_invoices(
+            user_id,
+            query,
+        )
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        ) from error
+    return {"status": "success", "data": invoices, "next_cursor": next_cursor}
 
 
 @router.post("/")
 async def create_invoice(
-    invoice_data: dict,
-    session: Annotated[Session, Depends(get_session)],
-    user: Annotated[bool, Depends(get_current_user)],
+    invoice_data: InvoiceCreateSchema,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
 ):
     """Create a new invoice."""
-    # Logic to create an invoice
-    return {"status": "success", "data": invoice_data}
+    try:
+        invoice, items = await invoice_service.create_invoice(
+            session,
+            user_id,
+            invoice_data,
+        )
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        ) from error
+    except IntegrityError as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Invoice conflicts with existing data, please retry",
+        ) from error
+    return {
+        "status": "success",
+        "data": {**invoice.model_dump(), "invoice_items": items},
+    }
+
+
+@router.post("/imports", status_code=status.HTTP_202_ACCEPTED)
+async def import_invoices(
+    organization_id: Annotated[UUID, Form()],
+    file: UploadFile,
+    background_tasks: BackgroundTasks,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    file_format: Annotated[Optional[str], Form(alias="format")] = None,
+):
+    """Import invoices from a CSV or JSONL file.
+
+    The import runs in the background; poll ``/imports/{job_id}`` for its
+    progress and the rows that failed.
+    """
+    file_format = file_format or Path(file.filename or "").suffix.lstrip(".")
+    file_format = {"ndjson": "jsonl"}.get(file_format.lower(), file_format.lower())
+    if file_format not in imports.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, expected one of {', '.join(imports.FORMATS)}",
+        )
+
+    if not await OrganizationRepository(session).is_owner(organization_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found",
+        )
+
+    # The upload is closed once the response is sent, so the background task
+    # reads its own copy, streamed to disk a chunk at a time off the event
+    # loop. The copy is removed if the job is never handed to the task.
+    destination = await asyncio.to_thread(
+        tempfile.NamedTemporaryFile,
+        suffix=f".{file_format}",
+        delete=False,
+    )
+    path = Path(destination.name)
+    try:
+        with destination:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(destination.write, chunk)
+
+        job = await ImportRepository(session).create_job(
+            ImportJobs(
+                organization_id=organization_id,
+                created_by=user_id,
+                filename=file.filename,
+                format=file_format,
+            ),
+        )
+        background_tasks.add_task(imports.run_import, job, path)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return {"status": "success", "data": job}
+
+
+@router.get("/imports/{job_id}")
+async def get_import(
+    job_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+):
+    """Get an import's progress and the rows that failed."""
+    job = await ImportRepository(session).get_job(job_id, user_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import not found",
+        )
+    return {"status": "success", "data": job}
 
 
 @router.get("/{invoice_id}")
 async def get_invoice(
-    invoice_id: str,
-    session: Annotated[Session, Depends(get_session)],
-    user: Annotated[bool, Depends(get_current_user)],
+    invoice_id: UUID,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
 ):
-    """Get an invoice by ID."""
-    # Logic to retrieve an invoice
-    return {"status": "success", "data": {"invoice_id": invoice_id}}
+    """Get an invoice by ID, with its customer, items, payments and reminders."""
+    invoice = await InvoiceRepository(session).get_invoice_detail(invoice_id, user_id)
+    if invoice is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invoice not found",
+        )
+
+    return {
+        "status": "success",
+        "data": {
+            **invoice.model_dump(),
+            "customer": invoice.customer,
+            "invoice_items": invoice.invoice_items,
+            "transactions": invoice.transactions,
+            "reminders": invoice.reminders,
+        },
+    }
+
+
+@router.post("/{invoice_id}/payments", status_code=status.HTTP_202_ACCEPTED)
+async def create_payment(
+    invoice_id: UUID,
+    payment: PaymentCreateSchema,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    idempotency_key: Annotated[
+        Optional[str],
+        Header(max_length=100),
+    ] = None,
+):
+    """Request a mobile money payment of an invoice.
+
+    Returns the PENDING transaction without waiting for the customer to
+    approve it. Retrying with the same ``Idempotency-Key`` header returns the
+    same transaction.
+    """
+    invoice = await PaymentRepository(session).get_user_invoice(invoice_id, user_id)
+    if invoice is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Invoice not found",
+        )
+
+    try:
+        transaction = await payment_service.initiate(
+            session,
+            invoice,
+            phone=payment.phone,
+            amount=payment.amount,
+            idempotency_key=idempotency_key,
+        )
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(error),
+        ) from error
+    return {"status": "success", "data": transaction}
@@ -0,0 +1,35 @@
+"""Metrics Routes."""
+
+import hmac
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from src.metrics import REGISTRY
+from src.settings import settings
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(
+    authorization: Annotated[str, Header()] = "",
+) -> PlainTextResponse:
+    """Expose metrics in the Prometheus text format.
+
+    When METRICS_TOKEN is set, scrapers must send it as a bearer token.
+    """
+    if settings.METRICS_TOKEN is not None and not hmac.compare_digest(
+        authorization.encode(),
+        f"Bearer {settings.METRICS_TOKEN}".encode(),
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4",
+    )
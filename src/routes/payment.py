@@ -0,0 +1,33 @@
+"""Payment API Router."""
+
+import hmac
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from src.models.database import AsyncSession, get_session
+from src.schemas.payment import ZenoPayWebhookSchema
+from src.services import payment
+from src.settings import settings
+
+router = APIRouter()
+
+
+@router.post("/zenopay/webhook")
+async def zenopay_webhook(
+    result: ZenoPayWebhookSchema,
+    session: Annotated[AsyncSession, Depends(get_session)],
+    x_api_key: Annotated[str, Header()] = "",
+):
+    """Record a payment result from ZenoPay.
+
+    Safe to receive more than once: repeated and late results are
+    acknowledged without changing anything.
+    """
+    if not hmac.compare_digest(x_api_key.encode(), settings.ZENOPAY_API_KEY.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+        )
+    outcome = await payment.record_result(session, result)
+    return {"status": "success", "data": {"outcome": outcome}}
@@ -0,0 +1,39 @@
+"""Report API Router."""
+
+from typing import Annotated
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.models.database import AsyncSession, get_session
+from src.models.repository.organization import OrganizationRepository
+from src.schemas.report import DashboardQuery
+from src.services import reports
+from src.services.auth import get_current_user_id
+
+router = APIRouter()
+
+
+@router.get("/dashboard")
+async def get_dashboard(
+    query: Annotated[DashboardQuery, Query()],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+):
+    """Receivables aging, monthly cash flow and top debtors.
+
+    Figures come from rollups refreshed in the background; ``as_of`` is how
+    far they have caught up.
+    """
+    if not await OrganizationRepository(session).is_owner(
+        query.organization_id,
+        user_id,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found",
+        )
+    return {
+        "status": "success",
+        "data": await reports.get_dashboard(session, query),
+    }
@@ -0,0 +1,36 @@
+"""Export schema."""
+
+import uuid
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExportResource(str, Enum):
+    """Tables that can be exported."""
+
+    INVOICES = "invoices"
+    INVOICE_ITEMS = "invoice_items"
+    TRANSACTIONS = "transactions"
+
+
+class ExportFormat(str, Enum):
+    """Export file formats."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class ExportQuery(BaseModel):
+    """Export filters and output options."""
+
+    organization_id: uuid.UUID
+    format: ExportFormat = ExportFormat.CSV
+    gzip: bool = False
+    # invoice issue date, or transaction date for transactions
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    # incremental export: only rows changed after this time
+    updated_since: Optional[datetime] = None
@@ -1,21 +1,95 @@
 """Invoice schema."""
 
-from pydantic import BaseModel, Field
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Optional
 
+from pydantic import BaseModel, Field, field_validator, model_validator
 
-# class InvoiceItemsSchema(BaseModel):
+from src.models.enums import InvoiceStatus
+
+
+class InvoiceItemCreateSchema(BaseModel):
+    """Invoice item schema."""
+
+    service_id: Optional[uuid.UUID] = None
+    description: str = Field(max_length=500)
+    quantity: Decimal = Field(gt=0, max_digits=10, decimal_places=2)
+    unit_price: Decimal = Field(ge=0, max_digits=10, decimal_places=2)
 
 
 class InvoiceCreateSchema(BaseModel):
-    """Invoice schema."""
+    """Invoice schema.
+
+    Totals and the invoice number are computed by the server.
+    """
+
+    organization_id: uuid.UUID
+    customer_id: uuid.UUID
+    items: list[InvoiceItemCreateSchema] = Field(min_length=1, max_length=500)
+    # percentage of the subtotal
+    tax_rate: Decimal = Field(default=Decimal(0), ge=0, le=100, decimal_places=2)
+    currency: str = Field(default="TZS", min_length=3, max_length=3)
+    status: InvoiceStatus = InvoiceStatus.DRAFT
+    issue_date: Optional[date] = None
+    due_date: Optional[date] = None
+
+    @field_validator("status")
+    @classmethod
+    def check_status(cls, status: InvoiceStatus) -> InvoiceStatus:
+        """Only start invoices as drafts or sent; payments settle them."""
+        if status not in (InvoiceStatus.DRAFT, InvoiceStatus.SENT):
+            msg = "status must be DRAFT or SENT"
+            raise ValueError(msg)
+        return status
+
+
+class InvoiceImportItemSchema(BaseModel):
+    """Imported invoice item schema."""
+
+    description: str = Field(max_length=500)
+    quantity: Decimal = Field(gt=0, max_digits=10, decimal_places=2)
+    unit_price: Decimal = Field(ge=0, max_digits=10, decimal_places=2)
+
+
+class InvoiceImportSchema(BaseModel):
+    """Imported invoice schema.
+
+    The customer is matched by code or phone number within the organization,
+    and created when it doesn't exist yet and a name is given.
+    """
+
+    invoice_number: str = Field(min_length=1, max_length=50)
+    customer_code: Optional[str] = Field(default=None, max_length=50)
+    customer_phone: Optional[str] = Field(default=None, max_length=20)
+    customer_name: Optional[str] = Field(default=None, max_length=255)
+    customer_email: Optional[str] = Field(default=None, max_length=255)
+    status: InvoiceStatus = InvoiceStatus.SENT
+    currency: str = Field(default="TZS", min_length=3, max_length=3)
+    issue_date: date
+    due_date: Optional[date] = None
+    tax_amount: Decimal = Field(default=Decimal(0), ge=0, decimal_places=2)
+    items: list[InvoiceImportItemSchema] = Field(min_length=1, max_length=500)
+
+    @model_validator(mode="after")
+    def check_customer(self) -> "InvoiceImportSchema":
+        """Require a way to find the customer."""
+        if not self.customer_code and not self.customer_phone:
+            msg = "customer_code or customer_phone is required"
+            raise ValueError(msg)
+        return self
 
-    id: str = Field(default=None)
-    organization_id: str
-    customer_id: str
-    amount: float
-    status: str
 
-    class Config:
-        """Pydantic config."""
+class InvoiceListQuery(BaseModel):
+    """Invoice listing filters and page."""
 
-        orm_mode = True
+    status: Optional[list[InvoiceStatus]] = None
+    organization_id: Optional[uuid.UUID] = None
+    customer_id: Optional[uuid.UUID] = None
+    due_from: Optional[date] = None
+    due_to: Optional[date] = None
+    min_amount: Optional[Decimal] = None
+    max_amount: Optional[Decimal] = None
+    cursor: Optional[str] = None
+    limit: int = Field(default=50, ge=1, le=200)
@@ -0,0 +1,30 @@
+"""Payment schema."""
+
+from decimal import Decimal
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PaymentCreateSchema(BaseModel):
+    """Mobile money payment of an invoice.
+
+    Defaults to what the invoice still owes, from the customer's phone.
+    """
+
+    phone: Optional[str] = Field(default=None, max_length=20)
+    amount: Optional[Decimal] = Field(
+        default=None,
+        gt=0,
+        max_digits=12,
+        decimal_places=2,
+    )
+
+
+class ZenoPayWebhookSchema(BaseModel):
+    """Payment result ZenoPay posts to the webhook."""
+
+    order_id: str = Field(max_length=100)
+    payment_status: str = Field(max_length=50)
+    reference: Optional[str] = Field(default=None, max_length=100)
+    metadata: Optional[dict] = None
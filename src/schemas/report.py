@@ -0,0 +1,14 @@
+"""Report schema."""
+
+import uuid
+
+from pydantic import BaseModel, Field
+
+
+class DashboardQuery(BaseModel):
+    """Organization dashboard options."""
+
+    organization_id: uuid.UUID
+    # months of cash flow, including the current one
+    months: int = Field(default=12, ge=1, le=60)
+    top: int = Field(default=10, ge=1, le=100)
@@ -0,0 +1,199 @@
+"""Table-driven USSD menus.
+
+A flow is a set of states defined as data. Each state has a prompt and either
+numbered options or a free-text input leading to other states. The engine
+compiles the flow once into a dispatch table: static screens are rendered up
+front, so a hop is a dict lookup plus at most one session read and one write.
+"""
+
+import string
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.services.africastalking.sessions import SessionStore
+
+SESSION_EXPIRED = "END Session expired. Please try again."
+
+
+@dataclass(frozen=True)
+class Hop:
+    """A USSD request within a session."""
+
+    session_id: str
+    phone_number: str
+    user_input: str
+    session: dict
+
+
+# Called when entering a state; returns values to store in the session.
+Loader = Callable[[Hop], Awaitable[dict]]
+
+
+@dataclass(frozen=True)
+class Option:
+    """Numbered menu choice."""
+
+    label: str
+    next: str
+
+
+@dataclass(frozen=True)
+class Input:
+    """Free-text answer, stored in the session under ``name``."""
+
+    name: str
+    next: str
+    validate: Callable[[str], bool] = bool
+
+
+@dataclass(frozen=True)
+class State:
+    """Screen of a USSD flow.
+
+    ``prompt`` may reference session values as ``{name}``. A state without
+    options or input ends the session.
+    """
+
+    name: str
+    prompt: str
+    options: tuple[Option, ...] = ()
+    input: Optional[Input] = None
+    on_enter: Optional[Loader] = None
+    invalid: str = "Invalid option"
+
+    @property
+    def end(self) -> bool:
+        """Whether the session ends on this state."""
+        return not self.options and self.input is None
+
+
+@dataclass
+class Screen:
+    """Response text, pre-rendered when it does not depend on the session."""
+
+    template: str
+    static: bool = field(init=False)
+
+    def __post_init__(self) -> None:
+        """Check whether the template has fields."""
+        self.static = not any(
+            name is not None
+            for _, name, _, _ in string.Formatter().parse(self.template)
+        )
+
+    def render(self, session: dict) -> str:
+        """Render the screen for a session."""
+        return self.template if self.static else self.template.format_map(session)
+
+
+@dataclass
+class CompiledState:
+    """State with its screens and transitions resolved."""
+
+    state: State
+    screen: Screen
+    invalid_screen: Screen
+    transitions: dict[str, str]
+
+
+def _compile(state: State) -> CompiledState:
+    prefix = "END" if state.end else "CON"
+    lines = [
+        f"{index}. {option.label}" for index, option in enumerate(state.options, 1)
+    ]
+    body = "\n".join(lines)
+    screen = f"{prefix} {state.prompt}" + (f"\n{body}" if body else "")
+    invalid = f"CON {state.invalid}" + (f"\n{body}" if body else "")
+    return CompiledState(
+        state=state,
+        screen=Screen(screen),
+        invalid_screen=Screen(invalid),
+        transitions={
+            str(index): option.next for index, option in enumerate(state.options, 1)
+        },
+    )
+
+
+class MenuEngine:
+    """Run a USSD flow against a session store."""
+
+    def __init__(
+        self,
+        states: Iterable[State],
+        *,
+        start: str,
+        session_store: SessionStore,
+    ) -> None:
+        """Compile the flow, checking every transition leads to a known state."""
+        self.table = {state.name: _compile(state) for state in states}
+        self.start = start
+        self.session_store = session_store
+
+        targets = [start]
+        for compiled in self.table.values():
+            targets.extend(compiled.transitions.values())
+            if compiled.state.input:
+                targets.append(compiled.state.input.next)
+        unknown = sorted(set(targets) - set(self.table))
+        if unknown:
+            msg = f"Unknown USSD states: {', '.join(unknown)}"
+            raise ValueError(msg)
+        if self.table[start].state.on_enter:
+            msg = "The start state cannot have an on_enter loader"
+            raise ValueError(msg)
+
+    async def handle_request(
+        self,
+        *,
+        session_id: str,
+        user_input: str,
+        phone_number: str,
+    ) -> str:
+        """Handle one hop and return the response text."""
+        start = self.table[self.start]
+        session, created = await self.session_store.get_or_create(
+            session_id,
+            {"state": self.start},
+        )
+        if created:
+            return start.screen.render(session)
+
+        current = self.table.get(session.get("state"))
+        if current is None:
+            await self.session_store.delete(session_id)
+            return SESSION_EXPIRED
+
+        updates = {}
+        target = current.transitions.get(user_input)
+        if (
+            target is None
+            and current.state.input
+            and current.state.input.validate(user_input)
+        ):
+            target = current.state.input.next
+            updates[current.state.input.name] = user_input
+        if target is None:
+            return current.invalid_screen.render(session)
+
+        return await self._enter(
+            self.table[target],
+            Hop(session_id, phone_number, user_input, session),
+            updates,
+        )
+
+    async def _enter(self, compiled: CompiledState, hop: Hop, updates: dict) -> str:
+        """Move the session to a state and render its screen."""
+        if compiled.state.on_enter:
+            updates.update(await compiled.state.on_enter(hop))
+        hop.session.update(updates)
+
+        if compiled.state.end:
+            await self.session_store.delete(hop.session_id)
+        else:
+            updates["state"] = compiled.state.name
+            await self.session_store.update(hop.session_id, updates)
+        return compiled.screen.render(hop.session)
+
+
+__all__ = ("Hop", "Input", "MenuEngine", "Option", "State")
@@ -0,0 +1,228 @@
+"""USSD session stores.
+
+A USSD session spans several requests that may land on different workers, so
+the session state lives in a store shared by all of them. Each hop reads (and
+if needed creates) its session in one call and writes it back in another.
+"""
+
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.services.providers import providers
+from src.settings import settings
+
+
+def _create_redis_client() -> Any:
+    """Create the shared Redis client."""
+    from redis.asyncio import Redis
+
+    if not settings.REDIS_URL:
+        msg = "REDIS_URL is required for the redis session store"
+        raise ValueError(msg)
+    return Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+providers.register("redis", _create_redis_client, close=lambda client: client.aclose())
+
+
+class SessionStore(ABC):
+    """Storage for USSD session state."""
+
+    @abstractmethod
+    async def get_or_create(self, session_id: str, initial: dict) -> tuple[dict, bool]:
+        """Get a session, creating it from ``initial`` if it does not exist.
+
+        Returns the session data and whether it was created. Reading a session
+        refreshes its TTL.
+        """
+
+    @abstractmethod
+    async def update(self, session_id: str, data: dict) -> None:
+        """Merge data into an existing session. Missing sessions are ignored."""
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        """End a session."""
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store with TTL and max-size eviction.
+
+    Only suitable for a single worker. Sessions are kept in least recently
+    used order; since every access refreshes the TTL, that is also expiry
+    order, so expired sessions are always at the front.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.USSD_SESSION_TTL,
+        max_size: int = settings.USSD_SESSION_MAX_SIZE,
+    ) -> None:
+        """Initialize."""
+        self.ttl = ttl
+        self.max_size = max_size
+        self._sessions: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of stored sessions, including expired ones not yet evicted."""
+        return len(self._sessions)
+
+    def _evict(self, now: float) -> None:
+        """Drop expired sessions, then the least recently used over max_size."""
+        while self._sessions:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now and len(self._sessions) <= self.max_size:
+                break
+            del self._sessions[session_id]
+
+    def _touch(self, session_id: str, data: dict, now: float) -> None:
+        self._sessions[session_id] = (now + self.ttl, data)
+        self._sessions.move_to_end(session_id)
+
+    async def get_or_create(self, session_id: str, initial: dict) -> tuple[dict, bool]:
+        """Get a session, creating it from ``initial`` if it does not exist."""
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._sessions.get(session_id)
+        created = entry is None
+        data = dict(initial) if created else entry[1]
+        self._touch(session_id, data, now)
+        self._evict(now)
+        return dict(data), created
+
+    async def update(self, session_id: str, data: dict) -> None:
+        """Merge data into an existing session."""
+        now = time.monotonic()
+        entry = self._sessions.get(session_id)
+        if entry is None or entry[0] <= now:
+            return
+        entry[1].update(data)
+        self._touch(session_id, entry[1], now)
+
+    async def delete(self, session_id: str) -> None:
+        """End a session."""
+        self._sessions.pop(session_id, None)
+
+
+# KEYS[1] session key, ARGV[1] ttl, ARGV[2:] initial field/value pairs
+GET_OR_CREATE_SCRIPT = """
+local created = 0
+local data = redis.call('HGETALL', KEYS[1])
+if #data == 0 then
+    created = 1
+    data = {unpack(ARGV, 2)}
+    if #data > 0 then
+        redis.call('HSET', KEYS[1], unpack(data))
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return {created, data}
+"""
+
+# KEYS[1] session key, ARGV[1] ttl, ARGV[2:] field/value pairs to merge
+UPDATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def _encode(data: dict) -> list[str]:
+    """Flatten a dict into hash field/value pairs with JSON values."""
+    pairs = []
+    for key, value in data.items():
+        pairs.extend((key, json.dumps(value)))
+    return pairs
+
+
+def _decode(pairs: list[str]) -> dict:
+    """Inverse of _encode."""
+    return {
+        pairs[index]: json.loads(pairs[index + 1]) for index in range(0, len(pairs), 2)
+    }
+
+
+class RedisSessionStore(SessionStore):
+    """Store shared by every worker, kept in Redis hashes.
+
+    Reads and updates are Lua scripts, so each is atomic and takes a single
+    round-trip. Works with any server that speaks the Redis protocol and
+    supports EVALSHA.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        ttl: float = settings.USSD_SESSION_TTL,
+        prefix: str = "ussd:session:",
+    ) -> None:
+        """Initialize."""
+        self._client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._scripts: dict[str, Any] = {}
+
+    @property
+    def client(self) -> Any:
+        """Get the Redis client, defaulting to the shared one."""
+        return self._client if self._client is not None else providers.get("redis")
+
+    def _script(self, source: str) -> Any:
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self.client.register_script(source)
+        return script
+
+    async def get_or_create(self, session_id: str, initial: dict) -> tuple[dict, bool]:
+        """Get a session, creating it from ``initial`` if it does not exist."""
+        created, pairs = await self._script(GET_OR_CREATE_SCRIPT)(
+            keys=[self.prefix + session_id],
+            args=[self.ttl, *_encode(initial)],
+        )
+        return _decode(pairs), bool(created)
+
+    async def update(self, session_id: str, data: dict) -> None:
+        """Merge data into an existing session."""
+        if not data:
+            return
+        await self._script(UPDATE_SCRIPT)(
+            keys=[self.prefix + session_id],
+            args=[self.ttl, *_encode(data)],
+        )
+
+    async def delete(self, session_id: str) -> None:
+        """End a session."""
+        await self.client.delete(self.prefix + session_id)
+
+
+SESSION_STORES = {
+    "memory": MemorySessionStore,
+    "redis": RedisSessionStore,
+}
+
+
+def create_session_store(
+    backend: Optional[str] = None,
+) -> SessionStore:
+    """Create the session store configured by USSD_SESSION_STORE."""
+    backend = backend or settings.USSD_SESSION_STORE
+    try:
+        store_class = SESSION_STORES[backend]
+    except KeyError as error:
+        msg = f"Unknown USSD session store: {backend}"
+        raise ValueError(msg) from error
+    return store_class()
+
+
+__all__ = (
+    "MemorySessionStore",
+    "RedisSessionStore",
+    "SessionStore",
+    "create_session_store",
+)
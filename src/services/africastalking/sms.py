@@ -1,14 +1,61 @@
 """Africastalking SMS service."""
 
+import asyncio
+import logging
+import random
+from collections.abc import AsyncIterator, Iterable
 from typing import Union
 
-import africastalking
+import httpx
 from pydantic import BaseModel
 
+from src.instrumentation import metered_transport
+from src.services.providers import providers
 from src.settings import settings
-from src.utils import phone_number_validator
+from src.utils import normalize_phone_numbers, phone_number_validator
 
-africastalking.initialize(settings.AT_USERNAME, settings.AT_API_KEY)
+logger = logging.getLogger(__name__)
+
+MESSAGING_PATH = "/version1/messaging"
+
+# Responses that mean the message was not accepted and can be sent again.
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503})
+
+# Per-recipient status codes.
+SUCCESS_STATUS_CODES = frozenset({100, 101, 102})
+RETRYABLE_RECIPIENT_STATUS_CODES = frozenset({500, 501})
+INVALID_PHONE_NUMBER_STATUS_CODE = 403
+
+# Failures where the request never reached the API. Read timeouts are not
+# retried since the message may already be on its way.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Create the keep-alive HTTP client for the AfricasTalking API."""
+    return httpx.AsyncClient(
+        base_url=settings.at_api_url,
+        headers={"apiKey": settings.AT_API_KEY, "Accept": "application/json"},
+        timeout=httpx.Timeout(settings.AT_TIMEOUT),
+        transport=metered_transport(
+            "africastalking",
+            httpx.Limits(
+                max_connections=settings.AT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AT_MAX_CONNECTIONS,
+            ),
+        ),
+    )
+
+
+providers.register(
+    "africastalking_http",
+    _create_http_client,
+    close=lambda client: client.aclose(),
+)
+
+
+class SMSProviderError(Exception):
+    """The SMS provider could not be reached or rejected the request."""
 
 
 class SMSResponse(BaseModel):
@@ -20,30 +67,171 @@ class SMSResponse(BaseModel):
     messageId: Union[str, None] = None
     statusCode: int
 
+    @classmethod
+    def failed(cls, number: str, status: str, status_code: int) -> "SMSResponse":
+        """Response for a recipient the message was not sent to."""
+        return cls(cost="0", number=number, status=status, statusCode=status_code)
+
 
 class AfricasTalkingSMS:
     """AfricasTalking SMS service."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_retries: int = settings.AT_MAX_RETRIES,
+        retry_backoff: float = settings.AT_RETRY_BACKOFF,
+    ) -> None:
         """Initialize."""
-        self.sms = africastalking.SMS
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client."""
+        return providers.get("africastalking_http")
 
-    def send_sms(self, to: Union[str, list], message: str) -> list[SMSResponse]:
+    async def send_sms(self, to: Union[str, list], message: str) -> list[SMSResponse]:
         """Send an SMS message."""
+        if isinstance(to, str):
+            to = [phone_number_validator(to)]
+        else:
+            normalized = normalize_phone_numbers(to)
+            if normalized.errors:
+                msg = "Invalid phone number"
+                raise ValueError(msg)
+            to = [normalized.valid[number] for number in to]
+
+        return await self._send(to, message)
+
+    async def send_bulk(
+        self,
+        messages: Iterable[tuple[str, str]],
+        *,
+        batch_size: int = settings.AT_BULK_BATCH_SIZE,
+        concurrency: int = settings.AT_BULK_CONCURRENCY,
+    ) -> AsyncIterator[SMSResponse]:
+        """Send (phone number, message) pairs, yielding a response per recipient.
+
+        Recipients sharing a message body are sent together in requests of at
+        most ``batch_size`` numbers, with up to ``concurrency`` requests in
+        flight. Responses are yielded as each request completes. Recipients
+        that fail with a retryable status are sent again; ones that already
+        succeeded are not. Invalid and duplicate numbers are never sent.
+        """
+        async for _, response in self.send_bulk_by_message(
+            messages,
+            batch_size=batch_size,
+            concurrency=concurrency,
+        ):
+            yield response
+
+    async def send_bulk_by_message(
+        self,
+        messages: Iterable[tuple[str, str]],
+        *,
+        batch_size: int = settings.AT_BULK_BATCH_SIZE,
+        concurrency: int = settings.AT_BULK_CONCURRENCY,
+    ) -> AsyncIterator[tuple[str, SMSResponse]]:
+        """Like send_bulk, but yield (message, response) pairs."""
+        messages = list(messages)
+        normalized = normalize_phone_numbers(number for number, _ in messages)
+
+        groups: dict[str, dict[str, None]] = {}
+        for phone_number, message in messages:
+            number = normalized.valid.get(phone_number)
+            if number is None:
+                yield (
+                    message,
+                    SMSResponse.failed(
+                        phone_number,
+                        "InvalidPhoneNumber",
+                        INVALID_PHONE_NUMBER_STATUS_CODE,
+                    ),
+                )
+                continue
+            groups.setdefault(message, {})[number] = None
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send_batch(
+            numbers: list[str],
+            message: str,
+        ) -> tuple[str, list[SMSResponse]]:
+            async with semaphore:
+                try:
+                    return message, await self._send_batch(numbers, message)
+                except Exception as error:
+                    # e.g. a reply that isn't the expected JSON; the other
+                    # batches still go out
+                    logger.exception("SMS batch failed")
+                    return message, [
+                        SMSResponse.failed(
+                            number,
+                            f"{type(error).__name__}: {error}",
+                            500,
+                        )
+                        for number in numbers
+                    ]
+
+        tasks = []
+        for message, recipients in groups.items():
+            numbers = list(recipients)
+            for start in range(0, len(numbers), batch_size):
+                batch = numbers[start : start + batch_size]
+                tasks.append(asyncio.ensure_future(send_batch(batch, message)))
+
         try:
-            if isinstance(to, str):
-                to = [phone_number_validator(to)]
-            else:
-                to = [phone_number_validator(num) for num in to]
-        except Exception as error:
-            msg = "Invalid phone number"
-            raise ValueError(msg) from error
-
-        response = self.sms.send(
-            message,
-            to,
-            sender_id=settings.AT_SENDER_ID,
-        )  # extra info
+            for completed in asyncio.as_completed(tasks):
+                message, responses = await completed
+                for response in responses:
+                    yield message, response
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _send_batch(self, numbers: list[str], message: str) -> list[SMSResponse]:
+        """Send one batch, resending only to recipients that failed retryably."""
+        results: dict[str, SMSResponse] = {}
+        pending = numbers
+        for attempt in range(self.max_retries + 1):
+            try:
+                responses = await self._send(pending, message)
+            except SMSProviderError as error:
+                # the request itself was already retried by _post
+                results.update(
+                    (number, SMSResponse.failed(number, str(error), 500))
+                    for number in pending
+                )
+                break
+
+            for response in responses:
+                results[response.number] = response
+            pending = [
+                number
+                for number in pending
+                if number not in results
+                or results[number].statusCode in RETRYABLE_RECIPIENT_STATUS_CODES
+            ]
+            if not pending:
+                break
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt))
+
+        for number in pending:
+            results.setdefault(number, SMSResponse.failed(number, "NoResponse", 500))
+        return [results[number] for number in numbers]
+
+    async def _send(self, to: list[str], message: str) -> list[SMSResponse]:
+        """Send a message to already validated numbers."""
+        data = {
+            "username": settings.AT_USERNAME,
+            "to": ",".join(to),
+            "message": message,
+        }
+        if settings.AT_SENDER_ID:
+            data["from"] = settings.AT_SENDER_ID
+
+        response = await self._post(MESSAGING_PATH, data)
         recipients = response.get("SMSMessageData", {}).get("Recipients", [])
         # response should be recipients-> {cost, number and status and statusCode}
         return [
@@ -57,5 +245,40 @@ class AfricasTalkingSMS:
             for recipient in recipients
         ]
 
+    async def _post(self, path: str, data: dict) -> dict:
+        """Post a form to the API, retrying with jittered exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.post(path, data=data)
+            except RETRYABLE_ERRORS as error:
+                if last_attempt:
+                    msg = "AfricasTalking API is unreachable"
+                    raise SMSProviderError(msg) from error
+            except httpx.HTTPError as error:
+                msg = "AfricasTalking request failed"
+                raise SMSProviderError(msg) from error
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.is_error:
+                        msg = (
+                            f"AfricasTalking API error {response.status_code}: "
+                            f"{response.text}"
+                        )
+                        raise SMSProviderError(msg)
+                    return response.json()
+                if last_attempt:
+                    msg = f"AfricasTalking API unavailable ({response.status_code})"
+                    raise SMSProviderError(msg)
+
+            await asyncio.sleep(self._backoff(attempt))
+
+        msg = "AfricasTalking request was not attempted"
+        raise SMSProviderError(msg)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter backoff for a retry attempt."""
+        return random.uniform(0, self.retry_backoff * 2**attempt)
+
 
 africastalking_sms = AfricasTalkingSMS()
@@ -1,107 +1,96 @@
 """USSD service for Africastalking."""
 
-
-# session_manager.py
-class SessionManager:
-    """Session Manager."""
-
-    def __init__(self) -> None:
-        """Initialize."""
-        self.sessions = {}
-
-    def start_session(self, session_id: str):
-        self.sessions[session_id] = {"step": "main_menu"}
-
-    def get_session(self, session_id: str):
-        return self.sessions.get(session_id, None)
-
-    def update_session(self, session_id: str, data: dict):
-        if session_id in self.sessions:
-            self.sessions[session_id].update(data)
-
-    def end_session(self, session_id: str):
-        if session_id in self.sessions:
-            del self.sessions[session_id]
-
-
-class USSDMenu:
-    """USSD Menu manager."""
-
-    def __init__(self, session_manager: SessionManager):
-        self.session_manager = session_manager
-
-    def handle_request(
-        self,
-        *,
-        session_id: str,
-        user_input: str,
-        phone_number: str,
-    ):
-        session = self.session_manager.get_session(session_id)
-
-        # Start a new session if it doesn't exist
-        if not session:
-            self.session_manager.start_session(session_id)
-            session = self.session_manager.get_session(session_id)
-            return self.main_menu(session_id)
-
-        step = session["step"]
-
-        # Flow handling based on step
-        if step == "main_menu":
-            return self.main_menu(session_id)
-
-        if step == "main_menu_response":
-            return self.main_menu_response(session_id, user_input)
-
-        if step == "payment_menu":
-            return self.payment_menu(session_id, user_input, phone_number)
-
-        self.session_manager.end_session(session_id)
-        return "END Session expired. Please try again."
-
-    # ---------- Menu Handlers ----------
-    def main_menu(self, session_id: str):
-        response = "CON Welcome to InFlow360 Invoice Service\n"
-        response += "1. Check outstanding payments\n"
-        response += "2. Make Payment\n"
-        response += "3. Exit"
-        self.session_manager.update_session(session_id, {"step": "main_menu_response"})
-        return response
-
-    def main_menu_response(self, session_id: str, user_input: str):
-        if user_input == "1":
-            outstanding = 150  # Example: fetch from DB
-            self.session_manager.update_session(
-                session_id,
-                {"step": "payment_menu", "outstanding": outstanding},
+from src.models.database import database
+from src.models.repository.balance import BalanceRepository
+from src.models.repository.payment import PaymentRepository
+from src.services.africastalking.menu import Hop, MenuEngine, Option, State
+from src.services.africastalking.sessions import create_session_store
+from src.services.payment import payment_service
+from src.utils import phone_number_validator
+
+
+async def load_outstanding(hop: Hop) -> dict:
+    """Load the caller's outstanding balance."""
+    async with database.session() as session:
+        outstanding = await BalanceRepository(session).get_outstanding_by_phone(
+            hop.phone_number,
+        )
+    return {"outstanding": f"{outstanding:,.2f}"}
+
+
+async def initiate_payment(hop: Hop) -> dict:
+    """Request payment of the caller's oldest unpaid invoice from their phone.
+
+    Returns once the payment is recorded; the caller gets the mobile money
+    prompt after the session ends. The USSD session ID is the idempotency
+    key, so a repeated hop doesn't charge twice.
+    """
+    try:
+        phone = phone_number_validator(hop.phone_number)
+    except ValueError:
+        return {"payment": "No payment is due."}
+
+    async with database.session() as session:
+        invoice = await PaymentRepository(session).oldest_payable_invoice(phone)
+        if invoice is None:
+            return {"payment": "No payment is due."}
+        try:
+            transaction = await payment_service.initiate(
+                session,
+                invoice,
+                phone=phone,
+                idempotency_key=f"ussd:{hop.session_id}",
             )
-            return f"CON Outstanding payment: TSH {outstanding}\n1. Pay now\n2. Back"
-
-        if user_input == "2":
-            self.session_manager.update_session(session_id, {"step": "payment_menu"})
-            return "CON Make Payment\n1. Pay now\n2. Back"
-
-        if user_input == "3":
-            self.session_manager.end_session(session_id)
-            return "END Thank you for using our service"
-
-        return "CON Invalid option\n1. Check payments\n2. Exit"
-
-    def payment_menu(self, session_id: str, user_input: str, phone_number: str):
-        session = self.session_manager.get_session(session_id)
-        amount = session.get("outstanding", 0)
-
-        if user_input == "1":
-            # Initialize payment here
-            self.session_manager.end_session(session_id)
-            # Initialize payment request.
-            return f"END Payment of TSH {amount} initialized. You'll receive confirmation shortly."
-
-        if user_input == "2":
-            return self.main_menu(session_id)
-
-        return "CON Invalid option\n1. Pay now\n2. Back"
-
-
-ussd_menu = USSDMenu(SessionManager())
+        except ValueError as error:
+            return {"payment": f"Payment failed: {error}."}
+    return {
+        "payment": (
+            f"Payment of TSH {transaction.amount:,.2f} for invoice "
+            f"{invoice.invoice_number} initialized. "
+            "You'll receive confirmation shortly."
+        ),
+    }
+
+
+INVOICE_MENU = (
+    State(
+        name="main_menu",
+        prompt="Welcome to InFlow360 Invoice Service",
+        options=(
+            Option("Check outstanding payments", next="outstanding"),
+            Option("Make Payment", next="make_payment"),
+            Option("Exit", next="exit"),
+        ),
+    ),
+    State(
+        name="outstanding",
+        prompt="Outstanding payment: TSH {outstanding}",
+        options=(
+            Option("Pay now", next="payment_initialized"),
+            Option("Back", next="main_menu"),
+        ),
+        on_enter=load_outstanding,
+    ),
+    State(
+        name="make_payment",
+        prompt="Make Payment",
+        options=(
+            Option("Pay now", next="payment_initialized"),
+            Option("Back", next="main_menu"),
+        ),
+        on_enter=load_outstanding,
+    ),
+    State(
+        name="payment_initialized",
+        prompt="{payment}",
+        on_enter=initiate_payment,
+    ),
+    State(name="exit", prompt="Thank you for using our service"),
+)
+
+
+ussd_menu = MenuEngine(
+    INVOICE_MENU,
+    start="main_menu",
+    session_store=create_session_store(),
+)
@@ -1,6 +1,18 @@
-import os
+"""Access tokens and the authentication dependencies.
+
+Tokens are HS256 JWTs naming their signing key in the ``kid`` header, so the
+key can be rotated while tokens signed with the previous one are still in
+use. Authenticating a request needs no database: a verified token's claims
+are cached until it expires, and routes that only need the user's ID depend
+on ``get_current_user_id``. ``get_current_user`` loads the user too, from a
+short-lived cache.
+"""
+
+import logging
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Optional, Union
+from typing import Annotated, Any, Optional
 from uuid import UUID
 
 from fastapi import Depends, HTTPException, status
@@ -10,9 +22,13 @@ from fastapi.security import (
     OAuth2PasswordBearer,
 )
 from jose import JWTError, jwt
-from sqlmodel import Session, select
 
-from src.models.tables import get_session
+from src.metrics import counter
+from src.models.database import Database, database
+from src.models.tables import Users
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
@@ -24,10 +40,181 @@ bearer_scheme = HTTPBearer(
 
 
 # JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "insecure-secret-key")
+SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = "HS256"
+ISSUER = "nairi"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+TOKEN_CACHE = counter(
+    "auth_token_cache_total",
+    "Access tokens checked, by whether their claims were cached.",
+    ("result",),
+)
+USER_CACHE = counter(
+    "auth_user_cache_total",
+    "Users loaded for a request, by whether they were cached.",
+    ("result",),
+)
+
+
+class ExpiringCache:
+    """Least recently used cache whose entries expire at a given time.
+
+    Expired entries are dropped when they are looked up, or evicted with the
+    least recently used ones once there are more than ``max_size``.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize."""
+        self.max_size = max_size
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of entries, including expired ones not yet dropped."""
+        return len(self._entries)
+
+    def get(self, key: Any, now: float) -> Any:
+        """Get an entry that has not expired by ``now``, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Any, value: Any, expires_at: float) -> None:
+        """Store an entry until ``expires_at``."""
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        """Drop an entry."""
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._entries.clear()
+
+
+class TokenVerifier:
+    """Verify access tokens, caching the claims of valid ones until they expire.
+
+    ``keys`` maps key IDs to the keys tokens may be signed with; tokens
+    without a ``kid`` are checked against the ``current_kid`` key, which also
+    signs new tokens. Tokens without an expiry are verified every time.
+    The cached claims are shared, so callers must not modify them.
+    """
+
+    def __init__(
+        self,
+        keys: dict[str, str],
+        current_kid: str,
+        *,
+        algorithm: str = ALGORITHM,
+        issuer: str = ISSUER,
+        max_size: int = settings.JWT_CACHE_SIZE,
+    ) -> None:
+        """Initialize."""
+        if current_kid not in keys:
+            msg = f"No key for the current key ID {current_kid!r}"
+            raise ValueError(msg)
+        self.keys = keys
+        self.current_kid = current_kid
+        self.algorithm = algorithm
+        self.issuer = issuer
+        self._cache = ExpiringCache(max_size)
+
+    def sign(self, claims: dict) -> str:
+        """Sign claims with the current key."""
+        return jwt.encode(
+            claims,
+            self.keys[self.current_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.current_kid},
+        )
+
+    def verify(self, token: str) -> dict:
+        """Get a token's claims, raising JWTError if it is invalid or expired."""
+        now = time.time()
+        claims = self._cache.get(token, now)
+        if claims is not None:
+            TOKEN_CACHE.inc(result="hit")
+            return claims
+
+        TOKEN_CACHE.inc(result="miss")
+        claims = self._decode(token)
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)):
+            self._cache.set(token, claims, expires_at)
+        return claims
+
+    def _decode(self, token: str) -> dict:
+        """Check a token's signature, expiry and issuer."""
+        kid = jwt.get_unverified_header(token).get("kid") or self.current_kid
+        key = self.keys.get(kid)
+        if key is None:
+            msg = f"Unknown signing key {kid!r}"
+            raise JWTError(msg)
+        return jwt.decode(token, key, algorithms=[self.algorithm], issuer=self.issuer)
+
+    def clear(self) -> None:
+        """Forget every verified token, e.g. after removing a key."""
+        self._cache.clear()
+
+
+token_verifier = TokenVerifier(
+    {**settings.JWT_VERIFY_KEYS, settings.JWT_KEY_ID: SECRET_KEY},
+    settings.JWT_KEY_ID,
+)
+
+
+class UserCache:
+    """Users loaded by ID, reused for ``ttl`` seconds.
+
+    Cached users are detached from their session: their columns can be read
+    but relationships are not loaded. A change to a user, or their removal,
+    is seen by other workers within ``ttl``.
+    """
+
+    def __init__(
+        self,
+        db: Database = database,
+        ttl: float = settings.USER_CACHE_TTL,
+        max_size: int = settings.USER_CACHE_SIZE,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.ttl = ttl
+        self._cache = ExpiringCache(max_size if ttl > 0 else 0)
+
+    async def get(self, user_id: UUID) -> Optional[Users]:
+        """Get a user, reading it only when not cached."""
+        now = time.monotonic()
+        user = self._cache.get(user_id, now)
+        if user is not None:
+            USER_CACHE.inc(result="hit")
+            return user
+
+        USER_CACHE.inc(result="miss")
+        async with self.db.session() as session:
+            user = await session.get(Users, user_id)
+        if user is not None:
+            self._cache.set(user_id, user, now + self.ttl)
+        return user
+
+    def invalidate(self, user_id: UUID) -> None:
+        """Forget a user in this worker, e.g. after changing it."""
+        self._cache.pop(user_id)
+
+
+user_cache = UserCache()
+
 
 def create_access_token(
     *,
@@ -37,7 +224,7 @@ def create_access_token(
     """Create JWT access token."""
     to_encode = {
         "sub": str(user_id),
-        "iss": "nairi",
+        "iss": ISSUER,
     }
     expire = (
         datetime.now(tz=timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -50,15 +237,13 @@ def create_access_token(
             "exp": expire,
         },
     )
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return token_verifier.sign(to_encode)
 
 
-async def get_current_user(
-    session: Annotated[Session, Depends(get_session)],
+async def get_current_user_id(
     cred: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-):
-    """Get the current user from the token."""
-    # Check if credentials were provided
+) -> UUID:
+    """Get the current user's ID from the token, without a database read."""
     if cred is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -66,19 +251,26 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Verify the token
     payload = verify_access_token(cred.credentials)
-    user_id: str = payload.get("sub")
-    if user_id is None:
+    try:
+        return UUID(payload["sub"])
+    except (KeyError, TypeError, ValueError) as error:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token: missing user ID",
             headers={"WWW-Authenticate": "Bearer"},
-        )
+        ) from error
+
+
+async def get_current_user(
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+) -> Users:
+    """Get the current user from the token.
 
-    # Fetch the user from the database
-    return True
-    user = session.get(User, user_id)
+    For routes that need more than the user's ID. A connection is only
+    borrowed when the user is not cached.
+    """
+    user = await user_cache.get(user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -91,8 +283,7 @@ async def get_current_user(
 def decode_access_token(token: str) -> Optional[dict]:
     """Decode JWT access token."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return token_verifier.verify(token)
     except JWTError:
         return None
 
@@ -100,9 +291,9 @@ def decode_access_token(token: str) -> Optional[dict]:
 def verify_access_token(token: str) -> dict:
     """Verify and decode the JWT access token."""
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return token_verifier.verify(token)
     except JWTError as e:
-        print(f"Token verification failed: {e}")
+        logger.debug("Token verification failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
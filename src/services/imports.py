@@ -0,0 +1,351 @@
+"""Bulk invoice import.
+
+Imports read a CSV or JSONL file from disk a batch at a time, so memory stays
+flat however large the file is.
+
+- CSV files are flat, one invoice item per row. Consecutive rows with the same
+  ``invoice_number`` make up one invoice; the invoice columns are read from its
+  first row.
+- JSONL files hold one invoice per line, with its ``items`` as a list.
+
+Each batch is validated, its customers resolved with one query per lookup, and
+written with bulk inserts in its own transaction together with the job's
+progress. Rows that fail are recorded on the job and skipped.
+"""
+
+import asyncio
+import csv
+import itertools
+import json
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from pathlib import Path
+from typing import Optional
+
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.balances import refresh_customer_balances
+from src.models.database import Database, database
+from src.models.enums import ImportStatus
+from src.models.repository.imports import ImportRepository
+from src.models.tables import Customers, ImportJobs
+from src.schemas.invoice import InvoiceImportSchema
+from src.settings import settings
+from src.utils import normalize_phone_numbers
+
+FORMATS = ("csv", "jsonl")
+
+CENT = Decimal("0.01")
+
+# Columns of a CSV row that describe the item rather than the invoice.
+ITEM_COLUMNS = ("description", "quantity", "unit_price")
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@dataclass
+class Record:
+    """An invoice read from the file, before validation."""
+
+    line: int
+    data: Optional[dict] = None
+    error: Optional[str] = None
+
+
+def read_csv(path: Path) -> Iterator[Record]:
+    """Group the item rows of a CSV file into invoices."""
+    with path.open(newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        current, current_number = None, None
+        for cells in reader:
+            row = {
+                key.strip(): value.strip()
+                for key, value in cells.items()
+                if key and value and value.strip()
+            }
+            item = {column: row.pop(column, None) for column in ITEM_COLUMNS}
+            number = row.get("invoice_number")
+            if not number or number != current_number:
+                if current is not None:
+                    yield current
+                current = Record(line=reader.line_num, data={**row, "items": []})
+                current_number = number
+            current.data["items"].append(item)
+        if current is not None:
+            yield current
+
+
+def read_jsonl(path: Path) -> Iterator[Record]:
+    """Read one invoice per line of a JSONL file."""
+    with path.open(encoding="utf-8-sig") as file:
+        for line, text in enumerate(file, start=1):
+            if not text.strip():
+                continue
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError as error:
+                yield Record(line=line, error=f"Invalid JSON: {error.msg}")
+                continue
+            if not isinstance(data, dict):
+                yield Record(line=line, error="Expected a JSON object")
+                continue
+            yield Record(line=line, data=data)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def _validation_error(error: ValidationError) -> str:
+    """Summarize a validation error in one line."""
+    problems = []
+    for detail in error.errors():
+        location = ".".join(str(part) for part in detail["loc"])
+        problems.append(f"{location}: {detail['msg']}" if location else detail["msg"])
+    return "; ".join(problems)
+
+
+def _allocated_number(invoice_number: str) -> int:
+    """The number of an invoice number in the allocator's format, else 0."""
+    prefix = settings.INVOICE_NUMBER_PREFIX
+    digits = invoice_number.removeprefix(prefix)
+    if invoice_number.startswith(prefix) and digits.isdigit():
+        return int(digits)
+    return 0
+
+
+class InvoiceImport:
+    """Run one import job over a file."""
+
+    def __init__(
+        self,
+        job: ImportJobs,
+        path: Path,
+        db: Database = database,
+        batch_size: int = settings.IMPORT_BATCH_SIZE,
+        max_errors: int = settings.IMPORT_MAX_ERRORS,
+    ) -> None:
+        """Initialize."""
+        self.job = job
+        self.path = path
+        self.db = db
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        # invoice numbers seen earlier in the file
+        self._seen: set[str] = set()
+
+    async def run(self) -> None:
+        """Import the whole file, one transaction per batch."""
+        records = READERS[self.job.format](self.path)
+        async with self.db.session() as session:
+            repository = ImportRepository(session)
+            await self._set_status(session, ImportStatus.RUNNING)
+            try:
+                while batch := await asyncio.to_thread(
+                    list,
+                    itertools.islice(records, self.batch_size),
+                ):
+                    await self._import_batch(session, repository, batch)
+            except Exception:
+                await session.rollback()
+                await self._set_status(session, ImportStatus.FAILED)
+                raise
+            await self._set_status(session, ImportStatus.COMPLETED)
+
+    async def _set_status(self, session: AsyncSession, status: ImportStatus) -> None:
+        job = await session.get(ImportJobs, self.job.id)
+        job.status = status
+        if status in (ImportStatus.COMPLETED, ImportStatus.FAILED):
+            job.finished_at = datetime.now(tz=timezone.utc)
+        await session.commit()
+
+    async def _import_batch(
+        self,
+        session: AsyncSession,
+        repository: ImportRepository,
+        batch: list[Record],
+    ) -> None:
+        errors = []
+        invoices = []
+        for record in batch:
+            if record.error:
+                errors.append(self._error(record, record.error))
+                continue
+            try:
+                data = InvoiceImportSchema.model_validate(record.data)
+            except ValidationError as error:
+                errors.append(self._error(record, _validation_error(error)))
+                continue
+            if data.invoice_number in self._seen:
+                errors.append(self._error(record, "Duplicate invoice_number in file"))
+                continue
+            self._seen.add(data.invoice_number)
+            invoices.append((record, data))
+
+        organization_id = self.job.organization_id
+        phones = normalize_phone_numbers(
+            data.customer_phone for _, data in invoices if data.customer_phone
+        )
+        existing = await repository.existing_invoice_numbers(
+            organization_id,
+            (data.invoice_number for _, data in invoices),
+        )
+        by_code = await repository.customers_by_code(
+            {data.customer_code for _, data in invoices if data.customer_code},
+        )
+        by_phone = await repository.customers_by_phone(
+            organization_id,
+            set(phones.valid.values()),
+        )
+
+        now = datetime.now(tz=timezone.utc)
+        new_customers, new_invoices, new_items = [], [], []
+        imported = []
+        for record, data in invoices:
+            if data.invoice_number in existing:
+                errors.append(self._error(record, "invoice_number already exists"))
+                continue
+            phone = None
+            if data.customer_phone:
+                phone = phones.valid.get(data.customer_phone)
+                if phone is None:
+                    error = phones.errors[data.customer_phone]
+                    errors.append(self._error(record, f"customer_phone: {error}"))
+                    continue
+
+            if data.customer_code and data.customer_code in by_code:
+                customer_id, customer_org = by_code[data.customer_code]
+                if customer_org != organization_id:
+                    message = "customer_code belongs to another organization"
+                    errors.append(self._error(record, message))
+                    continue
+            elif not data.customer_code and phone in by_phone:
+                customer_id = by_phone[phone]
+            elif not data.customer_name or not phone:
+                message = "Unknown customer: customer_name and customer_phone needed"
+                errors.append(self._error(record, message))
+                continue
+            else:
+                customer = Customers(
+                    organization_id=organization_id,
+                    customer_code=data.customer_code
+                    or f"C-{uuid.uuid4().hex[:12].upper()}",
+                    name=data.customer_name,
+                    email=data.customer_email,
+                    phone=phone,
+                )
+                new_customers.append(customer.model_dump())
+                customer_id = customer.id
+                # later rows of the batch find it like an existing customer
+                by_code[customer.customer_code] = (customer_id, organization_id)
+                by_phone.setdefault(phone, customer_id)
+
+            invoice, items = self._build_invoice(data, customer_id, now)
+            imported.append(record)
+            new_invoices.append(invoice)
+            new_items.extend(items)
+
+        try:
+            await repository.insert_invoices(new_customers, new_invoices, new_items)
+            await refresh_customer_balances(
+                session,
+                {invoice["customer_id"] for invoice in new_invoices},
+            )
+            # with the batch, so blocks reserved after it skip its numbers
+            last_number = max(
+                (
+                    _allocated_number(invoice["invoice_number"])
+                    for invoice in new_invoices
+                ),
+                default=0,
+            )
+            if last_number:
+                await repository.reserve_invoice_numbers(
+                    organization_id,
+                    last_number,
+                    settings.INVOICE_NUMBER_PREFIX,
+                )
+        except IntegrityError as error:
+            # a concurrent writer took a number or code first; skip the batch
+            await session.rollback()
+            message = f"Batch rejected: {error.orig}"
+            errors.extend(self._error(record, message) for record in imported)
+            new_invoices, new_customers = [], []
+
+        errors.sort(key=lambda error: error["line"])
+        job = await session.get(ImportJobs, self.job.id)
+        job.rows_processed += len(batch)
+        job.invoices_imported += len(new_invoices)
+        job.customers_created += len(new_customers)
+        job.rows_failed += len(errors)
+        room = self.max_errors - len(job.errors)
+        if room > 0 and errors:
+            job.errors = [*job.errors, *errors[:room]]
+        await session.commit()
+
+    def _build_invoice(
+        self,
+        data: InvoiceImportSchema,
+        customer_id: uuid.UUID,
+        now: datetime,
+    ) -> tuple[dict, list[dict]]:
+        """Invoice and item rows, built as plain dicts for the bulk inserts.
+
+        Building table models costs more than inserting them, so the rows
+        carry the defaults the models would have filled in.
+        """
+        timestamps = {"created_at": now, "updated_at": now}
+        invoice_id = uuid.uuid4()
+        items = [
+            {
+                **timestamps,
+                "id": uuid.uuid4(),
+                "invoice_id": invoice_id,
+                "service_id": None,
+                "description": item.description,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "total_amount": _money(item.quantity * item.unit_price),
+            }
+            for item in data.items
+        ]
+        subtotal = sum((item["total_amount"] for item in items), Decimal("0.00"))
+        tax_amount = _money(data.tax_amount)
+        invoice = {
+            **timestamps,
+            "id": invoice_id,
+            "invoice_number": data.invoice_number,
+            "customer_id": customer_id,
+            "organization_id": self.job.organization_id,
+            "created_by": self.job.created_by,
+            "subtotal": subtotal,
+            "tax_amount": tax_amount,
+            "total_amount": subtotal + tax_amount,
+            "currency": data.currency,
+            "status": data.status,
+            "issue_date": data.issue_date,
+            "due_date": data.due_date,
+        }
+        return invoice, items
+
+    @staticmethod
+    def _error(record: Record, error: str) -> dict:
+        number = (record.data or {}).get("invoice_number")
+        return {"line": record.line, "invoice_number": number, "error": error}
+
+
+async def run_import(job: ImportJobs, path: Path, db: Database = database) -> None:
+    """Run an import job in the background, then remove its file."""
+    try:
+        await InvoiceImport(job, path, db).run()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+__all__ = ("FORMATS", "InvoiceImport", "read_csv", "read_jsonl", "run_import")
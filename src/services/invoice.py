@@ -1 +1,168 @@
-""""""
\ No newline at end of file
+"""Invoice service."""
+
+import asyncio
+import itertools
+from decimal import ROUND_HALF_UP, Decimal
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.database import Database, database
+from src.models.repository.invoice import InvoiceRepository, next_invoice_number
+from src.models.tables import InvoiceCounters, InvoiceItems, Invoices
+from src.schemas.invoice import InvoiceCreateSchema
+from src.settings import settings
+
+CENT = Decimal("0.01")
+
+# Invoice numbers tried before giving up when they are taken already.
+NUMBER_ATTEMPTS = 3
+
+
+def _money(value: Decimal) -> Decimal:
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class InvoiceNumberAllocator:
+    """Hand out per-organization invoice numbers from reserved blocks.
+
+    Each worker reserves ``block_size`` numbers at a time with a single
+    ``UPDATE ... RETURNING`` on the organization's counter, committed on its
+    own. The counter row is locked for that statement only, not for the
+    invoice transaction, and there is nothing to retry. Numbers are unique
+    and increase per worker, but not strictly across workers, and a block
+    left unused when a worker stops leaves a gap.
+
+    Imports may take numbers of a block already held; ``create_invoice``
+    then discards the block and takes a fresh one, past the imported numbers.
+    """
+
+    def __init__(
+        self,
+        db: Database = database,
+        block_size: int = settings.INVOICE_NUMBER_BLOCK_SIZE,
+        prefix: str = settings.INVOICE_NUMBER_PREFIX,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.block_size = block_size
+        self.prefix = prefix
+        # organization -> (next number, end of the reserved block)
+        self._blocks: dict[UUID, tuple[int, int]] = {}
+        self._locks: dict[UUID, asyncio.Lock] = {}
+
+    async def next_number(self, organization_id: UUID) -> str:
+        """Get the next invoice number of an organization."""
+        lock = self._locks.setdefault(organization_id, asyncio.Lock())
+        async with lock:
+            value, end = self._blocks.get(organization_id, (0, 0))
+            if value >= end:
+                value, end = await self._reserve(organization_id)
+            self._blocks[organization_id] = (value + 1, end)
+        return f"{self.prefix}{value:06d}"
+
+    def discard(self, organization_id: UUID) -> None:
+        """Drop the rest of an organization's block, leaving a gap."""
+        self._blocks.pop(organization_id, None)
+
+    async def _reserve(self, organization_id: UUID) -> tuple[int, int]:
+        """Reserve the next block of numbers."""
+        reserve = (
+            update(InvoiceCounters)
+            .where(InvoiceCounters.organization_id == organization_id)
+            .values(next_value=InvoiceCounters.next_value + self.block_size)
+            .returning(InvoiceCounters.next_value)
+        )
+        async with self.db.session() as session:
+            end = (await session.execute(reserve)).scalar_one_or_none()
+            if end is None:
+                await self._create_counter(session, organization_id)
+                end = (await session.execute(reserve)).scalar_one()
+            await session.commit()
+        return end - self.block_size, end
+
+    async def _create_counter(
+        self, session: AsyncSession, organization_id: UUID
+    ) -> None:
+        """Start an organization's counter after its existing invoice numbers."""
+        dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+        await session.execute(
+            dialect.insert(InvoiceCounters)
+            .values(
+                organization_id=organization_id,
+                next_value=next_invoice_number(organization_id, self.prefix),
+            )
+            .on_conflict_do_nothing(),
+        )
+
+
+invoice_numbers = InvoiceNumberAllocator()
+
+
+async def create_invoice(
+    session: AsyncSession,
+    user_id: UUID,
+    data: InvoiceCreateSchema,
+    numbers: InvoiceNumberAllocator = invoice_numbers,
+) -> tuple[Invoices, list[InvoiceItems]]:
+    """Create an invoice and its items, computing the totals.
+
+    A number taken meanwhile, e.g. by an import, is skipped. Raises
+    IntegrityError when every attempt collides.
+    """
+    repository = InvoiceRepository(session)
+    if not await repository.is_customer_of_owner(
+        data.customer_id,
+        data.organization_id,
+        user_id,
+    ):
+        msg = "Customer not found in this organization"
+        raise ValueError(msg)
+    # End the read so this request holds no pooled connection while waiting
+    # for the allocator, which may need one to reserve a block.
+    await session.commit()
+
+    items = [
+        {
+            "service_id": item.service_id,
+            "description": item.description,
+            "quantity": item.quantity,
+            "unit_price": item.unit_price,
+            "total_amount": _money(item.quantity * item.unit_price),
+        }
+        for item in data.items
+    ]
+    subtotal = sum((item["total_amount"] for item in items), Decimal("0.00"))
+    tax_amount = _money(subtotal * data.tax_rate / 100)
+
+    for attempt in itertools.count(1):
+        invoice_number = await numbers.next_number(data.organization_id)
+        invoice = Invoices(
+            invoice_number=invoice_number,
+            customer_id=data.customer_id,
+            organization_id=data.organization_id,
+            created_by=user_id,
+            subtotal=subtotal,
+            tax_amount=tax_amount,
+            total_amount=subtotal + tax_amount,
+            currency=data.currency,
+            status=data.status,
+            due_date=data.due_date,
+        )
+        if data.issue_date:
+            invoice.issue_date = data.issue_date
+        try:
+            return invoice, await repository.create_invoice(invoice, items)
+        except IntegrityError:
+            await session.rollback()
+            taken = await repository.invoice_number_taken(
+                data.organization_id,
+                invoice_number,
+            )
+            if not taken or attempt == NUMBER_ATTEMPTS:
+                raise
+            # the rest of the block may be taken too
+            numbers.discard(data.organization_id)
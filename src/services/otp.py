@@ -0,0 +1,237 @@
+"""One-time login codes sent by SMS.
+
+A phone has at most one live code. Only an HMAC of the code and phone is
+stored, and verifying a guess is one UPDATE of the phone's live code that
+also counts the attempt, so a code allows ``OTP_MAX_ATTEMPTS`` guesses
+however many arrive at once. Sending is limited per phone and per client IP,
+and verifying per client IP.
+
+Expired and used codes are deleted in batches in the background, keeping the
+table to the codes of the last few minutes::
+
+    python -m src.services.otp     # run the purge outside the web app
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import logging
+import secrets
+import signal
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.metrics import counter
+from src.models.database import Database, database
+from src.models.repository.otp import OTPRepository
+from src.models.tables import Users
+from src.services.outbox import enqueue_sms
+from src.services.ratelimit import RateLimiter, create_rate_limiter
+from src.settings import settings
+from src.utils import phone_number_validator
+
+logger = logging.getLogger(__name__)
+
+OTP_MESSAGE = "Your InFlow360 code is {code}. It expires in {minutes} minutes."
+
+OTP_SENT = counter("otp_codes_sent_total", "One-time codes sent.")
+OTP_VERIFICATIONS = counter(
+    "otp_verifications_total",
+    "One-time code guesses, by whether they matched a live code.",
+    ("result",),
+)
+OTP_PURGED = counter("otp_codes_purged_total", "Expired one-time codes deleted.")
+
+
+def hash_code(phone: str, code: str) -> str:
+    """HMAC of a code sent to a phone."""
+    message = f"{phone}:{code}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+class OTPService:
+    """Send and verify one-time codes."""
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        ttl: float = settings.OTP_TTL,
+        max_attempts: int = settings.OTP_MAX_ATTEMPTS,
+        length: int = settings.OTP_LENGTH,
+    ) -> None:
+        """Initialize."""
+        self.limiter = limiter or create_rate_limiter()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.length = length
+
+    async def send(self, session: AsyncSession, phone: str, client_ip: str) -> datetime:
+        """Queue a new code for a phone, returning when it expires.
+
+        Raises ValueError for an invalid phone number and RateLimitExceeded
+        when the phone or client has asked for too many codes.
+        """
+        phone = phone_number_validator(phone)
+        window = settings.OTP_RATE_WINDOW
+        # invalid numbers and phones over their limit don't spend the IP's
+        await self.limiter.check(f"otp:phone:{phone}", settings.OTP_PHONE_LIMIT, window)
+        await self.limiter.check(f"otp:ip:{client_ip}", settings.OTP_IP_LIMIT, window)
+
+        code = f"{secrets.randbelow(10**self.length):0{self.length}d}"
+        now = datetime.now(tz=timezone.utc)
+        expires_at = now + timedelta(seconds=self.ttl)
+        await OTPRepository(session).replace(
+            phone,
+            hash_code(phone, code),
+            now,
+            expires_at,
+        )
+        enqueue_sms(
+            session,
+            phone,
+            OTP_MESSAGE.format(code=code, minutes=max(1, round(self.ttl / 60))),
+        )
+        await session.commit()
+        OTP_SENT.inc()
+        return expires_at
+
+    async def verify(
+        self,
+        session: AsyncSession,
+        phone: str,
+        code: str,
+        client_ip: str,
+    ) -> Optional[Users]:
+        """Check a code, returning the phone's user if it matches.
+
+        The user is created on their first login. Raises RateLimitExceeded
+        when the client has made too many guesses.
+        """
+        await self.limiter.check(
+            f"otp-verify:ip:{client_ip}",
+            settings.OTP_VERIFY_IP_LIMIT,
+            settings.OTP_RATE_WINDOW,
+        )
+        try:
+            phone = phone_number_validator(phone)
+        except ValueError:
+            OTP_VERIFICATIONS.inc(result="invalid")
+            return None
+
+        repository = OTPRepository(session)
+        now = datetime.now(tz=timezone.utc)
+        verified = await repository.verify(
+            phone,
+            hash_code(phone, code.strip()),
+            now,
+            self.max_attempts,
+        )
+        await session.commit()
+        OTP_VERIFICATIONS.inc(result="valid" if verified else "invalid")
+        if not verified:
+            return None
+
+        user = await repository.get_user_by_phone(phone)
+        if user is None:
+            user = Users(phone_number=phone, name=phone)
+            session.add(user)
+            try:
+                await session.flush()
+            except IntegrityError:
+                # created by a concurrent login
+                await session.rollback()
+                user = await repository.get_user_by_phone(phone)
+        user.last_login = now.replace(tzinfo=None)  # a naive UTC column
+        await session.commit()
+        return user
+
+
+otp_service = OTPService()
+
+
+class OTPPurger:
+    """Delete expired codes periodically."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        interval: float = settings.OTP_PURGE_INTERVAL,
+        batch_size: int = settings.OTP_PURGE_BATCH_SIZE,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Delete one batch, returning how many codes it had."""
+        now = now or datetime.now(tz=timezone.utc)
+        async with self.db.session() as session:
+            deleted = await OTPRepository(session).purge_expired(now, self.batch_size)
+            await session.commit()
+        OTP_PURGED.inc(deleted)
+        return deleted
+
+    async def purge(self, stop: Optional[asyncio.Event] = None) -> int:
+        """Delete batches until none are left, returning how many were deleted."""
+        now = datetime.now(tz=timezone.utc)
+        deleted = 0
+        while stop is None or not stop.is_set():
+            batch = await self.run_once(now)
+            deleted += batch
+            if batch < self.batch_size:
+                break
+        if deleted:
+            logger.info("Purged %d expired one-time codes", deleted)
+        return deleted
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Purge until stopped."""
+        while not stop.is_set():
+            try:
+                await self.purge(stop)
+            except Exception:
+                logger.exception("One-time code purge failed")
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), self.interval)
+
+    def start(self) -> None:
+        """Start purging on the current event loop, if enabled."""
+        if self.interval > 0:
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(self._stop))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let an in-flight batch finish, then stop."""
+        self._stop.set()
+        if self._task is None:
+            return
+        _, pending = await asyncio.wait([self._task], timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._task = None
+
+
+async def main() -> None:
+    """Run the purge until interrupted."""
+    purger = OTPPurger(interval=settings.OTP_PURGE_INTERVAL or 60.0)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    purger.start()
+    await stopped.wait()
+    await purger.stop()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,344 @@
+"""Durable outbound message queue.
+
+Request handlers enqueue messages in their own transaction and return; outbox
+workers claim due rows in batches, send them and record the outcome::
+
+    python -m src.services.outbox     # run the workers outside the web app
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import signal
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models.database import Database, database
+from src.models.enums import ReminderStatus
+from src.models.tables import OutboundMessages, Reminders
+from src.services.africastalking.sms import (
+    RETRYABLE_RECIPIENT_STATUS_CODES,
+    SUCCESS_STATUS_CODES,
+    AfricasTalkingSMS,
+    africastalking_sms,
+)
+from src.settings import settings
+from src.utils import phone_number_validator
+
+logger = logging.getLogger(__name__)
+
+# InsufficientBalance clears once the account is topped up.
+RETRYABLE_DELIVERY_STATUS_CODES = RETRYABLE_RECIPIENT_STATUS_CODES | {405}
+
+
+def enqueue_sms(
+    session: AsyncSession,
+    recipient: str,
+    message: str,
+    *,
+    available_at: Optional[datetime] = None,
+    reminder_id: Optional[UUID] = None,
+) -> OutboundMessages:
+    """Queue an SMS. It is sent once the caller commits the session."""
+    outbound = OutboundMessages(
+        recipient=phone_number_validator(recipient),
+        message=message,
+        reminder_id=reminder_id,
+    )
+    if available_at is not None:
+        outbound.available_at = available_at
+    session.add(outbound)
+    return outbound
+
+
+def enqueue_reminder(
+    session: AsyncSession,
+    reminder: Reminders,
+    recipient: str,
+) -> OutboundMessages:
+    """Queue a reminder for sending at its scheduled time."""
+    return enqueue_sms(
+        session,
+        recipient,
+        reminder.message,
+        available_at=reminder.scheduled_for,
+        reminder_id=reminder.id,
+    )
+
+
+@dataclass
+class ClaimedMessage:
+    """Outbound message leased by a worker."""
+
+    id: UUID
+    recipient: str
+    message: str
+    attempts: int
+    reminder_id: Optional[UUID]
+
+
+class OutboxWorker:
+    """Claim due messages in batches and send them."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        sms: AfricasTalkingSMS = africastalking_sms,
+        *,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL,
+        lease_seconds: int = settings.OUTBOX_LEASE_SECONDS,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        retry_backoff: float = settings.OUTBOX_RETRY_BACKOFF,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.sms = sms
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+    async def claim(self, session: AsyncSession) -> list[ClaimedMessage]:
+        """Lease a batch of due messages.
+
+        The claimed rows get their ``available_at`` pushed past the lease, so
+        other workers skip them and a crashed worker's rows become due again.
+        Postgres skips rows other workers are claiming with SKIP LOCKED;
+        sqlite serializes writers, which makes the single UPDATE atomic.
+        Rows that already used up their attempts are failed instead.
+        """
+        now = datetime.now(tz=timezone.utc)
+        await self.fail_exhausted(session, now)
+        due = (
+            select(OutboundMessages.id)
+            .where(
+                OutboundMessages.status == ReminderStatus.PENDING,
+                OutboundMessages.available_at <= now,
+                OutboundMessages.attempts < self.max_attempts,
+            )
+            .order_by(OutboundMessages.available_at)
+            .limit(self.batch_size)
+        )
+        if session.bind.dialect.name == "postgresql":
+            due = due.with_for_update(skip_locked=True)
+
+        statement = (
+            update(OutboundMessages)
+            .where(OutboundMessages.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=OutboundMessages.attempts + 1,
+                available_at=now + self.lease,
+            )
+            .returning(
+                OutboundMessages.id,
+                OutboundMessages.recipient,
+                OutboundMessages.message,
+                OutboundMessages.attempts,
+                OutboundMessages.reminder_id,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(statement)
+        claimed = [ClaimedMessage(*row) for row in result.all()]
+        await session.commit()
+        return claimed
+
+    async def fail_exhausted(self, session: AsyncSession, now: datetime) -> None:
+        """Fail due messages, and their reminders, that have no attempts left.
+
+        These are rows whose worker stopped before recording the outcome of
+        their last attempt, so their lease ran out while still PENDING.
+        """
+        result = await session.execute(
+            update(OutboundMessages)
+            .where(
+                OutboundMessages.status == ReminderStatus.PENDING,
+                OutboundMessages.available_at <= now,
+                OutboundMessages.attempts >= self.max_attempts,
+            )
+            .values(
+                status=ReminderStatus.FAILED,
+                last_error=f"No outcome after {self.max_attempts} attempts",
+            )
+            .returning(OutboundMessages.reminder_id)
+            .execution_options(synchronize_session=False),
+        )
+        reminder_ids = [
+            reminder_id for reminder_id in result.scalars() if reminder_id is not None
+        ]
+        if reminder_ids:
+            await session.execute(
+                update(Reminders)
+                .where(Reminders.id.in_(reminder_ids))
+                .values(status=ReminderStatus.FAILED),
+            )
+
+    async def send(self, session: AsyncSession, claimed: list[ClaimedMessage]) -> None:
+        """Send claimed messages and record the outcomes in bulk.
+
+        Every claimed message gets an outcome: ones the provider did not
+        answer for, because the batch raised or the reply left them out, are
+        retried until they run out of attempts.
+        """
+        by_recipient: dict[tuple[str, str], list[ClaimedMessage]] = {}
+        for outbound in claimed:
+            key = (outbound.recipient, outbound.message)
+            by_recipient.setdefault(key, []).append(outbound)
+
+        now = datetime.now(tz=timezone.utc)
+        sent, retry, failed = [], [], []
+        sent_reminders, failed_reminders = [], []
+        answered: set[UUID] = set()
+
+        def fail(outbound: ClaimedMessage, error: str, *, retryable: bool) -> None:
+            if retryable and outbound.attempts < self.max_attempts:
+                retry.append(
+                    {
+                        "id": outbound.id,
+                        "available_at": now + self._backoff(outbound.attempts),
+                        "last_error": error[:500],
+                    },
+                )
+            else:
+                failed.append(
+                    {
+                        "id": outbound.id,
+                        "status": ReminderStatus.FAILED,
+                        "last_error": error[:500],
+                    },
+                )
+                if outbound.reminder_id:
+                    failed_reminders.append(outbound.reminder_id)
+
+        unanswered = "No response from the SMS provider"
+        try:
+            async for message, response in self.sms.send_bulk_by_message(
+                by_recipient,
+            ):
+                for outbound in by_recipient.get((response.number, message), []):
+                    if outbound.id in answered:
+                        continue
+                    answered.add(outbound.id)
+                    if response.statusCode in SUCCESS_STATUS_CODES:
+                        sent.append(
+                            {
+                                "id": outbound.id,
+                                "status": ReminderStatus.SENT,
+                                "sent_at": now,
+                                "provider_message_id": response.messageId,
+                                "last_error": None,
+                            },
+                        )
+                        if outbound.reminder_id:
+                            sent_reminders.append(outbound.reminder_id)
+                    else:
+                        fail(
+                            outbound,
+                            response.status,
+                            retryable=response.statusCode
+                            in RETRYABLE_DELIVERY_STATUS_CODES,
+                        )
+        except Exception as error:
+            logger.exception("Outbox send failed")
+            unanswered = f"{type(error).__name__}: {error}"
+
+        for outbound in claimed:
+            if outbound.id not in answered:
+                fail(outbound, unanswered, retryable=True)
+
+        # ORM bulk UPDATE by primary key: one executemany per outcome
+        for rows in (sent, retry, failed):
+            if rows:
+                await session.execute(update(OutboundMessages), rows)
+        if sent_reminders:
+            await session.execute(
+                update(Reminders)
+                .where(Reminders.id.in_(sent_reminders))
+                .values(status=ReminderStatus.SENT, sent_at=now),
+            )
+        if failed_reminders:
+            await session.execute(
+                update(Reminders)
+                .where(Reminders.id.in_(failed_reminders))
+                .values(status=ReminderStatus.FAILED),
+            )
+        await session.commit()
+
+    async def run_once(self) -> int:
+        """Claim and send one batch, returning how many messages it had."""
+        async with self.db.session() as session:
+            claimed = await self.claim(session)
+            if claimed:
+                await self.send(session, claimed)
+        return len(claimed)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Process batches until stopped, sleeping while the queue is empty."""
+        while not stop.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                processed = 0
+
+            if processed < self.batch_size:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+
+    def _backoff(self, attempts: int) -> timedelta:
+        """Jittered exponential backoff before the next attempt."""
+        delay = self.retry_backoff * 2 ** (attempts - 1)
+        return timedelta(seconds=delay * random.uniform(0.5, 1.5))
+
+
+class OutboxWorkerPool:
+    """Run several outbox workers as tasks on the current event loop."""
+
+    def __init__(self, workers: int = settings.OUTBOX_WORKERS, **options) -> None:
+        """Initialize."""
+        self.workers = [OutboxWorker(**options) for _ in range(workers)]
+        self._stop = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the workers."""
+        self._stop.clear()
+        self._tasks = [
+            asyncio.create_task(worker.run(self._stop)) for worker in self.workers
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let in-flight batches finish, then stop the workers."""
+        self._stop.set()
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+
+
+async def main() -> None:
+    """Run the outbox workers until interrupted."""
+    pool = OutboxWorkerPool(workers=max(1, settings.OUTBOX_WORKERS))
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    pool.start()
+    await stopped.wait()
+    await pool.stop()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
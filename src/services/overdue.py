@@ -0,0 +1,240 @@
+"""Overdue invoice sweep.
+
+Moves SENT invoices past their due date to OVERDUE, a batch at a time, each
+batch one short ``UPDATE ... RETURNING`` transaction. Optionally queues an SMS
+reminder for every invoice it marks::
+
+    python -m src.services.overdue     # run the sweep outside the web app
+
+Balances don't move: SENT and OVERDUE invoices are both unpaid. The reporting
+rollups pick the change up from ``updated_at``.
+"""
+
+import asyncio
+import contextlib
+import logging
+import signal
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.metrics import counter, histogram
+from src.models.database import Database, database
+from src.models.enums import InvoiceStatus, ReminderStatus, ReminderType
+from src.models.tables import Customers, Invoices, OutboundMessages, Reminders
+from src.settings import settings
+from src.utils import phone_number_validator
+
+logger = logging.getLogger(__name__)
+
+MARKED_OVERDUE = counter(
+    "invoices_marked_overdue_total",
+    "Invoices the sweep moved from SENT to OVERDUE.",
+)
+SWEEP_SECONDS = histogram(
+    "overdue_sweep_seconds",
+    "Time taken by a sweep, from the first batch to the last.",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+
+REMINDER_MESSAGE = (
+    "Invoice {invoice_number} for {currency} {total_amount:,.2f} was due on "
+    "{due_date:%d/%m/%Y}. Please pay as soon as possible."
+)
+
+
+class OverdueSweeper:
+    """Mark invoices past their due date overdue periodically."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        interval: float = settings.OVERDUE_SWEEP_INTERVAL,
+        batch_size: int = settings.OVERDUE_SWEEP_BATCH_SIZE,
+        *,
+        reminders: bool = settings.OVERDUE_REMINDERS,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self.reminders = reminders
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def mark(self, session: AsyncSession, today: date) -> list:
+        """Mark one batch of invoices due before ``today`` overdue.
+
+        Postgres skips invoices locked by other writers with SKIP LOCKED and
+        picks them up in a later batch; sqlite serializes writers.
+        """
+        due = (
+            select(Invoices.id)
+            .where(
+                Invoices.status == InvoiceStatus.SENT,
+                Invoices.due_date < today,
+            )
+            .limit(self.batch_size)
+        )
+        if session.bind.dialect.name == "postgresql":
+            due = due.with_for_update(skip_locked=True)
+
+        statement = (
+            update(Invoices)
+            .where(
+                Invoices.id.in_(due.scalar_subquery()),
+                Invoices.status == InvoiceStatus.SENT,
+            )
+            .values(status=InvoiceStatus.OVERDUE)
+            .returning(
+                Invoices.id,
+                Invoices.customer_id,
+                Invoices.created_by,
+                Invoices.invoice_number,
+                Invoices.currency,
+                Invoices.total_amount,
+                Invoices.due_date,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return list((await session.execute(statement)).all())
+
+    async def remind(self, session: AsyncSession, invoices: list) -> int:
+        """Queue a reminder for each invoice whose customer has a valid phone."""
+        customer_ids = {invoice.customer_id for invoice in invoices}
+        phones = {}
+        for customer_id, phone in await session.execute(
+            select(Customers.id, Customers.phone).where(
+                Customers.id.in_(customer_ids),
+            ),
+        ):
+            with contextlib.suppress(ValueError):
+                phones[customer_id] = phone_number_validator(phone)
+
+        # plain rows: the model defaults aren't applied by a bulk insert
+        now = datetime.now(tz=timezone.utc)
+        reminders, messages = [], []
+        for invoice in invoices:
+            recipient = phones.get(invoice.customer_id)
+            if recipient is None:
+                continue
+            reminder_id = uuid.uuid4()
+            message = REMINDER_MESSAGE.format(**invoice._mapping)
+            reminders.append(
+                {
+                    "id": reminder_id,
+                    "created_at": now,
+                    "updated_at": now,
+                    "invoice_id": invoice.id,
+                    "customer_id": invoice.customer_id,
+                    "sent_by": invoice.created_by,
+                    "type": ReminderType.SMS,
+                    "status": ReminderStatus.PENDING,
+                    "message": message,
+                    "sent_at": None,
+                    "scheduled_for": now,
+                },
+            )
+            messages.append(
+                {
+                    "id": uuid.uuid4(),
+                    "created_at": now,
+                    "updated_at": now,
+                    "channel": ReminderType.SMS,
+                    "recipient": recipient,
+                    "message": message,
+                    "status": ReminderStatus.PENDING,
+                    "attempts": 0,
+                    "available_at": now,
+                    "sent_at": None,
+                    "provider_message_id": None,
+                    "last_error": None,
+                    "reminder_id": reminder_id,
+                },
+            )
+        if reminders:
+            await session.execute(insert(Reminders), reminders)
+            await session.execute(insert(OutboundMessages), messages)
+        return len(reminders)
+
+    async def run_once(self, today: Optional[date] = None) -> int:
+        """Mark one batch, returning how many invoices it had."""
+        today = today or datetime.now(tz=timezone.utc).date()
+        async with self.db.session() as session:
+            invoices = await self.mark(session, today)
+            if invoices and self.reminders:
+                await self.remind(session, invoices)
+            await session.commit()
+        MARKED_OVERDUE.inc(len(invoices))
+        return len(invoices)
+
+    async def sweep(self, stop: Optional[asyncio.Event] = None) -> int:
+        """Mark batches until none are left, returning how many were marked."""
+        today = datetime.now(tz=timezone.utc).date()
+        start = time.perf_counter()
+        marked = 0
+        while stop is None or not stop.is_set():
+            batch = await self.run_once(today)
+            marked += batch
+            if batch < self.batch_size:
+                break
+
+        elapsed = time.perf_counter() - start
+        SWEEP_SECONDS.observe(elapsed)
+        if marked:
+            logger.info(
+                "Marked %d invoices overdue in %.2f s (%.0f rows/s)",
+                marked,
+                elapsed,
+                marked / elapsed,
+            )
+        return marked
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Sweep until stopped."""
+        while not stop.is_set():
+            try:
+                await self.sweep(stop)
+            except Exception:
+                logger.exception("Overdue sweep failed")
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), self.interval)
+
+    def start(self) -> None:
+        """Start sweeping on the current event loop, if enabled."""
+        if self.interval > 0:
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(self._stop))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let an in-flight batch finish, then stop."""
+        self._stop.set()
+        if self._task is None:
+            return
+        _, pending = await asyncio.wait([self._task], timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._task = None
+
+
+async def main() -> None:
+    """Run the sweep until interrupted."""
+    sweeper = OverdueSweeper(interval=settings.OVERDUE_SWEEP_INTERVAL or 300.0)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    sweeper.start()
+    await stopped.wait()
+    await sweeper.stop()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,20 +1,482 @@
-"""Zenopay payment."""
-
-from elusion.zenopay import ZenoPay
-from elusion.zenopay.models.order import NewOrder
-from elusion.zenopay.utils import generate_id
-
-# Initialize client (uses environment variables)
-client = ZenoPay()
-
-# Create order (sync)
-with client:
-    order = NewOrder(
-        order_id=generate_id(),
-        buyer_email="customer@example.com",
-        buyer_name="John Doe",
-        buyer_phone="07XXXXXXXX",
-        amount=1000,
+"""Zenopay mobile money payments.
+
+A payment is recorded as a PENDING transaction and the caller gets it back at
+once. The order is submitted to ZenoPay in the background, which pushes a
+payment prompt to the customer's phone; the result arrives later through the
+ZenoPay webhook.
+
+Webhooks come more than once and out of order. A result is recorded with a
+conditional UPDATE of the PENDING transaction, so only the first one changes
+anything, and the receipt SMS goes through the outbox.
+
+A PENDING payment counts against what its invoice still owes. Payments left
+without a result for ``ZENOPAY_PENDING_TTL`` seconds are failed in the
+background, so a lost webhook doesn't hold the invoice forever::
+
+    python -m src.services.payment     # run the expiry outside the web app
+"""
+
+import asyncio
+import contextlib
+import logging
+import random
+import signal
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_DOWN, Decimal
+from typing import Optional
+
+import httpx
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.instrumentation import metered_transport
+from src.metrics import counter
+from src.models.balances import UNPAID_STATUSES, refresh_customer_balances
+from src.models.database import Database, database
+from src.models.enums import PaymentMethod, TransactionStatus
+from src.models.repository.payment import SETTLED_FROM, PaymentRepository
+from src.models.tables import Invoices, Transactions
+from src.schemas.payment import ZenoPayWebhookSchema
+from src.services.outbox import enqueue_sms
+from src.services.providers import providers
+from src.settings import settings
+from src.utils import phone_number_validator
+
+logger = logging.getLogger(__name__)
+
+CREATE_ORDER_PATH = "/api/payments/mobile_money_tanzania"
+
+# Responses that mean the order was not taken and can be sent again.
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503})
+
+# Failures where the request never reached the API. Read timeouts are not
+# retried since the order may already have been created.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# ZenoPay payment statuses that settle a transaction.
+SETTLED_STATUSES = {
+    "COMPLETED": TransactionStatus.COMPLETED,
+    "FAILED": TransactionStatus.FAILED,
+    "CANCELLED": TransactionStatus.FAILED,
+}
+
+RECEIPT_MESSAGE = (
+    "Payment of {currency} {amount:,.2f} received for invoice {invoice_number}. "
+    "Thank you."
+)
+
+EXPIRED_NOTE = "No result from ZenoPay in time"
+
+WEBHOOKS = counter(
+    "payment_webhooks_total",
+    "ZenoPay payment results received, by what they changed.",
+    ("outcome",),
+)
+PAYMENTS_EXPIRED = counter(
+    "payments_expired_total",
+    "Mobile money payments failed after staying PENDING too long.",
+)
+
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Create the keep-alive HTTP client for the ZenoPay API."""
+    return httpx.AsyncClient(
+        base_url=settings.ZENOPAY_API_URL,
+        headers={"x-api-key": settings.ZENOPAY_API_KEY, "Accept": "application/json"},
+        timeout=httpx.Timeout(settings.ZENOPAY_TIMEOUT),
+        transport=metered_transport(
+            "zenopay",
+            httpx.Limits(
+                max_connections=settings.ZENOPAY_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ZENOPAY_MAX_CONNECTIONS,
+            ),
+        ),
     )
-    response = client.orders.sync.create(order)
-    print(f"Order ID: {response.results.order_id}")
+
+
+providers.register(
+    "zenopay_http",
+    _create_http_client,
+    close=lambda client: client.aclose(),
+)
+
+
+class PaymentProviderError(Exception):
+    """ZenoPay rejected an order, or could not be reached."""
+
+    def __init__(self, message: str, *, unknown: bool = False) -> None:
+        """Initialize. ``unknown`` means the order may have been created."""
+        super().__init__(message)
+        self.unknown = unknown
+
+
+class ZenoPay:
+    """ZenoPay mobile money orders."""
+
+    def __init__(
+        self,
+        max_retries: int = settings.ZENOPAY_MAX_RETRIES,
+        retry_backoff: float = settings.ZENOPAY_RETRY_BACKOFF,
+    ) -> None:
+        """Initialize."""
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client."""
+        return providers.get("zenopay_http")
+
+    async def create_order(
+        self,
+        *,
+        order_id: str,
+        buyer_email: str,
+        buyer_name: str,
+        buyer_phone: str,
+        amount: int,
+        webhook_url: Optional[str] = None,
+    ) -> dict:
+        """Create an order, pushing a payment prompt to the buyer's phone."""
+        data = {
+            "order_id": order_id,
+            "buyer_email": buyer_email,
+            "buyer_name": buyer_name,
+            "buyer_phone": buyer_phone,
+            "amount": amount,
+        }
+        if webhook_url:
+            data["webhook_url"] = webhook_url
+        return await self._post(CREATE_ORDER_PATH, data)
+
+    async def _post(self, path: str, data: dict) -> dict:
+        """Post JSON to the API, retrying with jittered exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.post(path, json=data)
+            except RETRYABLE_ERRORS as error:
+                if last_attempt:
+                    msg = "ZenoPay API is unreachable"
+                    raise PaymentProviderError(msg) from error
+            except httpx.HTTPError as error:
+                msg = f"ZenoPay request failed: {error!r}"
+                raise PaymentProviderError(msg, unknown=True) from error
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    if response.is_error:
+                        msg = (
+                            f"ZenoPay API error {response.status_code}: {response.text}"
+                        )
+                        raise PaymentProviderError(msg)
+                    body = response.json()
+                    if body.get("status") != "success":
+                        msg = f"ZenoPay rejected the order: {body.get('message')}"
+                        raise PaymentProviderError(msg)
+                    return body
+                if last_attempt:
+                    msg = f"ZenoPay API unavailable ({response.status_code})"
+                    raise PaymentProviderError(msg)
+
+            await asyncio.sleep(self._backoff(attempt))
+
+        msg = "ZenoPay request was not attempted"
+        raise PaymentProviderError(msg)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full jitter backoff for a retry attempt."""
+        return random.uniform(0, self.retry_backoff * 2**attempt)
+
+
+zenopay = ZenoPay()
+
+
+def _local_phone(phone: str) -> str:
+    """Tanzanian number in the 0XXXXXXXXX form mobile money expects."""
+    number = phone_number_validator(phone)
+    return "0" + number.removeprefix("+255") if number.startswith("+255") else number
+
+
+def _whole(amount: Decimal) -> int:
+    """Mobile money amounts are whole shillings; round down so none is overpaid."""
+    return int(amount.to_integral_value(rounding=ROUND_DOWN))
+
+
+class PaymentService:
+    """Initiate mobile money payments without waiting for them."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        provider: ZenoPay = zenopay,
+        concurrency: int = settings.ZENOPAY_MAX_CONNECTIONS,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.provider = provider
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def initiate(
+        self,
+        session: AsyncSession,
+        invoice: Invoices,
+        *,
+        phone: Optional[str] = None,
+        amount: Optional[Decimal] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Transactions:
+        """Record a PENDING payment of an invoice and submit it in the background.
+
+        Pays what the invoice still owes unless given an ``amount``, from the
+        customer's phone unless given another. A request repeating an
+        ``idempotency_key`` gets the first request's transaction back and
+        submits nothing.
+        """
+        repository = PaymentRepository(session)
+        if idempotency_key is not None:
+            existing = await repository.get_by_idempotency_key(idempotency_key)
+            if existing is not None:
+                return existing
+
+        if invoice.status not in UNPAID_STATUSES:
+            msg = "Only sent or overdue invoices can be paid"
+            raise ValueError(msg)
+
+        customer = invoice.customer
+        phone = _local_phone(phone or customer.phone)
+        buyer_email = customer.email or settings.ZENOPAY_BUYER_EMAIL
+        if not buyer_email:
+            msg = "The customer has no email address for the payment"
+            raise ValueError(msg)
+
+        remaining = await repository.remaining(invoice)
+        amount = remaining if amount is None else amount
+        if remaining <= 0:
+            msg = "The invoice is paid or has payments on their way"
+            raise ValueError(msg)
+        if amount <= 0 or amount > remaining:
+            msg = f"The amount must be between 0 and {remaining}"
+            raise ValueError(msg)
+        if _whole(amount) < 1:
+            msg = "The amount must be at least one whole shilling"
+            raise ValueError(msg)
+
+        transaction_id = uuid.uuid4()
+        transaction = Transactions(
+            id=transaction_id,
+            transaction_number=f"PAY-{transaction_id.hex[:20].upper()}",
+            invoice_id=invoice.id,
+            customer_id=invoice.customer_id,
+            amount=Decimal(_whole(amount)),
+            currency=invoice.currency,
+            payment_method=PaymentMethod.MOBILE_MONEY,
+            status=TransactionStatus.PENDING,
+            idempotency_key=idempotency_key,
+        )
+        session.add(transaction)
+        try:
+            await session.commit()
+        except IntegrityError:
+            # a concurrent request with the same key got there first
+            await session.rollback()
+            existing = None
+            if idempotency_key is not None:
+                existing = await repository.get_by_idempotency_key(idempotency_key)
+            if existing is None:
+                raise
+            return existing
+
+        order = {
+            "order_id": str(transaction.id),
+            "buyer_email": buyer_email,
+            "buyer_name": customer.name,
+            "buyer_phone": phone,
+            "amount": _whole(transaction.amount),
+            "webhook_url": settings.ZENOPAY_WEBHOOK_URL,
+        }
+        task = asyncio.create_task(self.submit(transaction.id, order))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return transaction
+
+    async def submit(self, transaction_id: uuid.UUID, order: dict) -> None:
+        """Create the ZenoPay order, failing the transaction if it's rejected.
+
+        When the outcome is unknown, e.g. on a read timeout, the transaction
+        stays PENDING for the webhook to settle.
+        """
+        try:
+            async with self._semaphore:
+                await self.provider.create_order(**order)
+        except PaymentProviderError as error:
+            logger.warning("Payment %s not submitted: %s", transaction_id, error)
+            if error.unknown:
+                return
+            async with self.db.session() as session:
+                transaction = await session.get(Transactions, transaction_id)
+                if transaction.status == TransactionStatus.PENDING:
+                    transaction.status = TransactionStatus.FAILED
+                    transaction.notes = str(error)[:500]
+                    await session.commit()
+        except Exception:
+            logger.exception("Payment %s submission failed", transaction_id)
+
+    async def aclose(self, timeout: float = 10.0) -> None:
+        """Let in-flight submissions finish."""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+
+payment_service = PaymentService()
+
+
+async def record_result(session: AsyncSession, result: ZenoPayWebhookSchema) -> str:
+    """Record a payment result from the webhook, in one short transaction.
+
+    Returns ``applied`` when it settled the payment, ``duplicate`` when the
+    payment was already settled and ``ignored`` for results about unknown
+    orders or statuses that settle nothing.
+    """
+    status = SETTLED_STATUSES.get(result.payment_status.upper())
+    try:
+        transaction_id = uuid.UUID(result.order_id)
+    except ValueError:
+        status = None
+    if status is None:
+        WEBHOOKS.inc(outcome="ignored")
+        return "ignored"
+
+    repository = PaymentRepository(session)
+    current = await repository.get_status(transaction_id)
+    if current is None:
+        WEBHOOKS.inc(outcome="ignored")
+        return "ignored"
+    if current not in SETTLED_FROM[status]:
+        # answered from a read, without waiting for a write lock
+        await session.rollback()
+        WEBHOOKS.inc(outcome="duplicate")
+        return "duplicate"
+
+    try:
+        payment = await repository.settle(transaction_id, status, result.reference)
+        if payment is not None and status == TransactionStatus.COMPLETED:
+            await repository.close_if_paid(payment.invoice_id)
+            await refresh_customer_balances(session, [payment.customer_id])
+            invoice_number, phone = await repository.receipt_details(
+                payment.invoice_id,
+            )
+            with contextlib.suppress(ValueError):
+                enqueue_sms(
+                    session,
+                    phone,
+                    RECEIPT_MESSAGE.format(
+                        currency=payment.currency,
+                        amount=payment.amount,
+                        invoice_number=invoice_number,
+                    ),
+                )
+        await session.commit()
+    except IntegrityError:
+        # the reference was already recorded against another payment
+        await session.rollback()
+        logger.warning("Duplicate payment reference %s", result.reference)
+        payment = None
+
+    outcome = "duplicate" if payment is None else "applied"
+    WEBHOOKS.inc(outcome=outcome)
+    return outcome
+
+
+class PendingPaymentExpirer:
+    """Fail mobile money payments left PENDING too long, periodically."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        interval: float = settings.ZENOPAY_EXPIRY_INTERVAL,
+        ttl: float = settings.ZENOPAY_PENDING_TTL,
+        batch_size: int = settings.ZENOPAY_EXPIRY_BATCH_SIZE,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.interval = interval
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Fail one batch, returning how many payments it had."""
+        now = now or datetime.now(tz=timezone.utc)
+        async with self.db.session() as session:
+            expired = await PaymentRepository(session).expire_pending(
+                now - timedelta(seconds=self.ttl),
+                self.batch_size,
+                EXPIRED_NOTE,
+            )
+            await session.commit()
+        PAYMENTS_EXPIRED.inc(expired)
+        return expired
+
+    async def expire(self, stop: Optional[asyncio.Event] = None) -> int:
+        """Fail batches until none are left, returning how many were failed."""
+        now = datetime.now(tz=timezone.utc)
+        expired = 0
+        while stop is None or not stop.is_set():
+            batch = await self.run_once(now)
+            expired += batch
+            if batch < self.batch_size:
+                break
+        if expired:
+            logger.info("Failed %d payments left PENDING", expired)
+        return expired
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Expire payments until stopped."""
+        while not stop.is_set():
+            try:
+                await self.expire(stop)
+            except Exception:
+                logger.exception("Pending payment expiry failed")
+
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), self.interval)
+
+    def start(self) -> None:
+        """Start expiring on the current event loop, if enabled."""
+        if self.interval > 0:
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(self._stop))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let an in-flight batch finish, then stop."""
+        self._stop.set()
+        if self._task is None:
+            return
+        _, pending = await asyncio.wait([self._task], timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._task = None
+
+
+async def main() -> None:
+    """Run the expiry until interrupted."""
+    expirer = PendingPaymentExpirer(interval=settings.ZENOPAY_EXPIRY_INTERVAL or 60.0)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    expirer.start()
+    await stopped.wait()
+    await expirer.stop()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""Registry of external service clients.
+
+Clients are created on first use instead of at import time, shared by every
+request in the worker and closed when the app shuts down.
+"""
+
+import inspect
+import threading
+from collections.abc import Callable
+from typing import Any, Optional
+
+
+class ProviderRegistry:
+    """Lazily created, shared clients."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._closers: dict[str, Optional[Callable[[Any], Any]]] = {}
+        self._instances: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], Any]] = None,
+    ) -> None:
+        """Register how to create and close a client."""
+        self._factories[name] = factory
+        self._closers[name] = close
+
+    def get(self, name: str) -> Any:
+        """Get a client, creating it on first use."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if name not in self._instances:
+                try:
+                    factory = self._factories[name]
+                except KeyError as error:
+                    msg = f"Unknown provider: {name}"
+                    raise KeyError(msg) from error
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    def is_initialized(self, name: str) -> bool:
+        """Whether the client has been created."""
+        return name in self._instances
+
+    async def aclose(self) -> None:
+        """Close every client that was created."""
+        with self._lock:
+            instances, self._instances = self._instances, {}
+
+        for name, instance in instances.items():
+            close = self._closers.get(name)
+            if close is None:
+                continue
+            result = close(instance)
+            if inspect.isawaitable(result):
+                await result
+
+
+providers = ProviderRegistry()
+
+
+__all__ = ("ProviderRegistry", "providers")
@@ -0,0 +1,164 @@
+"""Sliding window rate limits.
+
+A limiter allows ``limit`` hits of a key within any ``window`` seconds. The
+memory limiter counts per worker; the Redis one is shared by every worker
+and is selected with ``RATE_LIMIT_STORE=redis``.
+"""
+
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+from src.services.africastalking import sessions  # noqa: F401  registers "redis"
+from src.services.providers import providers
+from src.settings import settings
+
+
+class RateLimitExceeded(Exception):
+    """A key was hit more often than its limit allows."""
+
+    def __init__(self, key: str, retry_after: float) -> None:
+        """Initialize. ``retry_after`` is in seconds."""
+        super().__init__(f"Rate limit exceeded for {key}")
+        self.key = key
+        self.retry_after = retry_after
+
+
+class RateLimiter(ABC):
+    """Counts hits of keys in a sliding window."""
+
+    @abstractmethod
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Record a hit of a key if it is within the limit.
+
+        Returns 0 when the hit was allowed, otherwise the seconds until the
+        next one would be. Refused hits are not counted.
+        """
+
+    async def check(self, key: str, limit: int, window: float) -> None:
+        """Record a hit, raising RateLimitExceeded if over the limit."""
+        retry_after = await self.hit(key, limit, window)
+        if retry_after > 0:
+            raise RateLimitExceeded(key, retry_after)
+
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process limiter keeping the times of recent hits of each key.
+
+    Keys are kept in least recently hit order and dropped once their window
+    has passed, or when there are more than ``max_keys``.
+    """
+
+    def __init__(self, max_keys: int = settings.RATE_LIMIT_MAX_KEYS) -> None:
+        """Initialize."""
+        self.max_keys = max_keys
+        self._hits: OrderedDict[str, tuple[float, deque]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Number of keys tracked, including stale ones not yet dropped."""
+        return len(self._hits)
+
+    def _evict(self, now: float) -> None:
+        """Drop keys whose window has passed, then the least recently hit."""
+        while self._hits:
+            key, (expires_at, _) = next(iter(self._hits.items()))
+            if expires_at > now and len(self._hits) <= self.max_keys:
+                break
+            del self._hits[key]
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Record a hit of a key if it is within the limit."""
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._hits.get(key)
+        hits = entry[1] if entry is not None else deque()
+        while hits and hits[0] <= now - window:
+            hits.popleft()
+        if len(hits) >= limit:
+            return hits[0] + window - now
+
+        hits.append(now)
+        self._hits[key] = (now + window, hits)
+        self._hits.move_to_end(key)
+        self._evict(now)
+        return 0.0
+
+
+# KEYS[1] key, ARGV[1] window ms, ARGV[2] limit, ARGV[3] unique hit ID.
+# Returns 0, or the ms until the oldest hit in the window leaves it.
+HIT_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local window = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return math.max(1, tonumber(oldest[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return 0
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """Limiter shared by every worker, keeping hit times in Redis sorted sets.
+
+    Each hit is one atomic script using the server's clock, so workers with
+    skewed clocks still agree.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        prefix: str = "ratelimit:",
+    ) -> None:
+        """Initialize."""
+        self._client = client
+        self.prefix = prefix
+        self._script = None
+
+    @property
+    def client(self) -> Any:
+        """Get the Redis client, defaulting to the shared one."""
+        return self._client if self._client is not None else providers.get("redis")
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        """Record a hit of a key if it is within the limit."""
+        if self._script is None:
+            self._script = self.client.register_script(HIT_SCRIPT)
+        retry_after = await self._script(
+            keys=[self.prefix + key],
+            args=[int(window * 1000), limit, uuid.uuid4().hex],
+        )
+        return int(retry_after) / 1000
+
+
+RATE_LIMITERS = {
+    "memory": MemoryRateLimiter,
+    "redis": RedisRateLimiter,
+}
+
+
+def create_rate_limiter(
+    backend: Optional[str] = None,
+) -> RateLimiter:
+    """Create the rate limiter configured by RATE_LIMIT_STORE."""
+    backend = backend or settings.RATE_LIMIT_STORE
+    try:
+        limiter_class = RATE_LIMITERS[backend]
+    except KeyError as error:
+        msg = f"Unknown rate limit store: {backend}"
+        raise ValueError(msg) from error
+    return limiter_class()
+
+
+__all__ = (
+    "MemoryRateLimiter",
+    "RateLimitExceeded",
+    "RateLimiter",
+    "RedisRateLimiter",
+    "create_rate_limiter",
+)
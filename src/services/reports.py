@@ -0,0 +1,119 @@
+"""Organization dashboard.
+
+Reads the reporting rollups, which a refresher keeps up to date in the
+background::
+
+    python -m src.services.reports     # run the refresher outside the web app
+"""
+
+import asyncio
+import contextlib
+import logging
+import signal
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.models import reports
+from src.models.database import Database, database
+from src.models.repository.report import ReportRepository
+from src.schemas.report import DashboardQuery
+from src.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ReportRefresher:
+    """Apply invoice and transaction changes to the rollups periodically."""
+
+    def __init__(
+        self,
+        db: Database = database,
+        interval: float = settings.REPORTS_REFRESH_INTERVAL,
+        batch_size: int = reports.REFRESH_BATCH_SIZE,
+    ) -> None:
+        """Initialize."""
+        self.db = db
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = asyncio.Event()
+        self._task = None
+
+    async def run_once(self) -> int:
+        """Apply one batch of changes, returning how many rows it read."""
+        async with self.db.engine.begin() as connection:
+            return await connection.run_sync(reports.refresh, self.batch_size)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Refresh until stopped, catching up before sleeping."""
+        while not stop.is_set():
+            try:
+                read = await self.run_once()
+            except Exception:
+                logger.exception("Report refresh failed")
+                read = 0
+
+            if read == 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), self.interval)
+
+    def start(self) -> None:
+        """Start refreshing on the current event loop, if enabled."""
+        if self.interval > 0:
+            self._stop.clear()
+            self._task = asyncio.create_task(self.run(self._stop))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let an in-flight refresh finish, then stop."""
+        self._stop.set()
+        if self._task is None:
+            return
+        _, pending = await asyncio.wait([self._task], timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._task = None
+
+
+def _first_month(today: date, months: int) -> date:
+    """First day of the month ``months - 1`` months before today's."""
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+async def get_dashboard(
+    session: AsyncSession,
+    query: DashboardQuery,
+    today: Optional[date] = None,
+) -> dict:
+    """Aging, cash flow and top debtors of an organization."""
+    today = today or datetime.now(tz=timezone.utc).date()
+    repository = ReportRepository(session)
+    organization_id = query.organization_id
+    return {
+        "as_of": await repository.refreshed_through(),
+        "aging": await repository.aging(organization_id, today),
+        "cash_flow": await repository.cash_flow(
+            organization_id,
+            _first_month(today, query.months),
+        ),
+        "top_debtors": await repository.top_debtors(organization_id, query.top),
+    }
+
+
+async def main() -> None:
+    """Run the refresher until interrupted."""
+    refresher = ReportRefresher(interval=settings.REPORTS_REFRESH_INTERVAL or 10.0)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    refresher.start()
+    await stopped.wait()
+    await refresher.stop()
+    await database.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
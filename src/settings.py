@@ -2,15 +2,25 @@
 
 import logging
 import os
+import tempfile
 import warnings
+from pathlib import Path
 from typing import Optional
 
 from dotenv import load_dotenv
 from pydantic import Field, PostgresDsn
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.engine import make_url
 
 load_dotenv()
 
+# Async DBAPI driver used for each supported database backend.
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "postgres": "asyncpg",
+}
+
 
 class DataBaseConfig(BaseSettings):
     """Database config."""
@@ -24,6 +34,19 @@ class DataBaseConfig(BaseSettings):
     DEVELOPMENT_MODE: bool = True
     DATABASE_URL: Optional[str] = None  # noqa: FA100
 
+    # Connection pool (ignored for sqlite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: float = 10.0
+    DB_STATEMENT_TIMEOUT_MS: int = 30_000
+    # Total connections all workers may open, e.g. Postgres max_connections
+    # minus superuser/maintenance headroom. Split evenly across workers.
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    WEB_CONCURRENCY: int = 1
+
     @property
     def database_url(self) -> str:
         """Get the database URL from the environment variables."""
@@ -50,6 +73,63 @@ class DataBaseConfig(BaseSettings):
                 raise ValueError(error_message)
         return database_url
 
+    @property
+    def async_database_url(self) -> str:
+        """Get the database URL rewritten to use an async driver."""
+        url = make_url(self.database_url)
+        backend = url.get_backend_name()
+        driver = ASYNC_DRIVERS.get(backend)
+        if driver is None:
+            error_message = f"Unsupported database backend: {backend}"
+            raise ValueError(error_message)
+
+        if backend == "postgres":
+            backend = "postgresql"
+        return url.set(drivername=f"{backend}+{driver}").render_as_string(
+            hide_password=False,
+        )
+
+    @property
+    def is_sqlite(self) -> bool:
+        """Whether the configured database is sqlite."""
+        return make_url(self.database_url).get_backend_name() == "sqlite"
+
+    @property
+    def pool_budget(self) -> tuple[int, int]:
+        """Get the per-worker (pool_size, max_overflow).
+
+        When DB_MAX_CONNECTIONS is set, each of the WEB_CONCURRENCY workers
+        gets an equal share of it, so the whole deployment never opens more
+        connections than the server accepts.
+        """
+        pool_size, max_overflow = self.DB_POOL_SIZE, self.DB_MAX_OVERFLOW
+        if self.DB_MAX_CONNECTIONS:
+            per_worker = max(1, self.DB_MAX_CONNECTIONS // max(1, self.WEB_CONCURRENCY))
+            pool_size = min(pool_size, per_worker)
+            max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+        return pool_size, max_overflow
+
+    @property
+    def engine_options(self) -> dict:
+        """Get the keyword arguments for creating the async engine."""
+        if self.is_sqlite:
+            return {"connect_args": {"timeout": self.DB_CONNECT_TIMEOUT}}
+
+        pool_size, max_overflow = self.pool_budget
+        return {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": self.DB_POOL_TIMEOUT,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+            "connect_args": {
+                "timeout": self.DB_CONNECT_TIMEOUT,
+                "server_settings": {
+                    "statement_timeout": str(self.DB_STATEMENT_TIMEOUT_MS),
+                },
+            },
+        }
+
 
 class Settings(BaseSettings):
     """App config."""
@@ -60,18 +140,142 @@ class Settings(BaseSettings):
     )
 
     DATABASE: DataBaseConfig = Field(default_factory=DataBaseConfig)
+
+    # Access tokens are signed with SECRET_KEY and carry JWT_KEY_ID as their
+    # "kid". To rotate the key, move the old one into JWT_VERIFY_KEYS (a JSON
+    # object of kid to key) until the tokens it signed have expired.
+    SECRET_KEY: str = "insecure-secret-key"
+    JWT_KEY_ID: str = "default"
+    JWT_VERIFY_KEYS: dict[str, str] = Field(default_factory=dict)
+    # Verified tokens kept per worker until they expire, and how long a
+    # loaded user is reused before being read again
+    JWT_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60.0
+    USER_CACHE_SIZE: int = 10_000
+
     AT_USERNAME: str
     AT_API_KEY: str
     AT_SENDER_ID: Optional[str] = Field(default="16038")
+    # Defaults to the sandbox API for the "sandbox" username
+    AT_API_URL: Optional[str] = None
+    AT_TIMEOUT: float = 10.0
+    AT_MAX_CONNECTIONS: int = 20
+    AT_MAX_RETRIES: int = 3
+    AT_RETRY_BACKOFF: float = 0.5
+    AT_BULK_BATCH_SIZE: int = 500
+    AT_BULK_CONCURRENCY: int = 4
     ZENOPAY_API_KEY: str
+    ZENOPAY_API_URL: str = "https://zenoapi.com"
+    ZENOPAY_TIMEOUT: float = 15.0
+    ZENOPAY_MAX_CONNECTIONS: int = 20
+    ZENOPAY_MAX_RETRIES: int = 2
+    ZENOPAY_RETRY_BACKOFF: float = 0.5
+    # Where ZenoPay posts payment results, and the buyer email it requires
+    # for customers without one
+    ZENOPAY_WEBHOOK_URL: Optional[str] = None
+    ZENOPAY_BUYER_EMAIL: Optional[str] = None
+    # Seconds a mobile money payment may stay PENDING without a result before
+    # it is failed and stops holding its invoice; a later successful result
+    # still completes it. Expired every ZENOPAY_EXPIRY_INTERVAL seconds in the
+    # app; set that to 0 to run `python -m src.services.payment` instead.
+    ZENOPAY_PENDING_TTL: float = 1800.0
+    ZENOPAY_EXPIRY_INTERVAL: float = 60.0
+    ZENOPAY_EXPIRY_BATCH_SIZE: int = 500
+
+    # Invoice numbers each worker reserves at a time. Numbers left in a
+    # block when a worker stops are skipped.
+    INVOICE_NUMBER_BLOCK_SIZE: int = 20
+    INVOICE_NUMBER_PREFIX: str = "INV-"
+
+    # Bulk invoice imports: invoices per transaction, errors kept per job
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_ERRORS: int = 1000
+
+    # Rows fetched and serialized at a time by streaming exports
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # USSD sessions: "memory" keeps them per worker, "redis" shares them
+    USSD_SESSION_STORE: str = "memory"
+    USSD_SESSION_TTL: float = 180.0
+    USSD_SESSION_MAX_SIZE: int = 10_000
+    REDIS_URL: Optional[str] = None
+
+    # Outbound message queue. Set OUTBOX_WORKERS=0 to run the workers
+    # separately with `python -m src.services.outbox`.
+    OUTBOX_WORKERS: int = 1
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    OUTBOX_LEASE_SECONDS: int = 60
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_BACKOFF: float = 30.0
+
+    # Seconds between reporting rollup refreshes in the app. Set to 0 to run
+    # them separately with `python -m src.services.reports`.
+    REPORTS_REFRESH_INTERVAL: float = 10.0
+
+    # Seconds between sweeps marking invoices past their due date overdue in
+    # the app. Set to 0 to run them separately with
+    # `python -m src.services.overdue`. OVERDUE_REMINDERS queues an SMS to
+    # the customer for each invoice the sweep marks.
+    OVERDUE_SWEEP_INTERVAL: float = 300.0
+    OVERDUE_SWEEP_BATCH_SIZE: int = 500
+    OVERDUE_REMINDERS: bool = False
+
+    # One-time login codes: digits, seconds they stay valid and guesses
+    # allowed per code
+    OTP_LENGTH: int = 6
+    OTP_TTL: float = 300.0
+    OTP_MAX_ATTEMPTS: int = 5
+    # Codes sent per phone and per client IP, and verifications per client
+    # IP, within OTP_RATE_WINDOW seconds
+    OTP_RATE_WINDOW: float = 900.0
+    OTP_PHONE_LIMIT: int = 3
+    OTP_IP_LIMIT: int = 20
+    OTP_VERIFY_IP_LIMIT: int = 30
+    # Seconds between purges of expired codes in the app. Set to 0 to run
+    # them separately with `python -m src.services.otp`.
+    OTP_PURGE_INTERVAL: float = 60.0
+    OTP_PURGE_BATCH_SIZE: int = 1000
+
+    # Rate limit counters: "memory" keeps them per worker, "redis" shares
+    # them. RATE_LIMIT_MAX_KEYS bounds the memory store.
+    RATE_LIMIT_STORE: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+
+    # Logs go to stderr as JSON lines ("json") or plain text ("text"), with
+    # one line per request carrying its latency and database time
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    # Scrapers of /metrics must send "Authorization: Bearer <METRICS_TOKEN>".
+    # Leave unset only when the endpoint is firewalled from the internet.
+    METRICS_TOKEN: Optional[str] = None
+
+    # Opt-in request profiling, off unless PROFILING_ENABLED. A request is
+    # profiled when it sends an X-Profile header equal to PROFILING_TOKEN, or
+    # at random with PROFILING_SAMPLE_RATE when its path starts with one of
+    # PROFILING_PATHS (a JSON list; empty for every path). Profiles are
+    # written to PROFILING_DIR, keeping the last PROFILING_MAX_PROFILES.
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_PATHS: list[str] = Field(default_factory=list)
+    PROFILING_INTERVAL: float = 0.005
+    PROFILING_DIR: str = str(Path(tempfile.gettempdir()) / "inflow360-profiles")
+    PROFILING_MAX_PROFILES: int = 100
 
     @property
-    def logger(self):
-        """Get the logger."""
-        logger = logging.getLogger(__name__)
-        logger.setLevel(logging.INFO)
+    def at_api_url(self) -> str:
+        """Get the AfricasTalking API base URL."""
+        if self.AT_API_URL:
+            return self.AT_API_URL
+        if self.AT_USERNAME == "sandbox":
+            return "https://api.sandbox.africastalking.com"
+        return "https://api.africastalking.com"
 
-        return logger
+    @property
+    def logger(self):
+        """Get the logger. Its level is set by LOG_LEVEL."""
+        return logging.getLogger(__name__)
 
 
 settings = Settings()
@@ -1,23 +1,69 @@
 """Collection of validation functions."""
 
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
 import phonenumbers
 
+DEFAULT_REGION = "TZ"
 
-def phone_number_validator(phone_number: str) -> str:
-    """Format and validate phone number."""
+# Normalized numbers, valid or not, kept in memory. Bulk sends and imports see
+# the same customers over and over, so most lookups skip phonenumbers entirely.
+PHONE_NUMBER_CACHE_SIZE = 65536
+
+INVALID_PHONE_NUMBER = "Invalid phone number"
+
+
+class NormalizedPhoneNumbers(NamedTuple):
+    """Result of normalizing a batch of phone numbers."""
+
+    # input number -> E.164 number
+    valid: dict[str, str]
+    # input number -> reason it was rejected
+    errors: dict[str, str]
+
+
+@lru_cache(maxsize=PHONE_NUMBER_CACHE_SIZE)
+def _normalize(phone_number: str) -> tuple[Optional[str], Optional[str]]:
+    """Normalize a number to E.164, returning (number, None) or (None, error).
+
+    Errors are returned rather than raised so rejected numbers are cached too.
+    Numbers in international format ignore the default region, so a single
+    parse covers both local and foreign numbers.
+    """
     try:
-        try:
-            _phone_number = phonenumbers.parse(phone_number, "TZ")
-        except phonenumbers.phonenumberutil.NumberParseException:
-            _phone_number = phonenumbers.parse(phone_number, None)
+        parsed = phonenumbers.parse(phone_number, DEFAULT_REGION)
     except phonenumbers.phonenumberutil.NumberParseException as error:
-        msg = "Invalid phone number"
-        raise ValueError(msg) from error
+        return None, str(error)
+
+    if not phonenumbers.is_valid_number(parsed):
+        return None, INVALID_PHONE_NUMBER
+    return phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164), None
+
 
-    if not phonenumbers.is_valid_number(_phone_number):
-        msg = "Invalid phone number"
+def phone_number_validator(phone_number: str) -> str:
+    """Format and validate phone number."""
+    number, _ = _normalize(phone_number)
+    if number is None:
+        msg = INVALID_PHONE_NUMBER
         raise ValueError(msg)
-    return phonenumbers.format_number(
-        _phone_number,
-        phonenumbers.PhoneNumberFormat.E164,
-    )
+    return number
+
+
+def normalize_phone_numbers(phone_numbers: Iterable[str]) -> NormalizedPhoneNumbers:
+    """Format and validate phone numbers, collecting the invalid ones."""
+    valid, errors = {}, {}
+    for phone_number in phone_numbers:
+        if phone_number in valid or phone_number in errors:
+            continue
+        number, error = _normalize(phone_number)
+        if number is None:
+            errors[phone_number] = error
+        else:
+            valid[phone_number] = number
+    return NormalizedPhoneNumbers(valid, errors)
+
+
+phone_number_cache_info = _normalize.cache_info
+phone_number_cache_clear = _normalize.cache_clear
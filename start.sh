@@ -9,5 +9,9 @@ fi
 # Create database directory if it doesn't exist
 mkdir -p src/models
 
+# Bring the schema up to date once, before any worker starts
+echo "Applying database migrations..."
+python -m src.models.migrate
+
 echo "Starting FastAPI server..."
 uvicorn src.main:app --reload --host 0.0.0.0 --port 8000
@@ -0,0 +1,11 @@
+"""Test configuration.
+
+``src.settings`` is built on import and requires the provider credentials, so
+dummy values are set before any test module imports ``src``.
+"""
+
+import os
+
+os.environ.setdefault("AT_USERNAME", "sandbox")
+os.environ.setdefault("AT_API_KEY", "test-api-key")
+os.environ.setdefault("ZENOPAY_API_KEY", "test-api-key")
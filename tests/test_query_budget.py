@@ -0,0 +1,103 @@
+"""Query budget of the invoice detail endpoint.
+
+Runs ``GET /api/invoices/{invoice_id}`` against a scratch sqlite database, so
+an N+1 regression fails the suite::
+
+    python -m pytest tests
+"""
+
+import asyncio
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlmodel import SQLModel
+
+from src.models.database import Database
+from src.models.enums import InvoiceStatus, TransactionStatus
+from src.models.instrumentation import query_budget
+from src.models.tables import (
+    Customers,
+    InvoiceItems,
+    Invoices,
+    Organizations,
+    Reminders,
+    Transactions,
+    Users,
+)
+from src.routes.invoice import get_invoice
+from src.settings import DataBaseConfig
+
+QUERY_BUDGET = 4
+
+
+async def seed(db: Database, children: int) -> tuple[Invoices, Users]:
+    """Create an invoice with the given number of items, payments and reminders."""
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    async with db.session() as session:
+        user = Users(phone_number="+255754000000", name="Test")
+        organization = Organizations(owner_id=user.id, name="Test")
+        customer = Customers(
+            organization_id=organization.id,
+            customer_code="C000001",
+            name="Customer",
+            phone="+255754000001",
+        )
+        invoice = Invoices(
+            invoice_number="INV-00000001",
+            customer_id=customer.id,
+            organization_id=organization.id,
+            created_by=user.id,
+            subtotal=Decimal(children * 10),
+            total_amount=Decimal(children * 10),
+            status=InvoiceStatus.SENT,
+        )
+        session.add_all([user, organization, customer, invoice])
+        for index in range(children):
+            session.add_all(
+                [
+                    InvoiceItems(
+                        invoice_id=invoice.id,
+                        description=f"Item {index}",
+                        quantity=Decimal(1),
+                        unit_price=Decimal(10),
+                        total_amount=Decimal(10),
+                    ),
+                    Transactions(
+                        transaction_number=f"TX-{index:08d}",
+                        invoice_id=invoice.id,
+                        customer_id=customer.id,
+                        amount=Decimal(1),
+                        status=TransactionStatus.COMPLETED,
+                    ),
+                    Reminders(
+                        invoice_id=invoice.id,
+                        customer_id=customer.id,
+                        sent_by=user.id,
+                        message=f"Reminder {index}",
+                    ),
+                ],
+            )
+        await session.commit()
+    return invoice, user
+
+
+async def _invoice_detail_queries(path: Path, children: int) -> int:
+    url = f"sqlite:///{path / 'budget.db'}"
+    db = Database(DataBaseConfig(DEVELOPMENT_MODE=True, DEVELOPMENT_DB=url))
+    try:
+        invoice, user = await seed(db, children)
+        async with db.session() as session:
+            with query_budget(QUERY_BUDGET) as counter:
+                await get_invoice(invoice.id, session, user.id)
+    finally:
+        await db.dispose()
+    return counter.count
+
+
+@pytest.mark.parametrize("children", [1, 25])
+def test_invoice_detail_query_budget(tmp_path: Path, children: int) -> None:
+    """The detail endpoint stays within budget however many children it has."""
+    assert asyncio.run(_invoice_detail_queries(tmp_path, children)) <= QUERY_BUDGET